@@ -7,6 +7,7 @@ from sqlmodel import Session
 
 from app.db.base import get_engine
 from app.fetchers.manager import FetchManager
+from app.services.llm_routing import load_routing
 from app.services.llm_service import QuestionLLMClient
 
 
@@ -38,4 +39,8 @@ def get_llm_client() -> QuestionLLMClient:
     if timeout > 0:
         kwargs["timeout"] = timeout
     base_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
-    return QuestionLLMClient(api_key=api_key, model=model, base_url=base_url, **kwargs)
+    try:
+        routing = load_routing()
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"LLM 路由配置无效：{exc}") from exc
+    return QuestionLLMClient(api_key=api_key, model=model, base_url=base_url, routing=routing, **kwargs)
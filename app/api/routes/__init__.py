@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from . import questions, fetch, sessions, tasks, paragraphs, sentences, flashcards, conversations
+from . import questions, fetch, sessions, tasks, paragraphs, sentences, flashcards, conversations, metrics
 
 api_router = APIRouter()
 api_router.include_router(questions.router)
@@ -13,5 +13,6 @@ api_router.include_router(paragraphs.router)
 api_router.include_router(sentences.router)
 api_router.include_router(flashcards.router)
 api_router.include_router(conversations.router)
+api_router.include_router(metrics.router)
 
 __all__ = ["api_router"]
@@ -1,32 +1,48 @@
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlmodel import Session
 
 from app.api.dependencies import get_session
 from app.db.schemas import LLMConversation
-from app.models.answer import LLMConversationRead
+from app.models.answer import LLMConversationRead, LLMConversationStorageRead, LLMConversationSummaryRead
+from app.services.conversation_store import ConversationStore
 
 
 router = APIRouter(prefix="/llm-conversations", tags=["llm_conversations"])
 
 
-@router.get("", response_model=List[LLMConversationRead])
+@router.get("", response_model=List[LLMConversationSummaryRead])
 def list_conversations(
-    limit: int = 50,
+    response: Response,
+    limit: int = Query(default=50, ge=1, le=200),
     session_id: Optional[int] = None,
     task_id: Optional[int] = None,
+    before_id: Optional[int] = None,
     db: Session = Depends(get_session),
-) -> List[LLMConversationRead]:
-    statement = select(LLMConversation).order_by(LLMConversation.created_at.desc())
-    if session_id is not None:
-        statement = statement.where(LLMConversation.session_id == session_id)
-    if task_id is not None:
-        statement = statement.where(LLMConversation.task_id == task_id)
-    if limit:
-        statement = statement.limit(limit)
-    rows = db.exec(statement).all()
-    return [LLMConversationRead.model_validate(row) for row in rows]
+) -> List[LLMConversationSummaryRead]:
+    try:
+        items, next_before_id = ConversationStore(db).list_summaries(
+            session_id=session_id, task_id=task_id, before_id=before_id, limit=limit
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if next_before_id is not None:
+        response.headers["X-Next-Before-Id"] = str(next_before_id)
+    return items
+
+
+@router.get("/storage", response_model=LLMConversationStorageRead)
+def conversation_storage(db: Session = Depends(get_session)) -> LLMConversationStorageRead:
+    return LLMConversationStorageRead(**ConversationStore(db).storage_stats())
+
+
+@router.get("/{conversation_id}", response_model=LLMConversationRead)
+def get_conversation(conversation_id: int, db: Session = Depends(get_session)) -> LLMConversationRead:
+    conversation = db.get(LLMConversation, conversation_id)
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return ConversationStore(db).to_read(conversation)
 
 
 __all__ = ["router"]
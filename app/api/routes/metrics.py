@@ -0,0 +1,28 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, Query
+from sqlmodel import Session
+
+from app.api.dependencies import get_session
+from app.models.metrics import LLMResilienceRead, LLMUsageRead
+from app.services.conversation_store import ConversationStore
+from app.services.llm_resilience import get_resilience
+
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/llm", response_model=LLMUsageRead)
+def llm_usage(
+    hours: int = Query(default=24, ge=1, le=24 * 90),
+    db: Session = Depends(get_session),
+) -> LLMUsageRead:
+    """Calls, tokens, estimated cost and p50/p95 latency per purpose over the last ``hours``."""
+    since = datetime.now(timezone.utc) - timedelta(hours=hours)
+    return LLMUsageRead(since=since, purposes=ConversationStore(db).usage_stats(since))
+
+
+@router.get("/llm/resilience", response_model=LLMResilienceRead)
+def llm_resilience() -> LLMResilienceRead:
+    """Retry, throttling and circuit breaker counters per purpose since the process started."""
+    return LLMResilienceRead(**get_resilience().snapshot())
@@ -1,10 +1,11 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Response
 
 from app.api.dependencies import get_session, get_llm_client
 from app.models.paragraph import ParagraphRead
 from app.models.fetch_task import TaskRead
+from app.services.answer_bundle_service import AnswerBundleService, bundle_json
 from app.services.paragraph_service import ParagraphService
 from app.services.task_service import TaskService
 
@@ -20,9 +21,64 @@ def get_task_service(
 router = APIRouter(prefix="/answers", tags=["paragraphs"])
 
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+
+
+def _accepts_deflate(accept_encoding: Optional[str]) -> bool:
+    qualities: dict[str, float] = {}
+    for item in (accept_encoding or "").lower().split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities.get("deflate", qualities.get("*", 0.0)) > 0
+
+
 @router.get("/{answer_id}/paragraphs", response_model=List[ParagraphRead])
-def list_paragraphs(answer_id: int, service: ParagraphService = Depends(get_paragraph_service)) -> List[ParagraphRead]:
-    return service.list_by_answer(answer_id)
+def list_paragraphs(
+    answer_id: int,
+    if_none_match: Optional[str] = Header(default=None),
+    service: ParagraphService = Depends(get_paragraph_service),
+) -> Response:
+    etag = service.tree_etag(answer_id)
+    # no-cache: clients keep the body but revalidate it with If-None-Match on every load.
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    tree = service.answer_tree(answer_id, etag)
+    return Response(content=tree.body, media_type="application/json", headers=headers)
+
+
+@router.get("/{answer_id}/bundle")
+def get_answer_bundle(
+    answer_id: int,
+    if_none_match: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+    db=Depends(get_session),
+) -> Response:
+    bundle = AnswerBundleService(db).current(answer_id)
+    deflate = _accepts_deflate(accept_encoding)
+    # A strong ETag names one representation, so the deflate body gets its own.
+    etag = bundle.etag[:-1] + '-deflate"' if deflate else bundle.etag
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    # The stored zlib stream is the "deflate" content coding, so it is sent as is.
+    if deflate:
+        headers["Content-Encoding"] = "deflate"
+        return Response(content=bundle.payload, media_type="application/json", headers=headers)
+    return Response(content=bundle_json(bundle), media_type="application/json", headers=headers)
 
 
 @router.post("/{answer_id}/tasks/structure", response_model=TaskRead, status_code=201)
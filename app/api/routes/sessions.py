@@ -1,8 +1,6 @@
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
-from fastapi.concurrency import run_in_threadpool
-from sqlmodel import Session as DBSession
 
 from app.api.dependencies import get_session, get_llm_client
 from app.models.answer import (
@@ -11,6 +9,7 @@ from app.models.answer import (
     AnswerGroupCreate,
     AnswerGroupRead,
     SessionCreate,
+    SessionEventRead,
     SessionRead,
     SessionUpdate,
     SessionFinalizePayload,
@@ -21,6 +20,7 @@ from app.models.fetch_task import TaskRead
 from app.models.live import LiveTurnRead
 from app.services.session_service import SessionService
 from app.services.task_service import TaskService
+from app.services.live_stream_service import LiveStreamWorker
 from app.db.base import get_engine
 
 
@@ -155,13 +155,10 @@ async def live_session_stream(websocket: WebSocket, session_id: int) -> None:
         await websocket.send_json({"type": "error", "message": exc.detail})
         await websocket.close(code=4400)
         return
-    engine = get_engine()
-    with DBSession(engine) as db:
-        service = SessionService(db)
-        task_service = TaskService(db, llm_client)
+    worker = LiveStreamWorker(get_engine(), llm_client, session_id)
+    try:
         try:
-            entity = service._get_session_entity(session_id)
-            service._ensure_live_mode(entity, require_active=False)  # type: ignore[attr-defined]
+            await worker.start()
         except HTTPException as exc:
             await websocket.send_json({"type": "error", "message": exc.detail})
             await websocket.close(code=4400)
@@ -176,13 +173,23 @@ async def live_session_stream(websocket: WebSocket, session_id: int) -> None:
                     if not text:
                         await websocket.send_json({"type": "error", "message": "请输入问题文本"})
                         continue
-                    turn = service.create_live_turn(session_id, text, followup)
+                    turn = await worker.create_turn(text, followup)
                     await websocket.send_json({"type": "ack", "turn": turn.turn_index, "turn_id": turn.id})
                     try:
-                        reply = await run_in_threadpool(task_service.generate_live_reply, session_id, turn.id)
+                        reply = await worker.generate_reply(
+                            turn,
+                            on_delta=lambda delta, turn=turn: websocket.send_json(
+                                {
+                                    "type": "examiner_reply_delta",
+                                    "turn": turn.turn_index,
+                                    "turn_id": turn.id,
+                                    "delta": delta,
+                                }
+                            ),
+                        )
                         result_text = reply.get("text", "")
                         meta = reply.get("meta")
-                        service.record_live_reply(turn.id, result_text, meta)
+                        await worker.record_reply(turn, result_text, meta, reply.get("conversation"))
                         await websocket.send_json(
                             {
                                 "type": "examiner_reply",
@@ -200,21 +207,23 @@ async def live_session_stream(websocket: WebSocket, session_id: int) -> None:
                                 {"type": "notice", "message": "已经完成 12 轮，可以随时结束或继续。"}
                             )
                     except HTTPException as exc:
-                        service.mark_live_turn_error(turn.id, exc.detail if isinstance(exc.detail, str) else str(exc))
+                        await worker.mark_error(turn, exc.detail if isinstance(exc.detail, str) else str(exc))
                         await websocket.send_json({"type": "error", "message": exc.detail})
                         continue
                 elif msg_type == "stop":
-                    service.update_live_status(session_id, "stopped")
+                    await worker.update_status("stopped")
                     await websocket.send_json({"type": "stopped"})
                 else:
                     await websocket.send_json({"type": "error", "message": "未知消息类型"})
         except WebSocketDisconnect:
-            service.update_live_status(session_id, "stopped")
+            await worker.update_status("stopped")
         except Exception as exc:  # pragma: no cover
             await websocket.send_json({"type": "error", "message": str(exc)})
-            service.update_live_status(session_id, "stopped")
+            await worker.update_status("stopped")
         finally:
             await websocket.close()
+    finally:
+        await worker.close()
 
 
 answer_group_router = APIRouter(prefix="/answer-groups", tags=["answer-groups"])
@@ -257,8 +266,12 @@ def get_answer(answer_id: int, service: SessionService = Depends(get_session_ser
 
 
 @answers_router.get("/{answer_id}/history", response_model=AnswerHistoryRead)
-def get_answer_history(answer_id: int, service: SessionService = Depends(get_session_service)) -> AnswerHistoryRead:
-    return service.get_answer_history(answer_id)
+def get_answer_history(
+    answer_id: int,
+    include_archived: bool = False,
+    service: SessionService = Depends(get_session_service),
+) -> AnswerHistoryRead:
+    return service.get_answer_history(answer_id, include_archived=include_archived)
 
 
 @answers_router.post("/{answer_id}/sessions", response_model=SessionRead, status_code=status.HTTP_201_CREATED)
@@ -273,12 +286,21 @@ def delete_answer(answer_id: int, service: SessionService = Depends(get_session_
 
 @sessions_router.get("/{session_id}/history", response_model=SessionHistoryRead)
 def get_session_history(
-    session_id: int, service: SessionService = Depends(get_session_service)
+    session_id: int,
+    include_archived: bool = False,
+    service: SessionService = Depends(get_session_service),
 ) -> SessionHistoryRead:
-    return service.get_session_history(session_id)
+    return service.get_session_history(session_id, include_archived=include_archived)
 
 
 __all__ = ["sessions_router", "answer_group_router", "answers_router"]
+@sessions_router.get("/{session_id}/events", response_model=List[SessionEventRead])
+def list_session_events(
+    session_id: int, service: SessionService = Depends(get_session_service)
+) -> List[SessionEventRead]:
+    return service.list_session_events(session_id)
+
+
 @sessions_router.post("/{session_id}/complete-learning", response_model=SessionRead)
 def complete_learning(
     session_id: int,
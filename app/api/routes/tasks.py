@@ -1,10 +1,12 @@
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 
 from app.api.dependencies import get_session, get_llm_client
-from app.models.fetch_task import TaskRead
-from app.services.task_query_service import TaskQueryService
+from app.models.fetch_task import TaskListItem, TaskRead
+from app.services.task_events import stream_task_events, task_events
+from app.services.task_query_service import DEFAULT_TASK_PAGE_SIZE, MAX_TASK_PAGE_SIZE, TaskQueryService
 from app.services.task_service import TaskService
 
 
@@ -20,21 +22,56 @@ def get_task_service(
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
 
-@router.get("", response_model=List[TaskRead])
+@router.get("", response_model=List[TaskListItem], response_model_exclude_unset=True)
 def list_tasks(
+    response: Response,
     session_id: Optional[int] = None,
     question_id: Optional[int] = None,
     task_type: Optional[str] = None,
     status: Optional[str] = None,
     answer_id: Optional[int] = None,
+    before_id: Optional[int] = None,
+    limit: int = Query(default=DEFAULT_TASK_PAGE_SIZE, ge=1, le=MAX_TASK_PAGE_SIZE),
+    fields: Optional[str] = Query(
+        default=None, description="Comma-separated task fields; result_summary is left out by default"
+    ),
     service: TaskQueryService = Depends(get_task_query_service),
-) -> List[TaskRead]:
-    return service.list_tasks(
-        session_id=session_id,
-        question_id=question_id,
-        task_type=task_type,
-        status=status,
-        answer_id=answer_id,
+) -> List[TaskListItem]:
+    requested = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    try:
+        items, next_before_id = service.list_tasks(
+            session_id=session_id,
+            question_id=question_id,
+            task_type=task_type,
+            status=status,
+            answer_id=answer_id,
+            before_id=before_id,
+            limit=limit,
+            fields=requested,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if next_before_id is not None:
+        response.headers["X-Next-Before-Id"] = str(next_before_id)
+    return items
+
+
+@router.get("/stream")
+async def stream_tasks(
+    session_id: Optional[int] = None,
+    answer_id: Optional[int] = None,
+    last_event_id: Optional[str] = Header(default=None),
+) -> StreamingResponse:
+    resume_from: Optional[int] = None
+    if last_event_id:
+        try:
+            resume_from = int(last_event_id)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID") from exc
+    return StreamingResponse(
+        stream_task_events(task_events, session_id=session_id, answer_id=answer_id, last_event_id=resume_from),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
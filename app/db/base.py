@@ -1,6 +1,11 @@
-from sqlalchemy import text
+from sqlalchemy import Table, text
+from sqlalchemy.schema import CreateTable
 from sqlmodel import SQLModel, create_engine
 
+from app.db.schemas import LLMConversation, Task
+
+from app.db.schemas.structure_version import create_structure_triggers
+
 DATABASE_URL = "sqlite:///./app.db"
 
 _engine = None
@@ -19,11 +24,24 @@ def init_db() -> None:
     """Create tables for initial skeleton."""
     engine = get_engine()
     SQLModel.metadata.create_all(engine)
+    _ensure_answer_columns(engine)
     _ensure_session_columns(engine)
     _ensure_task_columns(engine)
     _ensure_sentence_columns(engine)
     _ensure_lexeme_columns(engine)
     _ensure_flashcard_columns(engine)
+    _ensure_conversation_columns(engine)
+    _ensure_autoincrement(engine, Task.__table__)
+    _ensure_autoincrement(engine, LLMConversation.__table__)
+
+
+def _ensure_answer_columns(engine) -> None:
+    with engine.connect() as conn:
+        result = conn.execute(text("PRAGMA table_info('answers')"))
+        columns = {row[1] for row in result}
+        if "structure_version" not in columns:
+            conn.execute(text("ALTER TABLE answers ADD COLUMN structure_version INTEGER NOT NULL DEFAULT 0"))
+        create_structure_triggers(conn)
 
 
 def _ensure_session_columns(engine) -> None:
@@ -36,6 +54,46 @@ def _ensure_session_columns(engine) -> None:
                     "ALTER TABLE sessions ADD COLUMN updated_at TIMESTAMP"
                 )
             )
+        if "phase" not in columns:
+            _move_session_state_to_columns(conn)
+        if "version" not in columns:
+            conn.execute(text("ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0"))
+
+
+# Results are taken from the newest succeeded task of the type, which is what
+# progress_state carried a copy of.
+_LAST_RESULT_TASK = (
+    "(SELECT id FROM tasks WHERE tasks.session_id = sessions.id AND tasks.type = '{type}' "
+    "AND tasks.status = 'succeeded' ORDER BY tasks.created_at DESC LIMIT 1)"
+)
+
+
+def _move_session_state_to_columns(conn) -> None:
+    conn.execute(text("ALTER TABLE sessions ADD COLUMN phase VARCHAR NOT NULL DEFAULT 'draft'"))
+    conn.execute(text("ALTER TABLE sessions ADD COLUMN phase_status VARCHAR NOT NULL DEFAULT 'idle'"))
+    conn.execute(text("ALTER TABLE sessions ADD COLUMN phase_error VARCHAR"))
+    for kind in ("eval", "compare", "compose"):
+        conn.execute(text(f"ALTER TABLE sessions ADD COLUMN last_{kind}_task_id INTEGER"))
+    conn.execute(
+        text(
+            "UPDATE sessions SET "
+            "phase = COALESCE(json_extract(progress_state, '$.phase'), 'draft'), "
+            "phase_status = COALESCE(json_extract(progress_state, '$.phase_status'), 'idle'), "
+            "phase_error = json_extract(progress_state, '$.phase_error'), "
+            + ", ".join(
+                f"last_{kind}_task_id = CASE WHEN json_extract(progress_state, '$.last_{kind}') IS NOT NULL "
+                f"THEN {_LAST_RESULT_TASK.format(type=kind)} END"
+                for kind in ("eval", "compare", "compose")
+            )
+        )
+    )
+    conn.execute(
+        text(
+            "UPDATE sessions SET progress_state = json_remove(progress_state, '$.phase', '$.phase_status', "
+            "'$.phase_error', '$.last_eval', '$.last_compare', '$.last_compose', '$.outline_plan')"
+        )
+    )
+    conn.commit()
 
 
 def _ensure_task_columns(engine) -> None:
@@ -47,6 +105,16 @@ def _ensure_task_columns(engine) -> None:
         if "answer_id" not in columns:
             conn.execute(text("ALTER TABLE tasks ADD COLUMN answer_id INTEGER"))
         conn.execute(text("CREATE INDEX IF NOT EXISTS ix_tasks_answer_id ON tasks(answer_id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_tasks_created_at ON tasks(created_at)"))
+        conn.execute(
+            text("CREATE INDEX IF NOT EXISTS ix_tasks_session_id_created_at ON tasks(session_id, created_at)")
+        )
+        conn.execute(
+            text("CREATE INDEX IF NOT EXISTS ix_tasks_answer_id_created_at ON tasks(answer_id, created_at)")
+        )
+        conn.execute(
+            text("CREATE INDEX IF NOT EXISTS ix_tasks_type_status_created_at ON tasks(type, status, created_at)")
+        )
 
 
 def _ensure_sentence_columns(engine) -> None:
@@ -59,6 +127,9 @@ def _ensure_sentence_columns(engine) -> None:
             conn.execute(text("ALTER TABLE sentences ADD COLUMN translation_zh TEXT"))
         if "difficulty" not in columns:
             conn.execute(text("ALTER TABLE sentences ADD COLUMN difficulty TEXT"))
+        if "content_hash" not in columns:
+            conn.execute(text("ALTER TABLE sentences ADD COLUMN content_hash TEXT"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_sentences_content_hash ON sentences(content_hash)"))
 
 
 def _ensure_lexeme_columns(engine) -> None:
@@ -89,3 +160,55 @@ def _ensure_flashcard_columns(engine) -> None:
             return
         if "interval_days" not in columns:
             conn.execute(text("ALTER TABLE flashcard_progress ADD COLUMN interval_days INTEGER DEFAULT 1"))
+
+
+def _ensure_conversation_columns(engine) -> None:
+    with engine.connect() as conn:
+        result = conn.execute(text("PRAGMA table_info('llm_conversations')"))
+        columns = {row[1] for row in result}
+        if not columns:
+            return
+        if "payload" not in columns:
+            conn.execute(text("ALTER TABLE llm_conversations ADD COLUMN payload BLOB"))
+        if "raw_size" not in columns:
+            conn.execute(text("ALTER TABLE llm_conversations ADD COLUMN raw_size INTEGER"))
+        if "stored_size" not in columns:
+            conn.execute(text("ALTER TABLE llm_conversations ADD COLUMN stored_size INTEGER"))
+        for column in ("prompt_tokens", "completion_tokens", "cached_tokens"):
+            if column not in columns:
+                conn.execute(text(f"ALTER TABLE llm_conversations ADD COLUMN {column} INTEGER"))
+        if "cost_usd" not in columns:
+            conn.execute(text("ALTER TABLE llm_conversations ADD COLUMN cost_usd FLOAT"))
+        conn.execute(
+            text("CREATE INDEX IF NOT EXISTS ix_llm_conversations_created_at ON llm_conversations(created_at)")
+        )
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_llm_conversations_purpose_created_at "
+                "ON llm_conversations(purpose, created_at)"
+            )
+        )
+
+
+def _ensure_autoincrement(engine, table: Table) -> None:
+    """Rebuild a table created without AUTOINCREMENT, so ids of archived rows are never reused.
+
+    The new table is created under a temporary name and renamed into place:
+    renaming the old one away would repoint foreign keys at it.
+    """
+    with engine.begin() as conn:
+        row = conn.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table.name}
+        ).first()
+        if row is None or "AUTOINCREMENT" in row[0].upper():
+            return
+        existing = {item[1] for item in conn.execute(text(f"PRAGMA table_info('{table.name}')"))}
+        columns = ", ".join(column.name for column in table.columns if column.name in existing)
+        rebuilt = f"{table.name}_rebuilt"
+        create = str(CreateTable(table).compile(dialect=conn.dialect))
+        conn.execute(text(create.replace(f"CREATE TABLE {table.name} ", f"CREATE TABLE {rebuilt} ", 1)))
+        conn.execute(text(f"INSERT INTO {rebuilt} ({columns}) SELECT {columns} FROM {table.name}"))
+        conn.execute(text(f"DROP TABLE {table.name}"))
+        conn.execute(text(f"ALTER TABLE {rebuilt} RENAME TO {table.name}"))
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
@@ -1,11 +1,14 @@
 from .question import Question, QuestionTag
 from .task import Task
-from .answer import AnswerGroup, Answer, Session
-from .conversation import LLMConversation
+from .answer import AnswerGroup, Answer, AnswerBundle, Session
+from .conversation import LLMConversation, LLMPromptSegment
 from .paragraph import Paragraph, Sentence
 from .chunk import Lexeme, SentenceChunk, ChunkLexeme
 from .flashcard import FlashcardProgress
 from .live_turn import LiveTurn
+from .session_event import SessionEvent
+from .translation_memory import TranslationMemory
+from . import structure_version  # noqa: F401  registers the structure triggers
 
 __all__ = [
     "Question",
@@ -13,8 +16,10 @@ __all__ = [
     "Task",
     "AnswerGroup",
     "Answer",
+    "AnswerBundle",
     "Session",
     "LLMConversation",
+    "LLMPromptSegment",
     "Paragraph",
     "Sentence",
     "Lexeme",
@@ -22,4 +27,6 @@ __all__ = [
     "ChunkLexeme",
     "FlashcardProgress",
     "LiveTurn",
+    "SessionEvent",
+    "TranslationMemory",
 ]
@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime, timezone
 from typing import Optional
 
-from sqlalchemy import Column, JSON
+from sqlalchemy import Column, Integer, JSON, LargeBinary, UniqueConstraint
 from sqlmodel import Field, SQLModel
 
 
@@ -32,11 +32,36 @@ class Answer(SQLModel, table=True):
     status: str = Field(default="draft", index=True)
     title: str
     text: str
+    # Bumped by database triggers whenever the paragraph tree changes.
+    structure_version: int = Field(default=0)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
+class AnswerBundle(SQLModel, table=True):
+    """Immutable study snapshot of an answer's paragraph tree at one structure version."""
+
+    __tablename__ = "answer_bundles"
+    __table_args__ = (UniqueConstraint("answer_id", "structure_version", name="ux_answer_bundle_version"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    answer_id: int = Field(foreign_key="answers.id", index=True)
+    structure_version: int
+    etag: str
+    # zlib-compressed JSON, which is also the HTTP "deflate" content coding.
+    payload: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    raw_size: int = 0
+    stored_size: int = 0
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+# Bumped on every write of a session row. ORM flushes check it (a concurrent
+# writer raises StaleDataError); session_state.save_session merges and retries.
+_session_version = Column("version", Integer, nullable=False, default=0, server_default="0")
+
+
 class Session(SQLModel, table=True):
     __tablename__ = "sessions"
+    __mapper_args__ = {"version_id_col": _session_version}
 
     id: Optional[int] = Field(default=None, primary_key=True)
     question_id: int = Field(foreign_key="questions.id", index=True)
@@ -44,10 +69,20 @@ class Session(SQLModel, table=True):
     session_type: str = Field(default="first", index=True)
     status: str = Field(default="draft", index=True)
     user_answer_draft: Optional[str] = None
+    # Current state only; how the session got here is in session_events.
+    phase: str = Field(default="draft")
+    phase_status: str = Field(default="idle")
+    phase_error: Optional[str] = None
+    # Latest results by task id; no foreign key, tasks already point back at sessions.
+    last_eval_task_id: Optional[int] = None
+    last_compare_task_id: Optional[int] = None
+    last_compose_task_id: Optional[int] = None
+    # Small context set along the way (mode, live counters, selected direction/group).
     progress_state: dict = Field(
         default_factory=dict,
         sa_column=Column(JSON, nullable=False, default=dict),
     )
+    version: int = Field(default=0, sa_column=_session_version)
     started_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     completed_at: Optional[datetime] = None
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -3,12 +3,18 @@ from __future__ import annotations
 from datetime import datetime, timezone
 from typing import Optional
 
-from sqlalchemy import Column, JSON
+from sqlalchemy import Column, Index, JSON, LargeBinary
 from sqlmodel import Field, SQLModel
 
 
 class LLMConversation(SQLModel, table=True):
     __tablename__ = "llm_conversations"
+    __table_args__ = (
+        Index("ix_llm_conversations_created_at", "created_at"),
+        Index("ix_llm_conversations_purpose_created_at", "purpose", "created_at"),
+        # Archived rows keep their ids; AUTOINCREMENT stops SQLite from handing them out again.
+        {"sqlite_autoincrement": True},
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     session_id: Optional[int] = Field(default=None, foreign_key="sessions.id", index=True)
@@ -18,4 +24,24 @@ class LLMConversation(SQLModel, table=True):
     result: dict = Field(default_factory=dict, sa_column=Column(JSON, nullable=False, default=dict))
     model_name: Optional[str] = None
     latency_ms: Optional[int] = None
+    # Token counts as reported by the provider; cost is estimated from llm_usage prices.
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    cost_usd: Optional[float] = None
+    # Packed rows keep messages/result empty and hold both in a compressed payload;
+    # system prompts inside it are references into llm_prompt_segments.
+    payload: Optional[bytes] = Field(default=None, sa_column=Column(LargeBinary, nullable=True))
+    raw_size: Optional[int] = None
+    stored_size: Optional[int] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class LLMPromptSegment(SQLModel, table=True):
+    __tablename__ = "llm_prompt_segments"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    hash: str = Field(index=True, unique=True)
+    content: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    raw_size: int = 0
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -29,6 +29,7 @@ class Sentence(SQLModel, table=True):
     paragraph_id: int = Field(foreign_key="paragraphs.id", index=True)
     order_index: int = Field(default=1)
     text: str
+    content_hash: Optional[str] = Field(default=None, index=True)
     translation_en: Optional[str] = Field(default=None)
     translation_zh: Optional[str] = Field(default=None)
     difficulty: Optional[str] = Field(default=None)
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+
+
+class SessionEvent(SQLModel, table=True):
+    """Append-only log of a session's phase changes and task results.
+
+    Results are referenced by task id; their payload stays in ``tasks.result_summary``.
+    """
+
+    __tablename__ = "session_events"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    session_id: int = Field(foreign_key="sessions.id", index=True)
+    kind: str
+    phase: Optional[str] = None
+    phase_status: Optional[str] = None
+    error: Optional[str] = None
+    # Not a foreign key: archived tasks leave the hot database, their events stay.
+    task_id: Optional[int] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
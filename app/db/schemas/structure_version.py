@@ -0,0 +1,69 @@
+"""Triggers that bump ``answers.structure_version`` whenever an answer's tree changes.
+
+The paragraph tree of an answer (paragraphs, sentences, chunks and their
+lexemes) is cached per structure version. Keeping the counter in SQLite
+triggers covers every writer: ORM flushes, set-based statements and the
+maintenance scripts running in other processes.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection
+from sqlmodel import SQLModel
+
+_BUMP = "UPDATE answers SET structure_version = COALESCE(structure_version, 0) + 1 WHERE id IN ({answers});"
+
+# How to reach the answer id from a changed row, by table; {row} is NEW or OLD.
+_ANSWER_OF = {
+    "paragraphs": "SELECT {row}.answer_id",
+    "sentences": "SELECT answer_id FROM paragraphs WHERE id = {row}.paragraph_id",
+    "sentence_chunks": (
+        "SELECT p.answer_id FROM sentences s JOIN paragraphs p ON p.id = s.paragraph_id "
+        "WHERE s.id = {row}.sentence_id"
+    ),
+    "chunk_lexemes": (
+        "SELECT p.answer_id FROM sentence_chunks c JOIN sentences s ON s.id = c.sentence_id "
+        "JOIN paragraphs p ON p.id = s.paragraph_id WHERE c.id = {row}.chunk_id"
+    ),
+}
+# Lexemes are shared between answers: an edit bumps every answer that links the lexeme.
+_ANSWERS_OF_LEXEME = (
+    "SELECT p.answer_id FROM chunk_lexemes cl JOIN sentence_chunks c ON c.id = cl.chunk_id "
+    "JOIN sentences s ON s.id = c.sentence_id JOIN paragraphs p ON p.id = s.paragraph_id "
+    "WHERE cl.lexeme_id = NEW.id"
+)
+
+
+def _trigger(name: str, when: str, table: str, answers: str) -> str:
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {when} ON {table} "
+        f"BEGIN {_BUMP.format(answers=answers)} END"
+    )
+
+
+def structure_triggers() -> list[str]:
+    statements = []
+    for table, answer_of in _ANSWER_OF.items():
+        statements.append(_trigger(f"trg_{table}_insert_structure", "INSERT", table, answer_of.format(row="NEW")))
+        statements.append(_trigger(f"trg_{table}_delete_structure", "DELETE", table, answer_of.format(row="OLD")))
+        statements.append(
+            _trigger(
+                f"trg_{table}_update_structure",
+                "UPDATE",
+                table,
+                f"{answer_of.format(row='OLD')} UNION {answer_of.format(row='NEW')}",
+            )
+        )
+    statements.append(_trigger("trg_lexemes_update_structure", "UPDATE", "lexemes", _ANSWERS_OF_LEXEME))
+    return statements
+
+
+def create_structure_triggers(conn: Connection) -> None:
+    for statement in structure_triggers():
+        conn.execute(text(statement))
+
+
+@event.listens_for(SQLModel.metadata, "after_create")
+def _create_after_tables(target, connection: Connection, **kwargs) -> None:
+    create_structure_triggers(connection)
@@ -1,12 +1,21 @@
 from datetime import datetime, timezone
 from typing import Optional
 
-from sqlalchemy import Column, JSON
+from sqlalchemy import Column, Index, JSON
 from sqlmodel import Field, SQLModel
 
 
 class Task(SQLModel, table=True):
     __tablename__ = "tasks"
+    # Listing filters on one of these prefixes and pages by (created_at, id).
+    __table_args__ = (
+        Index("ix_tasks_created_at", "created_at"),
+        Index("ix_tasks_session_id_created_at", "session_id", "created_at"),
+        Index("ix_tasks_answer_id_created_at", "answer_id", "created_at"),
+        Index("ix_tasks_type_status_created_at", "type", "status", "created_at"),
+        # Archived rows keep their ids; AUTOINCREMENT stops SQLite from handing them out again.
+        {"sqlite_autoincrement": True},
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     session_id: Optional[int] = Field(default=None, foreign_key="sessions.id", index=True)
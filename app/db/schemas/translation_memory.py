@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+
+
+class TranslationMemory(SQLModel, table=True):
+    __tablename__ = "translation_memory"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    source_hash: str = Field(index=True, unique=True)
+    source_text: str
+    text_length: int = Field(index=True)
+    translation_en: Optional[str] = Field(default=None)
+    translation_zh: Optional[str] = Field(default=None)
+    difficulty: Optional[str] = Field(default=None)
+    hit_count: int = Field(default=0)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -25,6 +25,8 @@ from .chains import (
     build_refine_answer_chain,
     build_outline_chain,
     build_live_reply_chain,
+    CHUNK_SPLIT_PROMPT_VERSION,
+    CHUNK_LEXEME_PROMPT_VERSION,
 )
 
 __all__ = [
@@ -52,4 +54,6 @@ __all__ = [
     "build_refine_answer_chain",
     "build_outline_chain",
     "build_live_reply_chain",
+    "CHUNK_SPLIT_PROMPT_VERSION",
+    "CHUNK_LEXEME_PROMPT_VERSION",
 ]
@@ -156,12 +156,14 @@ LIVE_REPLY_HUMAN_PROMPT = (
     "方向提示:\n{direction_hint}\n\n"
     "对话设定:\n{dialogue_profile_hint}\n\n"
     "当前轮次: {turn_index}\n"
+    "更早对话概要:\n{history_summary}\n\n"
     "最近对话摘要:\n{history_block}\n\n"
     "考生本轮提问:\n{candidate_query}"
 )
 
 GAP_HIGHLIGHT_SYSTEM_PROMPT = (
     "你是 TCF Canada 的口语评阅老师。请对比考生草稿与参考答案，指出缺失或薄弱的内容、语法词汇问题，并给出改进建议。"
+    "文中的省略标记表示该处草稿与参考答案相同，评分时视为已覆盖。"
     "输出 JSON，包含 coverage_score(0-1)、missing_points(字符串列表)、grammar_notes(字符串列表)、suggestions(字符串列表)。{format_instructions}"
 )
 
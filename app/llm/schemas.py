@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Optional
 
 from pydantic import BaseModel, Field
@@ -8,6 +8,7 @@ from pydantic import BaseModel, Field
 class GeneratedQuestionMetadata:
     title: str
     tags: List[str]
+    usage: dict = field(default_factory=dict)
 
 
 class QuestionMetadataSchema(BaseModel):
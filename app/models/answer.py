@@ -71,6 +71,19 @@ class SessionRead(SessionBase):
     completed_at: Optional[datetime] = None
 
 
+class SessionEventRead(BaseModel):
+    id: int
+    session_id: int
+    kind: str
+    phase: Optional[str] = None
+    phase_status: Optional[str] = None
+    error: Optional[str] = None
+    task_id: Optional[int] = None
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class SessionUpdate(BaseModel):
     answer_id: Optional[int] = None
     status: Optional[str] = None
@@ -96,11 +109,43 @@ class LLMConversationRead(BaseModel):
     result: dict
     model_name: Optional[str] = None
     latency_ms: Optional[int] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    cost_usd: Optional[float] = None
+    raw_size: Optional[int] = None
+    stored_size: Optional[int] = None
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class LLMConversationSummaryRead(BaseModel):
+    id: int
+    session_id: Optional[int] = None
+    task_id: Optional[int] = None
+    purpose: str
+    model_name: Optional[str] = None
+    latency_ms: Optional[int] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    cost_usd: Optional[float] = None
+    raw_size: int
+    stored_size: int
+    created_at: datetime
+
+
+class LLMConversationStorageRead(BaseModel):
+    packed_conversations: int
+    legacy_conversations: int
+    prompt_segments: int
+    raw_bytes: int
+    stored_bytes: int
+    saved_bytes: int
+    compression_ratio: Optional[float] = None
+
+
 class AnswerHistoryRead(BaseModel):
     answer: AnswerRead
     group: AnswerGroupRead
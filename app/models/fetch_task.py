@@ -25,6 +25,21 @@ class TaskRead(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class TaskListItem(BaseModel):
+    """A task restricted to the requested fields; fields left out stay unset."""
+
+    id: int
+    type: str | None = None
+    status: str | None = None
+    session_id: int | None = None
+    answer_id: int | None = None
+    payload: dict | None = None
+    result_summary: dict | None = None
+    error_message: str | None = None
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+
+
 class FetchResponse(BaseModel):
     task: TaskRead
     results: List[FetchedQuestion]
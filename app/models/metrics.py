@@ -0,0 +1,49 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+class LLMPurposeResilienceRead(BaseModel):
+    calls: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    retries: int = 0
+    short_circuited: int = 0
+    throttled_ms: float = 0
+
+
+class LLMBreakerRead(BaseModel):
+    state: str
+    consecutive_failures: int
+
+
+class LLMResilienceRead(BaseModel):
+    purposes: Dict[str, LLMPurposeResilienceRead]
+    breakers: Dict[str, LLMBreakerRead]
+
+
+class LLMModelUsageRead(BaseModel):
+    model_name: Optional[str] = None
+    calls: int
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int
+    cost_usd: float
+
+
+class LLMPurposeUsageRead(BaseModel):
+    purpose: str
+    calls: int
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int
+    cost_usd: float
+    latency_p50_ms: Optional[int] = None
+    latency_p95_ms: Optional[int] = None
+    models: List[LLMModelUsageRead]
+
+
+class LLMUsageRead(BaseModel):
+    since: datetime
+    purposes: List[LLMPurposeUsageRead]
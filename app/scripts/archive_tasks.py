@@ -0,0 +1,51 @@
+"""Move finished tasks and LLM conversations past their retention into the archive file.
+
+    python -m app.scripts.archive_tasks --batch-size 500 --vacuum
+
+Retention is per task status (see app.services.archive_service); the archive
+path comes from ARCHIVE_DATABASE_PATH unless --archive-path is given.
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import List, Optional
+
+from sqlmodel import Session
+
+from app.db.base import get_engine, init_db
+from app.services.archive_service import DEFAULT_BATCH_SIZE, ArchiveService, vacuum
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Archive old tasks and LLM conversations to a cold SQLite file.")
+    parser.add_argument("--archive-path", type=Path, help="Archive database file (default: ARCHIVE_DATABASE_PATH)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows moved per transaction")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the hot database afterwards to shrink the file")
+    parser.add_argument("--dry-run", action="store_true", help="Only count rows past their retention")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    init_db()
+    engine = get_engine()
+    with Session(engine) as session:
+        service = ArchiveService(session, args.archive_path)
+        if args.dry_run:
+            counts = service.count_expired()
+            print(
+                f"[DRY RUN] {counts['tasks']} task(s) and {counts['standalone_conversations']} "
+                f"standalone conversation(s) are past retention."
+            )
+            return
+        moved = service.archive(batch_size=args.batch_size)
+    print(f"Archived {moved['tasks']} task(s) and {moved['conversations']} conversation(s) to {service.path}.")
+    if args.vacuum:
+        vacuum(engine)
+        print("Vacuumed the hot database.")
+
+
+if __name__ == "__main__":
+    main()
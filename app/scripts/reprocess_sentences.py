@@ -0,0 +1,291 @@
+"""Bulk re-split sentences into chunks and lexemes with the current prompts.
+
+Runs the chunk and chunk-lexeme tasks for many sentences on a worker pool,
+bounded by a shared rate limit. Completed sentence ids are appended to a
+checkpoint file, so an interrupted run picks up where it stopped:
+
+    python -m app.scripts.reprocess_sentences --workers 4 --rate 2 --since 2024-09-01
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from sqlalchemy import delete, exists
+from sqlmodel import Session, select
+
+from app.db.base import get_engine
+from app.db.schemas import ChunkLexeme, FlashcardProgress, Lexeme, Paragraph, Sentence
+from app.services.llm_service import QuestionLLMClient
+from app.services.task_service import TaskService
+
+DEFAULT_CHECKPOINT = Path(".reprocess_sentences.checkpoint")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Re-run chunk and lexeme tasks for sentences with the latest prompt/hash rules."
+    )
+    parser.add_argument("--sentence-id", type=int, help="Only process a specific sentence id")
+    parser.add_argument("--answer-id", type=int, help="Limit to sentences under an answer id")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="Only sentences created at/after this ISO date")
+    parser.add_argument("--limit", type=int, help="Limit number of sentences to process")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent workers (default: 4)")
+    parser.add_argument("--rate", type=float, default=2.0, help="Max LLM calls per second across workers (default: 2)")
+    parser.add_argument("--checkpoint", type=Path, default=DEFAULT_CHECKPOINT, help="File recording finished ids")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and process every match")
+    parser.add_argument("--dry-run", action="store_true", help="Only list target sentences, do not call LLM")
+    return parser.parse_args(argv)
+
+
+def resolve_sentence_ids(
+    session: Session,
+    sentence_id: int | None,
+    answer_id: int | None,
+    limit: int | None,
+    since: datetime | None = None,
+) -> List[int]:
+    statement = select(Sentence.id).order_by(Sentence.id)
+    if sentence_id:
+        statement = statement.where(Sentence.id == sentence_id)
+    if answer_id:
+        statement = statement.join(Paragraph, Paragraph.id == Sentence.paragraph_id).where(Paragraph.answer_id == answer_id)
+    if since:
+        statement = statement.where(Sentence.created_at >= since)
+    if limit:
+        statement = statement.limit(limit)
+    return list(session.exec(statement).all())
+
+
+class RateLimiter:
+    """Token bucket shared by all workers; acquire() blocks until a call is allowed."""
+
+    def __init__(self, per_second: float) -> None:
+        self.per_second = per_second
+        self.capacity = max(1.0, per_second)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.per_second <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.per_second)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_for = (1 - self._tokens) / self.per_second
+            time.sleep(wait_for)
+
+
+class Checkpoint:
+    """Append-only list of finished sentence ids; one id per line survives a crash mid-run."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self) -> set[int]:
+        if not self.path.exists():
+            return set()
+        done: set[int] = set()
+        for line in self.path.read_text().splitlines():
+            line = line.strip()
+            if line.isdigit():
+                done.add(int(line))
+        return done
+
+    def mark(self, sentence_id: int) -> None:
+        with self._lock, self.path.open("a") as handle:
+            handle.write(f"{sentence_id}\n")
+            handle.flush()
+
+    def clear(self) -> None:
+        if self.path.exists():
+            self.path.unlink()
+
+
+class Progress:
+    def __init__(self, total: int, stream=sys.stdout) -> None:
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self.stream = stream
+
+    def update(self, ok: bool) -> None:
+        if ok:
+            self.done += 1
+        else:
+            self.failed += 1
+        self.render()
+
+    def render(self) -> None:
+        finished = self.done + self.failed
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        rate = finished / elapsed
+        eta = (self.total - finished) / rate if rate else 0.0
+        self.stream.write(
+            f"\r{finished}/{self.total} sentences · {rate * 60:.1f}/min · "
+            f"ETA {time.strftime('%H:%M:%S', time.gmtime(eta))} · failed {self.failed}"
+        )
+        self.stream.flush()
+
+
+def cleanup_orphan_lexemes(session: Session) -> int:
+    orphaned = ~exists(select(ChunkLexeme.id).where(ChunkLexeme.lexeme_id == Lexeme.id))
+    session.exec(
+        delete(FlashcardProgress)
+        .where(FlashcardProgress.entity_type == "lexeme")
+        .where(FlashcardProgress.entity_id.in_(select(Lexeme.id).where(orphaned)))
+    )
+    result = session.exec(delete(Lexeme).where(orphaned))
+    session.commit()
+    return result.rowcount or 0
+
+
+def reprocess_sentences(
+    engine,
+    llm_client,
+    sentence_ids: Iterable[int],
+    *,
+    workers: int = 4,
+    rate: float = 2.0,
+    checkpoint: Checkpoint,
+    stream=sys.stdout,
+) -> dict:
+    sentence_ids = list(sentence_ids)
+    done_before = checkpoint.load()
+    pending = [sentence_id for sentence_id in sentence_ids if sentence_id not in done_before]
+    limiter = RateLimiter(rate)
+    progress = Progress(len(pending), stream=stream)
+    failures: dict[int, str] = {}
+    local = threading.local()
+    sessions: list[Session] = []
+
+    def worker(sentence_id: int) -> None:
+        # Sessions are not thread-safe: every worker thread keeps its own.
+        if getattr(local, "service", None) is None:
+            db = Session(engine)
+            sessions.append(db)
+            local.service = TaskService(db, llm_client)
+        service: TaskService = local.service
+        try:
+            limiter.acquire()
+            service.run_chunk_task(sentence_id)
+            limiter.acquire()
+            service.run_chunk_lexeme_task(sentence_id)
+        except Exception:
+            service.session.rollback()
+            raise
+        checkpoint.mark(sentence_id)
+
+    def record(future) -> None:
+        exc = future.exception()
+        if exc is not None:
+            detail = getattr(exc, "detail", None) or str(exc)
+            failures[futures[future]] = str(detail)
+        progress.update(exc is None)
+
+    progress.render()
+    interrupted = False
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="reprocess")
+    futures = {pool.submit(worker, sentence_id): sentence_id for sentence_id in pending}
+    remaining = set(futures)
+    try:
+        while remaining:
+            finished, _ = wait(remaining, return_when=FIRST_COMPLETED)
+            for future in finished:
+                record(future)
+                remaining.discard(future)
+    except KeyboardInterrupt:
+        # Ctrl-C drops the queued sentences; the ones already running finish
+        # and reach the checkpoint, so the next run resumes after them.
+        interrupted = True
+        stream.write("\nInterrupted, waiting for running sentences to finish...")
+        pool.shutdown(wait=True, cancel_futures=True)
+        for future in remaining:
+            if not future.cancelled():
+                record(future)
+    finally:
+        pool.shutdown(wait=True)
+    stream.write("\n")
+    for db in sessions:
+        db.close()
+
+    with Session(engine) as session:
+        removed = cleanup_orphan_lexemes(session)
+    if not failures and not interrupted:
+        checkpoint.clear()
+    return {
+        "skipped": len(done_before & set(sentence_ids)),
+        "processed": progress.done,
+        "failed": failures,
+        "orphan_lexemes_removed": removed,
+        "interrupted": interrupted,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key and not args.dry_run:
+        print("ERROR: OPENAI_API_KEY is required.", file=sys.stderr)
+        raise SystemExit(1)
+    engine = get_engine()
+    checkpoint = Checkpoint(args.checkpoint)
+    if args.restart:
+        checkpoint.clear()
+
+    with Session(engine) as session:
+        target_ids = resolve_sentence_ids(session, args.sentence_id, args.answer_id, args.limit, args.since)
+    if not target_ids:
+        print("No sentences matched the criteria.")
+        return
+    print(f"Found {len(target_ids)} sentence(s) to re-split.")
+    if args.dry_run:
+        done = checkpoint.load()
+        for sentence_id in target_ids:
+            marker = "skip (checkpoint)" if sentence_id in done else "re-split"
+            print(f"[DRY RUN] Would {marker} sentence #{sentence_id}")
+        return
+
+    model = os.getenv("OPENAI_MODEL") or None
+    base_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+    llm_client = QuestionLLMClient(api_key=api_key, model=model, base_url=base_url)
+    report = reprocess_sentences(
+        engine,
+        llm_client,
+        target_ids,
+        workers=args.workers,
+        rate=args.rate,
+        checkpoint=checkpoint,
+    )
+    if report["skipped"]:
+        print(f"Skipped {report['skipped']} sentence(s) finished in an earlier run.")
+    print(f"Re-split {report['processed']} sentence(s).")
+    for sentence_id, detail in sorted(report["failed"].items()):
+        print(f"  #{sentence_id} failed: {detail}")
+    if report["failed"]:
+        print(f"Checkpoint kept at {checkpoint.path}; rerun to retry the failed sentences.")
+    if report["orphan_lexemes_removed"]:
+        print(f"Removed {report['orphan_lexemes_removed']} orphan lexeme(s).")
+    if report["interrupted"]:
+        print(f"Stopped early; checkpoint kept at {checkpoint.path}, rerun to resume.")
+        raise SystemExit(130)
+
+
+if __name__ == "__main__":
+    main()
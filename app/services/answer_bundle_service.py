@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import zlib
+from datetime import datetime, timezone
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session as DBSession, select
+
+from app.db.schemas import Answer, AnswerBundle
+from app.services.paragraph_service import ParagraphService
+
+BUNDLE_FORMAT = 1
+COMPRESSION_LEVEL = 6
+
+
+class AnswerBundleService:
+    """Study bundles: the whole paragraph tree of an answer as one compressed JSON row.
+
+    A bundle is written once per structure version, when the structure
+    pipeline succeeds, and never changes afterwards; its ETag is the hash of
+    its JSON. Older versions are dropped when a newer one is written.
+    """
+
+    def __init__(self, session: DBSession) -> None:
+        self.session = session
+
+    def current(self, answer_id: int) -> AnswerBundle:
+        """The bundle of the answer's current structure, in a single-row lookup.
+
+        Answers changed since their last bundle (or structured before bundles
+        existed) get theirs written here.
+        """
+        row = self.session.exec(
+            select(Answer.id, AnswerBundle)
+            .outerjoin(
+                AnswerBundle,
+                and_(
+                    AnswerBundle.answer_id == Answer.id,
+                    AnswerBundle.structure_version == Answer.structure_version,
+                ),
+            )
+            .where(Answer.id == answer_id)
+        ).first()
+        if row is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Answer not found")
+        bundle = row[1]
+        if bundle is None:
+            bundle = self.write(answer_id)
+            self.session.commit()
+        return bundle
+
+    def write(self, answer_id: int) -> AnswerBundle:
+        answer = self.session.get(Answer, answer_id)
+        if answer is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Answer not found")
+        # Triggers bump the version behind the ORM's back; read the stored value.
+        self.session.refresh(answer, ["structure_version"])
+        version = answer.structure_version
+        existing = self._find(answer_id, version)
+        if existing is not None:
+            return existing
+        document = {
+            "format": BUNDLE_FORMAT,
+            "answer_id": answer.id,
+            "answer_group_id": answer.answer_group_id,
+            "title": answer.title,
+            "structure_version": version,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "paragraphs": ParagraphService(self.session).tree_payload(answer_id),
+        }
+        raw = json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        payload = zlib.compress(raw, COMPRESSION_LEVEL)
+        # A concurrent writer of the same version wins; both built the same tree.
+        self.session.exec(
+            sqlite_insert(AnswerBundle)
+            .values(
+                answer_id=answer_id,
+                structure_version=version,
+                etag='"' + hashlib.sha256(raw).hexdigest() + '"',
+                payload=payload,
+                raw_size=len(raw),
+                stored_size=len(payload),
+                created_at=datetime.now(timezone.utc),
+            )
+            .on_conflict_do_nothing(index_elements=["answer_id", "structure_version"])
+        )
+        self.session.exec(
+            delete(AnswerBundle)
+            .where(AnswerBundle.answer_id == answer_id)
+            .where(AnswerBundle.structure_version < version)
+        )
+        return self._find(answer_id, version)
+
+    def _find(self, answer_id: int, version: int) -> AnswerBundle | None:
+        return self.session.exec(
+            select(AnswerBundle)
+            .where(AnswerBundle.answer_id == answer_id)
+            .where(AnswerBundle.structure_version == version)
+        ).first()
+
+
+def bundle_json(bundle: AnswerBundle) -> bytes:
+    return zlib.decompress(bundle.payload)
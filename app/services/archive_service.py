@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional, Sequence
+
+from sqlalchemy import Column, Index, MetaData, Table, and_, delete, func, insert, or_, select, union_all
+from sqlalchemy.engine import Connection
+from sqlmodel import Session as DBSession
+
+from app.db.schemas import LLMConversation, Session as SessionSchema, Task
+
+ARCHIVE_PATH_ENV = "ARCHIVE_DATABASE_PATH"
+DEFAULT_ARCHIVE_PATH = "./archive.db"
+ARCHIVE_SCHEMA = "archive"
+DEFAULT_BATCH_SIZE = 500
+
+# Days a finished task stays in the hot database, per status; TASK_RETENTION_DAYS_<STATUS>
+# overrides one. Pending and running tasks are never archived. Conversations follow
+# their task; those without a task use the "conversation" entry.
+DEFAULT_RETENTION_DAYS: dict[str, float] = {
+    "succeeded": 30.0,
+    "failed": 90.0,
+    "canceled": 7.0,
+    "timed_out": 7.0,
+    "conversation": 30.0,
+}
+
+
+def retention_days(key: str) -> float:
+    override = os.getenv(f"TASK_RETENTION_DAYS_{key.upper()}")
+    if override:
+        try:
+            return float(override)
+        except ValueError:
+            pass
+    return DEFAULT_RETENTION_DAYS[key]
+
+
+def _cold_copy(table: Table, metadata: MetaData, indexed: Sequence[str]) -> Table:
+    # Foreign keys are dropped: the rows they point to stay in the hot database.
+    columns = [Column(column.name, column.type, primary_key=column.primary_key) for column in table.columns]
+    cold = Table(table.name, metadata, *columns, schema=ARCHIVE_SCHEMA)
+    for name in indexed:
+        Index(f"ix_{table.name}_{name}", cold.c[name])
+    return cold
+
+
+_archive_metadata = MetaData()
+cold_tasks = _cold_copy(Task.__table__, _archive_metadata, ["session_id", "answer_id", "created_at"])
+cold_conversations = _cold_copy(
+    LLMConversation.__table__, _archive_metadata, ["session_id", "task_id", "created_at"]
+)
+
+
+class ArchiveService:
+    """Moves finished tasks and their conversations into a cold SQLite file.
+
+    The archive is ATTACHed to the current connection only when it is needed,
+    so regular queries never touch it.
+    """
+
+    def __init__(self, session: DBSession, archive_path: Optional[str | Path] = None) -> None:
+        self.session = session
+        self.path = Path(archive_path or os.getenv(ARCHIVE_PATH_ENV) or DEFAULT_ARCHIVE_PATH)
+
+    def archive(self, *, now: Optional[datetime] = None, batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+        now = now or datetime.now(timezone.utc)
+        moved = {"tasks": 0, "conversations": 0}
+        while True:
+            conn = self._connection()
+            task_ids = list(conn.execute(self._expired_tasks(now).limit(batch_size)).scalars())
+            if not task_ids:
+                break
+            moved["conversations"] += self._move(
+                conn,
+                LLMConversation.__table__,
+                cold_conversations,
+                LLMConversation.task_id.in_(task_ids),
+            )
+            moved["tasks"] += self._move(conn, Task.__table__, cold_tasks, Task.id.in_(task_ids))
+            self.session.commit()
+        while True:
+            conn = self._connection()
+            conversation_ids = list(conn.execute(self._expired_conversations(now).limit(batch_size)).scalars())
+            if not conversation_ids:
+                break
+            moved["conversations"] += self._move(
+                conn, LLMConversation.__table__, cold_conversations, LLMConversation.id.in_(conversation_ids)
+            )
+            self.session.commit()
+        return moved
+
+    def count_expired(self, *, now: Optional[datetime] = None) -> dict:
+        now = now or datetime.now(timezone.utc)
+        conn = self.session.connection()
+        tasks = self._expired_tasks(now).subquery()
+        conversations = self._expired_conversations(now).subquery()
+        return {
+            "tasks": conn.execute(select(func.count()).select_from(tasks)).scalar_one(),
+            "standalone_conversations": conn.execute(select(func.count()).select_from(conversations)).scalar_one(),
+        }
+
+    def archived_tasks(self, *, session_ids: Sequence[int] = (), answer_ids: Sequence[int] = ()) -> list[Task]:
+        conditions = []
+        if session_ids:
+            conditions.append(cold_tasks.c.session_id.in_(session_ids))
+        if answer_ids:
+            conditions.append(cold_tasks.c.answer_id.in_(answer_ids))
+        if not conditions:
+            return []
+        rows = self._connection().execute(
+            select(cold_tasks).where(or_(*conditions)).order_by(cold_tasks.c.created_at.desc())
+        )
+        return [Task(**row._mapping) for row in rows]
+
+    def archived_conversations(
+        self, *, session_ids: Sequence[int] = (), task_ids: Sequence[int] = ()
+    ) -> list[LLMConversation]:
+        conditions = []
+        if session_ids:
+            conditions.append(cold_conversations.c.session_id.in_(session_ids))
+        if task_ids:
+            conditions.append(cold_conversations.c.task_id.in_(task_ids))
+        if not conditions:
+            return []
+        rows = self._connection().execute(
+            select(cold_conversations)
+            .where(or_(*conditions))
+            .order_by(cold_conversations.c.created_at.desc())
+        )
+        return [LLMConversation(**row._mapping) for row in rows]
+
+    def _expired_tasks(self, now: datetime):
+        conditions = [
+            and_(Task.status == status, Task.updated_at < now - timedelta(days=retention_days(status)))
+            for status in ("succeeded", "failed", "canceled", "timed_out")
+        ]
+        # Tasks a session shows as its latest eval/compare/compose result stay hot.
+        referenced = [
+            select(column).where(column.is_not(None))
+            for column in (
+                SessionSchema.last_eval_task_id,
+                SessionSchema.last_compare_task_id,
+                SessionSchema.last_compose_task_id,
+            )
+        ]
+        return (
+            select(Task.id)
+            .where(or_(*conditions))
+            .where(Task.id.not_in(union_all(*referenced)))
+            .order_by(Task.id)
+        )
+
+    def _expired_conversations(self, now: datetime):
+        cutoff = now - timedelta(days=retention_days("conversation"))
+        return (
+            select(LLMConversation.id)
+            .where(LLMConversation.task_id.is_(None))
+            .where(LLMConversation.created_at < cutoff)
+            .order_by(LLMConversation.id)
+        )
+
+    def _move(self, conn: Connection, hot: Table, cold: Table, condition) -> int:
+        names = [column.name for column in cold.columns]
+        conn.execute(insert(cold).from_select(names, select(*[hot.c[name] for name in names]).where(condition)))
+        return conn.execute(delete(hot).where(condition)).rowcount or 0
+
+    def _connection(self) -> Connection:
+        conn = self.session.connection()
+        attached = {row[1] for row in conn.exec_driver_sql("PRAGMA database_list")}
+        if ARCHIVE_SCHEMA not in attached:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn.exec_driver_sql(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (str(self.path),))
+            _archive_metadata.create_all(conn)
+            self._ensure_archive_columns(conn)
+            self._reserve_archived_ids(conn)
+        return conn
+
+    def _reserve_archived_ids(self, conn: Connection) -> None:
+        # The hot tables use AUTOINCREMENT, so ids archived since then are never handed
+        # out again. Raise the sequence past older archives too, which may hold ids
+        # above the current hot maximum.
+        if not conn.exec_driver_sql("SELECT 1 FROM main.sqlite_master WHERE name = 'sqlite_sequence'").first():
+            return
+        for cold in (cold_tasks, cold_conversations):
+            archived_max = conn.execute(select(func.max(cold.c.id))).scalar()
+            if archived_max is None:
+                continue
+            updated = conn.exec_driver_sql(
+                "UPDATE main.sqlite_sequence SET seq = ? WHERE name = ? AND seq < ?",
+                (archived_max, cold.name, archived_max),
+            ).rowcount
+            if not updated:
+                conn.exec_driver_sql(
+                    "INSERT INTO main.sqlite_sequence (name, seq) SELECT ?, ? "
+                    "WHERE NOT EXISTS (SELECT 1 FROM main.sqlite_sequence WHERE name = ?)",
+                    (cold.name, archived_max, cold.name),
+                )
+
+    def _ensure_archive_columns(self, conn: Connection) -> None:
+        # Columns added to the hot tables by later migrations are added here too.
+        for cold in (cold_tasks, cold_conversations):
+            existing = {row[1] for row in conn.exec_driver_sql(f"PRAGMA {ARCHIVE_SCHEMA}.table_info('{cold.name}')")}
+            for column in cold.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=conn.dialect)
+                    conn.exec_driver_sql(
+                        f"ALTER TABLE {ARCHIVE_SCHEMA}.{cold.name} ADD COLUMN {column.name} {column_type}"
+                    )
+
+
+def vacuum(engine) -> None:
+    """Give the pages freed by archiving back to the filesystem."""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM")
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import LargeBinary, cast, func, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session as DBSession, select
+
+from app.db.schemas import LLMConversation, LLMPromptSegment
+from app.models.answer import LLMConversationRead, LLMConversationSummaryRead
+
+COMPRESSION_LEVEL = 6
+# Rendered system messages carry the prompt template and format instructions,
+# identical for every call of a purpose; per-call variables live in the human turn.
+SHARED_ROLES = {"system"}
+
+
+def _dumps(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _is_message(value: Any) -> bool:
+    return isinstance(value, dict) and "role" in value and ("content" in value or "content_ref" in value)
+
+
+class ConversationStore:
+    """Writes LLM conversations packed and reads them back as plain JSON.
+
+    A packed row keeps ``messages``/``result`` empty: both are zlib-compressed
+    into ``payload``, with shared system prompts swapped for a hash into
+    ``llm_prompt_segments``. Rows written before packing are read as they are.
+    """
+
+    def __init__(self, session: DBSession) -> None:
+        self.session = session
+
+    def build(self, *, messages: dict, result: dict, **fields: Any) -> LLMConversation:
+        raw_size = len(_dumps({"messages": messages, "result": result}))
+        packed_messages = self._extract_segments(messages)
+        payload = zlib.compress(_dumps({"messages": packed_messages, "result": result}), COMPRESSION_LEVEL)
+        return LLMConversation(
+            messages={},
+            result={},
+            payload=payload,
+            raw_size=raw_size,
+            stored_size=len(payload),
+            **fields,
+        )
+
+    def to_read(self, conversation: LLMConversation) -> LLMConversationRead:
+        return self.to_reads([conversation])[0]
+
+    def to_reads(self, conversations: Iterable[LLMConversation]) -> list[LLMConversationRead]:
+        rows = list(conversations)
+        unpacked: dict[int, dict] = {}
+        refs: set[str] = set()
+        for idx, row in enumerate(rows):
+            if row.payload is None:
+                continue
+            data = json.loads(zlib.decompress(row.payload))
+            unpacked[idx] = data
+            self._collect_refs(data.get("messages"), refs)
+        segments = self._load_segments(refs)
+        reads: list[LLMConversationRead] = []
+        for idx, row in enumerate(rows):
+            read = LLMConversationRead.model_validate(row)
+            data = unpacked.get(idx)
+            if data is not None:
+                read.messages = self._restore_segments(data.get("messages") or {}, segments)
+                read.result = data.get("result") or {}
+            reads.append(read)
+        return reads
+
+    def list_summaries(
+        self,
+        *,
+        session_id: Optional[int] = None,
+        task_id: Optional[int] = None,
+        before_id: Optional[int] = None,
+        limit: int = 50,
+    ) -> tuple[list[LLMConversationSummaryRead], Optional[int]]:
+        """One page of conversations without their payloads, newest first, plus the next before_id."""
+        # Rows written before packing have no recorded sizes; measure their JSON in bytes.
+        legacy_size = func.length(cast(LLMConversation.messages, LargeBinary)) + func.length(
+            cast(LLMConversation.result, LargeBinary)
+        )
+        statement = select(
+            LLMConversation.id,
+            LLMConversation.session_id,
+            LLMConversation.task_id,
+            LLMConversation.purpose,
+            LLMConversation.model_name,
+            LLMConversation.latency_ms,
+            LLMConversation.prompt_tokens,
+            LLMConversation.completion_tokens,
+            LLMConversation.cached_tokens,
+            LLMConversation.cost_usd,
+            func.coalesce(LLMConversation.raw_size, legacy_size).label("raw_size"),
+            func.coalesce(LLMConversation.stored_size, legacy_size).label("stored_size"),
+            LLMConversation.created_at,
+        )
+        if session_id is not None:
+            statement = statement.where(LLMConversation.session_id == session_id)
+        if task_id is not None:
+            statement = statement.where(LLMConversation.task_id == task_id)
+        if before_id is not None:
+            cursor = self.session.exec(
+                select(LLMConversation.created_at).where(LLMConversation.id == before_id)
+            ).first()
+            if cursor is None:
+                raise ValueError("before_id does not match a conversation")
+            statement = statement.where(
+                tuple_(LLMConversation.created_at, LLMConversation.id) < tuple_(cursor, before_id)
+            )
+        statement = statement.order_by(LLMConversation.created_at.desc(), LLMConversation.id.desc())
+        rows = self.session.exec(statement.limit(limit + 1)).all()
+        items = [LLMConversationSummaryRead(**row._mapping) for row in rows[:limit]]
+        return items, items[-1].id if len(rows) > limit else None
+
+    def storage_stats(self) -> dict:
+        packed_count, raw_bytes, payload_bytes = self.session.exec(
+            select(
+                func.count(LLMConversation.id),
+                func.coalesce(func.sum(LLMConversation.raw_size), 0),
+                func.coalesce(func.sum(LLMConversation.stored_size), 0),
+            ).where(LLMConversation.payload.is_not(None))
+        ).one()
+        legacy_count = self.session.exec(
+            select(func.count(LLMConversation.id)).where(LLMConversation.payload.is_(None))
+        ).one()
+        segment_count, segment_bytes = self.session.exec(
+            select(
+                func.count(LLMPromptSegment.id),
+                func.coalesce(func.sum(func.length(LLMPromptSegment.content)), 0),
+            )
+        ).one()
+        stored_bytes = payload_bytes + segment_bytes
+        return {
+            "packed_conversations": packed_count,
+            "legacy_conversations": legacy_count,
+            "prompt_segments": segment_count,
+            "raw_bytes": raw_bytes,
+            "stored_bytes": stored_bytes,
+            "saved_bytes": raw_bytes - stored_bytes,
+            "compression_ratio": round(raw_bytes / stored_bytes, 2) if stored_bytes else None,
+        }
+
+    def usage_stats(self, since: datetime) -> list[dict]:
+        """Calls, tokens, estimated cost and p50/p95 latency per purpose, with a per-model breakdown."""
+        window = LLMConversation.created_at >= since
+        totals = self.session.exec(
+            select(
+                LLMConversation.purpose,
+                LLMConversation.model_name,
+                func.count(LLMConversation.id),
+                func.coalesce(func.sum(LLMConversation.prompt_tokens), 0),
+                func.coalesce(func.sum(LLMConversation.completion_tokens), 0),
+                func.coalesce(func.sum(LLMConversation.cached_tokens), 0),
+                func.coalesce(func.sum(LLMConversation.cost_usd), 0.0),
+            )
+            .where(window)
+            .group_by(LLMConversation.purpose, LLMConversation.model_name)
+        ).all()
+        # Nearest-rank percentiles: rank each purpose's latencies and keep only the p50/p95 rows.
+        ranked = (
+            select(
+                LLMConversation.purpose,
+                LLMConversation.latency_ms,
+                func.row_number()
+                .over(partition_by=LLMConversation.purpose, order_by=LLMConversation.latency_ms)
+                .label("position"),
+                func.count().over(partition_by=LLMConversation.purpose).label("total"),
+            )
+            .where(window, LLMConversation.latency_ms.is_not(None))
+            .subquery()
+        )
+        percentile_ranks = {
+            "latency_p50_ms": (ranked.c.total * 50 + 99) // 100,
+            "latency_p95_ms": (ranked.c.total * 95 + 99) // 100,
+        }
+        latencies: dict[str, dict[str, int]] = {}
+        for key, rank in percentile_ranks.items():
+            for purpose, latency in self.session.exec(
+                select(ranked.c.purpose, ranked.c.latency_ms).where(ranked.c.position == rank)
+            ).all():
+                latencies.setdefault(purpose, {})[key] = latency
+
+        purposes: dict[str, dict] = {}
+        for purpose, model_name, calls, prompt_tokens, completion_tokens, cached_tokens, cost in totals:
+            model = {
+                "model_name": model_name,
+                "calls": calls,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "cached_tokens": cached_tokens,
+                "cost_usd": round(cost, 6),
+            }
+            entry = purposes.setdefault(
+                purpose,
+                {
+                    "purpose": purpose,
+                    "calls": 0,
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                    "cached_tokens": 0,
+                    "cost_usd": 0.0,
+                    **latencies.get(purpose, {}),
+                    "models": [],
+                },
+            )
+            for key in ("calls", "prompt_tokens", "completion_tokens", "cached_tokens", "cost_usd"):
+                entry[key] += model[key]
+            entry["cost_usd"] = round(entry["cost_usd"], 6)
+            entry["models"].append(model)
+        return sorted(purposes.values(), key=lambda item: item["purpose"])
+
+    def _extract_segments(self, value: Any) -> Any:
+        if _is_message(value) and value.get("role") in SHARED_ROLES and isinstance(value.get("content"), str):
+            packed = {key: item for key, item in value.items() if key != "content"}
+            packed["content_ref"] = self._save_segment(value["content"])
+            return packed
+        if isinstance(value, dict):
+            return {key: self._extract_segments(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._extract_segments(item) for item in value]
+        return value
+
+    def _save_segment(self, content: str) -> str:
+        raw = content.encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        self.session.exec(
+            sqlite_insert(LLMPromptSegment)
+            .values(hash=digest, content=zlib.compress(raw, COMPRESSION_LEVEL), raw_size=len(raw))
+            .on_conflict_do_nothing(index_elements=["hash"])
+        )
+        return digest
+
+    def _collect_refs(self, value: Any, refs: set[str]) -> None:
+        if isinstance(value, dict):
+            if isinstance(value.get("content_ref"), str):
+                refs.add(value["content_ref"])
+            for item in value.values():
+                self._collect_refs(item, refs)
+        elif isinstance(value, list):
+            for item in value:
+                self._collect_refs(item, refs)
+
+    def _load_segments(self, refs: set[str]) -> dict[str, str]:
+        if not refs:
+            return {}
+        rows = self.session.exec(
+            select(LLMPromptSegment.hash, LLMPromptSegment.content).where(LLMPromptSegment.hash.in_(refs))
+        ).all()
+        return {digest: zlib.decompress(content).decode("utf-8") for digest, content in rows}
+
+    def _restore_segments(self, value: Any, segments: dict[str, str]) -> Any:
+        if _is_message(value) and "content_ref" in value:
+            restored = {key: item for key, item in value.items() if key != "content_ref"}
+            restored["content"] = segments.get(value["content_ref"], "")
+            return restored
+        if isinstance(value, dict):
+            return {key: self._restore_segments(item, segments) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._restore_segments(item, segments) for item in value]
+        return value
+
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import re
+from difflib import SequenceMatcher
+from typing import NamedTuple
+
+from app.services.translation_memory_service import normalize_source
+
+# Below this many characters (draft + reference) both texts go to the LLM as they are.
+MIN_DIFF_CHARS = 600
+# Sentences at least this similar count as the same sentence.
+NEAR_IDENTICAL_RATIO = 0.9
+CONTEXT_SENTENCES = 1
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+
+def split_sentences(text: str) -> list[str]:
+    return [part.strip() for part in _SENTENCE_END.split(text or "") if part.strip()]
+
+
+def _omitted(count: int) -> str:
+    return f"[……此处 {count} 句与参考答案相同，已省略……]"
+
+
+class GapDiff(NamedTuple):
+    draft: str
+    reference: str
+    omitted_sentences: int
+    total_sentences: int
+
+
+def _same(left: str, right: str) -> bool:
+    return left == right or SequenceMatcher(None, left, right, autojunk=False).ratio() >= NEAR_IDENTICAL_RATIO
+
+
+def _keep_mask(matched: list[bool]) -> list[bool]:
+    keep = [not same for same in matched]
+    for idx, same in enumerate(matched):
+        if not same:
+            for near in range(max(0, idx - CONTEXT_SENTENCES), min(len(matched), idx + CONTEXT_SENTENCES + 1)):
+                keep[near] = True
+    return keep
+
+
+def _excerpt(sentences: list[str], keep: list[bool]) -> str:
+    parts: list[str] = []
+    skipped = 0
+    for sentence, kept in zip(sentences, keep):
+        if kept:
+            if skipped:
+                parts.append(_omitted(skipped))
+                skipped = 0
+            parts.append(sentence)
+        else:
+            skipped += 1
+    if skipped:
+        parts.append(_omitted(skipped))
+    return "\n".join(parts)
+
+
+def gap_diff(draft: str, reference: str) -> GapDiff:
+    """Draft and reference cut down to their divergent sentences, with context around each.
+
+    Sentences are aligned in order; identical or near-identical pairs are
+    replaced by an omission marker. Short texts are returned unchanged.
+    """
+    draft_sentences = split_sentences(draft)
+    reference_sentences = split_sentences(reference)
+    total = len(draft_sentences) + len(reference_sentences)
+    if not draft_sentences or not reference_sentences or len(draft) + len(reference) < MIN_DIFF_CHARS:
+        return GapDiff(draft, reference, 0, total)
+    left = [normalize_source(sentence) for sentence in draft_sentences]
+    right = [normalize_source(sentence) for sentence in reference_sentences]
+    draft_matched = [False] * len(left)
+    reference_matched = [False] * len(right)
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, left, right, autojunk=False).get_opcodes():
+        if tag == "equal":
+            draft_matched[i1:i2] = [True] * (i2 - i1)
+            reference_matched[j1:j2] = [True] * (j2 - j1)
+        elif tag == "replace":
+            # Reworded sentences: pair them in order when they are still nearly the same.
+            j = j1
+            for i in range(i1, i2):
+                for candidate in range(j, j2):
+                    if _same(left[i], right[candidate]):
+                        draft_matched[i] = reference_matched[candidate] = True
+                        j = candidate + 1
+                        break
+    draft_keep = _keep_mask(draft_matched)
+    reference_keep = _keep_mask(reference_matched)
+    omitted = draft_keep.count(False) + reference_keep.count(False)
+    if not omitted:
+        return GapDiff(draft, reference, 0, total)
+    return GapDiff(
+        _excerpt(draft_sentences, draft_keep),
+        _excerpt(reference_sentences, reference_keep),
+        omitted,
+        total,
+    )
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import math
+import os
+import threading
+from collections import Counter, OrderedDict
+from typing import NamedTuple, Optional
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import func
+from sqlmodel import Session as DBSession, select
+
+from app.db.schemas import Answer, AnswerGroup
+from app.services.translation_memory_service import normalize_source
+
+SHORTLIST_SIZE_ENV = "COMPARE_SHORTLIST_SIZE"
+REUSE_THRESHOLD_ENV = "COMPARE_LOCAL_REUSE_THRESHOLD"
+DEFAULT_SHORTLIST_SIZE = 8
+DEFAULT_REUSE_THRESHOLD = 0.9
+NGRAM_SIZES = (3, 4, 5)
+INDEX_CACHE_SIZE = 128
+
+# Indexes per engine and question, rebuilt when the question's groups or latest answers change.
+_index_cache: "WeakKeyDictionary[object, OrderedDict[int, tuple[tuple, GroupIndex]]]" = WeakKeyDictionary()
+_index_cache_lock = threading.Lock()
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name) or default)
+    except ValueError:
+        return default
+
+
+def shortlist_size() -> int:
+    return max(1, int(_env_number(SHORTLIST_SIZE_ENV, DEFAULT_SHORTLIST_SIZE)))
+
+
+def reuse_threshold() -> float:
+    """Similarity from which a draft reuses a group without asking the LLM; 0 turns it off."""
+    return _env_number(REUSE_THRESHOLD_ENV, DEFAULT_REUSE_THRESHOLD)
+
+
+def char_ngrams(text: str) -> Counter:
+    grams: Counter = Counter()
+    for word in normalize_source(text).split():
+        padded = f" {word} "
+        for size in NGRAM_SIZES:
+            for start in range(max(1, len(padded) - size + 1)):
+                grams[padded[start:start + size]] += 1
+    return grams
+
+
+class GroupMatch(NamedTuple):
+    answer_group_id: int
+    score: float
+
+
+class GroupIndex:
+    """TF-IDF vectors of character n-grams, one per answer group, compared by cosine."""
+
+    def __init__(self, documents: dict[int, str]) -> None:
+        counts = {group_id: char_ngrams(text) for group_id, text in documents.items()}
+        self.size = len(counts)
+        df: Counter = Counter()
+        for grams in counts.values():
+            df.update(grams.keys())
+        self.idf = {gram: math.log((1 + self.size) / (1 + freq)) + 1 for gram, freq in df.items()}
+        self.unseen_idf = math.log(1 + self.size) + 1
+        self.vectors = {group_id: self._vector(grams) for group_id, grams in counts.items()}
+
+    def _vector(self, grams: Counter) -> dict[str, float]:
+        weights = {
+            gram: (1 + math.log(count)) * self.idf.get(gram, self.unseen_idf) for gram, count in grams.items()
+        }
+        norm = math.sqrt(sum(value * value for value in weights.values()))
+        return {gram: value / norm for gram, value in weights.items()} if norm else {}
+
+    def rank(self, text: str) -> list[GroupMatch]:
+        query = self._vector(char_ngrams(text))
+        matches = [
+            GroupMatch(group_id, sum(weight * vector.get(gram, 0.0) for gram, weight in query.items()))
+            for group_id, vector in self.vectors.items()
+        ]
+        return sorted(matches, key=lambda match: (-match.score, match.answer_group_id))
+
+
+def group_index(session: DBSession, question_id: int) -> GroupIndex:
+    """The question's group index: each group's title, direction and latest answer text."""
+    rows = session.exec(
+        select(AnswerGroup.id, AnswerGroup.title, AnswerGroup.direction_descriptor, func.max(Answer.id))
+        .outerjoin(Answer, Answer.answer_group_id == AnswerGroup.id)
+        .where(AnswerGroup.question_id == question_id)
+        .group_by(AnswerGroup.id)
+        .order_by(AnswerGroup.id)
+    ).all()
+    fingerprint = tuple(tuple(row) for row in rows)
+    engine = session.get_bind()
+    with _index_cache_lock:
+        cache = _index_cache.setdefault(engine, OrderedDict())
+        cached = cache.get(question_id)
+        if cached is not None and cached[0] == fingerprint:
+            cache.move_to_end(question_id)
+            return cached[1]
+    latest_ids = [row[3] for row in rows if row[3] is not None]
+    texts = dict(
+        session.exec(select(Answer.answer_group_id, Answer.text).where(Answer.id.in_(latest_ids))).all()
+    ) if latest_ids else {}
+    index = GroupIndex(
+        {
+            group_id: " ".join(part for part in (title, descriptor, texts.get(group_id)) if part)
+            for group_id, title, descriptor, _ in rows
+        }
+    )
+    with _index_cache_lock:
+        cache[question_id] = (fingerprint, index)
+        while len(cache) > INDEX_CACHE_SIZE:
+            cache.popitem(last=False)
+    return index
+
+
+def local_reuse(matches: list[GroupMatch], threshold: Optional[float] = None) -> Optional[GroupMatch]:
+    threshold = reuse_threshold() if threshold is None else threshold
+    if threshold <= 0 or not matches or matches[0].score < threshold:
+        return None
+    return matches[0]
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict, deque
+from typing import Deque, Optional
+
+HISTORY_WINDOW = 5
+SUMMARY_MAX_LINES = 6
+SUMMARY_SNIPPET_CHARS = 60
+TOPIC_SNIPPET_CHARS = 20
+TOPIC_MAX_ITEMS = 8
+
+# Sessions whose invalidation version is remembered; the least recently changed are evicted.
+MAX_TRACKED_SESSIONS = 4096
+
+# Versions come from one process-wide counter. An evicted session reads as the highest
+# evicted version: a context loaded before its last change then still looks stale, and
+# at worst another session's context reloads once too often.
+_versions: OrderedDict[int, int] = OrderedDict()
+_versions_lock = threading.Lock()
+_version_counter = 0
+_evicted_floor = 0
+
+
+def live_context_version(session_id: int) -> int:
+    with _versions_lock:
+        return _versions.get(session_id, _evicted_floor)
+
+
+def invalidate_live_context(session_id: Optional[int]) -> None:
+    """Mark cached live contexts of a session as stale after the session changed."""
+    global _version_counter, _evicted_floor
+    if session_id is None:
+        return
+    with _versions_lock:
+        _version_counter += 1
+        _versions[session_id] = _version_counter
+        _versions.move_to_end(session_id)
+        while len(_versions) > MAX_TRACKED_SESSIONS:
+            _, evicted = _versions.popitem(last=False)
+            _evicted_floor = max(_evicted_floor, evicted)
+
+
+def _clip(text: Optional[str], limit: int) -> str:
+    cleaned = " ".join((text or "").split())
+    if len(cleaned) <= limit:
+        return cleaned
+    return cleaned[: limit - 1] + "…"
+
+
+class LiveReplyContext:
+    """Prompt inputs for one live websocket, loaded once and updated per turn.
+
+    The last HISTORY_WINDOW turns are kept verbatim. Older turns are folded into a
+    rolling summary whose size is bounded, so the prompt stays flat as the
+    dialogue grows instead of silently losing the early turns.
+    """
+
+    def __init__(
+        self,
+        *,
+        session_id: int,
+        question_type: str,
+        question_title: str,
+        question_body: str,
+        direction_hint: str,
+        dialogue_profile_hint: str,
+    ) -> None:
+        self.session_id = session_id
+        self.question_type = question_type
+        self.question_title = question_title
+        self.question_body = question_body
+        self.direction_hint = direction_hint
+        self.dialogue_profile_hint = dialogue_profile_hint
+        self.version = live_context_version(session_id)
+        self.history: Deque[dict] = deque(maxlen=HISTORY_WINDOW)
+        self.summary_lines: Deque[str] = deque(maxlen=SUMMARY_MAX_LINES)
+        self.earlier_topics: Deque[str] = deque(maxlen=TOPIC_MAX_ITEMS)
+        self.folded_turns = 0
+        self._topics: list[str] = []
+
+    def is_stale(self) -> bool:
+        return self.version != live_context_version(self.session_id)
+
+    def remember(self, turn: dict) -> None:
+        if len(self.history) == self.history.maxlen:
+            self._summarize(self.history[0])
+        self.history.append(
+            {
+                "turn_index": turn.get("turn_index"),
+                "candidate_query": turn.get("candidate_query"),
+                "examiner_reply": turn.get("examiner_reply"),
+                "candidate_followup": turn.get("candidate_followup"),
+            }
+        )
+
+    def history_summary(self) -> Optional[str]:
+        lines = []
+        if self.folded_turns:
+            topics = " / ".join(self.earlier_topics)
+            lines.append(f"更早 {self.folded_turns} 轮话题：{topics}")
+        lines.extend(self.summary_lines)
+        return "\n".join(lines) or None
+
+    def build_request(self, turn_index: int, candidate_query: str) -> dict:
+        return {
+            "question_type": self.question_type,
+            "question_title": self.question_title,
+            "question_body": self.question_body,
+            "history": list(self.history),
+            "history_summary": self.history_summary(),
+            "candidate_query": candidate_query,
+            "direction_hint": self.direction_hint,
+            "dialogue_profile_hint": self.dialogue_profile_hint,
+            "turn_index": turn_index,
+        }
+
+    def _summarize(self, turn: dict) -> None:
+        if len(self.summary_lines) == self.summary_lines.maxlen:
+            self.folded_turns += 1
+            self.earlier_topics.append(self._topics.pop(0))
+        query = _clip(turn.get("candidate_query"), SUMMARY_SNIPPET_CHARS)
+        reply = _clip(turn.get("examiner_reply"), SUMMARY_SNIPPET_CHARS) or "（未回复）"
+        self.summary_lines.append(f"Turn {turn.get('turn_index')}: 考生「{query}」→ 考官「{reply}」")
+        self._topics.append(_clip(turn.get("candidate_query"), TOPIC_SNIPPET_CHARS))
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session as DBSession
+
+from app.models.live import LiveTurnRead
+from app.services.live_context import LiveReplyContext
+from app.services.llm_service import QuestionLLMClient
+from app.services.session_service import SessionService
+from app.services.task_service import TaskService
+
+
+# A small pool shared by all sockets keeps DB work off the event loop without one
+# socket's reads queuing behind another's; each socket still runs its steps in order.
+# SQLite serializes the writes themselves through its busy timeout.
+LIVE_DB_WORKERS = max(1, int(os.getenv("LIVE_DB_WORKERS", "4")))
+_db_executor = ThreadPoolExecutor(max_workers=LIVE_DB_WORKERS, thread_name_prefix="live-db")
+
+
+class LiveStreamWorker:
+    """DB and LLM access for one live websocket, kept off the event loop.
+
+    DB work runs on the shared live-db pool; the LLM call runs in the regular
+    threadpool so a slow completion never holds up other sockets' DB steps.
+    """
+
+    def __init__(self, engine, llm_client: QuestionLLMClient, session_id: int) -> None:
+        self.engine = engine
+        self.llm_client = llm_client
+        self.session_id = session_id
+        self._db: Optional[DBSession] = None
+        self._service: Optional[SessionService] = None
+        self._task_service: Optional[TaskService] = None
+        self._context: Optional[LiveReplyContext] = None
+
+    async def _run_db(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_db_executor, partial(self._step, func, *args, **kwargs))
+
+    def _step(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        try:
+            return func(*args, **kwargs)
+        finally:
+            # Hand the pooled connection back between steps; a socket idling
+            # between turns must not pin one while others need it.
+            if self._db is not None:
+                self._db.close()
+
+    async def start(self) -> None:
+        await self._run_db(self._open)
+
+    async def create_turn(self, candidate_query: str, candidate_followup: Optional[str]) -> LiveTurnRead:
+        return await self._run_db(self._create_turn, candidate_query, candidate_followup)
+
+    async def generate_reply(
+        self,
+        turn: LiveTurnRead,
+        on_delta: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> dict:
+        request = await self._run_db(self._prepare_reply, turn)
+        if on_delta is None:
+            return await run_in_threadpool(self._task_service.complete_live_reply, request)
+        loop = asyncio.get_running_loop()
+        deltas: asyncio.Queue[Optional[str]] = asyncio.Queue()
+
+        def push_delta(delta: str) -> None:
+            loop.call_soon_threadsafe(deltas.put_nowait, delta)
+
+        reply_task = asyncio.ensure_future(
+            run_in_threadpool(self._task_service.complete_live_reply, request, push_delta)
+        )
+        reply_task.add_done_callback(lambda _: deltas.put_nowait(None))
+        try:
+            while (delta := await deltas.get()) is not None:
+                await on_delta(delta)
+        except BaseException:
+            reply_task.cancel()
+            raise
+        return await reply_task
+
+    async def record_reply(
+        self,
+        turn: LiveTurnRead,
+        reply_text: str,
+        meta: Optional[dict],
+        conversation: Optional[dict] = None,
+    ) -> None:
+        await self._run_db(self._record_reply, turn, reply_text, meta, conversation)
+
+    async def mark_error(self, turn: LiveTurnRead, message: str) -> None:
+        await self._run_db(self._mark_error, turn, message)
+
+    async def update_status(self, status_value: str) -> None:
+        await self._run_db(self._service.update_live_status, self.session_id, status_value)
+
+    async def close(self) -> None:
+        await self._run_db(self._close)
+
+    def _open(self) -> None:
+        self._db = DBSession(self.engine)
+        self._service = SessionService(self._db)
+        self._task_service = TaskService(self._db, self.llm_client)
+        entity = self._service._get_session_entity(self.session_id)
+        self._service._ensure_live_mode(entity, require_active=False)
+
+    def _create_turn(self, candidate_query: str, candidate_followup: Optional[str]) -> LiveTurnRead:
+        turn = self._service.create_live_turn(self.session_id, candidate_query, candidate_followup)
+        return LiveTurnRead.model_validate(turn)
+
+    def _prepare_reply(self, turn: LiveTurnRead) -> dict:
+        if self._context is None or self._context.is_stale():
+            self._context = self._task_service.load_live_context(
+                self.session_id, before_turn_index=turn.turn_index
+            )
+        return self._context.build_request(turn.turn_index, turn.candidate_query)
+
+    def _record_reply(
+        self, turn: LiveTurnRead, reply_text: str, meta: Optional[dict], conversation: Optional[dict]
+    ) -> None:
+        self._service.record_live_reply(turn.id, reply_text, meta, conversation)
+        self._remember(turn, reply_text)
+
+    def _mark_error(self, turn: LiveTurnRead, message: str) -> None:
+        self._service.mark_live_turn_error(turn.id, message)
+        self._remember(turn, None)
+
+    def _remember(self, turn: LiveTurnRead, reply_text: Optional[str]) -> None:
+        if self._context is None:
+            return
+        payload = turn.model_dump()
+        payload["examiner_reply"] = reply_text
+        self._context.remember(payload)
+
+    def _close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
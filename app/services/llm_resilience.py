@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Optional, TypeVar
+
+import openai
+
+from app.services.task_control import sleep_interruptible
+
+T = TypeVar("T")
+
+# LLM_<KEY> overrides one; 0 requests/tokens per minute means unlimited.
+DEFAULT_RESILIENCE: dict[str, float] = {
+    "max_retries": 2,
+    "backoff_base": 0.5,
+    "backoff_max": 8.0,
+    "requests_per_minute": 0,
+    "tokens_per_minute": 0,
+    "breaker_failures": 5,
+    "breaker_reset_seconds": 30.0,
+}
+# Rough prompt size estimate for the tokens/minute budget.
+CHARS_PER_TOKEN = 4
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+def resilience_setting(key: str) -> float:
+    override = os.getenv(f"LLM_{key.upper()}")
+    if override:
+        try:
+            return float(override)
+        except ValueError:
+            pass
+    return DEFAULT_RESILIENCE[key]
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Provider-side failures worth another attempt: timeouts, dropped connections, 429 and 5xx."""
+    if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code in RETRYABLE_STATUS or exc.status_code >= 500
+    return isinstance(exc, (TimeoutError, ConnectionError))
+
+
+def _retry_after(exc: BaseException) -> float:
+    response = getattr(exc, "response", None)
+    try:
+        return float(response.headers.get("retry-after") or 0) if response is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, model: str, retry_in: float) -> None:
+        super().__init__(f"LLM 服务 {model} 暂时不可用，约 {max(1, round(retry_in))} 秒后重试")
+        self.retry_in = retry_in
+
+
+class TokenBucket:
+    """Per-minute budget refilled continuously; reservations past the budget return how long to wait."""
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        if self.capacity <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+            self.level -= min(amount, self.capacity)
+            return -self.level / self.rate if self.level < 0 else 0.0
+
+
+class CircuitBreaker:
+    """Opens after consecutive provider failures; after the reset period one trial call may go through."""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> Optional[float]:
+        """None when the call may proceed, otherwise the seconds until the next trial."""
+        with self._lock:
+            if self.state == "closed":
+                return None
+            retry_in = self.opened_at + self.reset_seconds - time.monotonic()
+            if self.state == "open" and retry_in <= 0:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial:
+                self._trial = True
+                return None
+            return max(retry_in, 0.0)
+
+    def record(self, healthy: bool) -> None:
+        with self._lock:
+            self._trial = False
+            if healthy:
+                self.state, self.failures = "closed", 0
+                return
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state, self.opened_at = "open", time.monotonic()
+
+    def abandon_trial(self) -> None:
+        with self._lock:
+            self._trial = False
+
+
+class LLMResilience:
+    """Retry with jittered backoff, shared rate limits and per-model circuit breakers for LLM calls."""
+
+    def __init__(
+        self,
+        *,
+        max_retries: int,
+        backoff_base: float,
+        backoff_max: float,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        breaker_failures: int,
+        breaker_reset_seconds: float,
+    ) -> None:
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.breaker_failures = breaker_failures
+        self.breaker_reset_seconds = breaker_reset_seconds
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._metrics: dict[str, Counter] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "LLMResilience":
+        return cls(
+            max_retries=int(resilience_setting("max_retries")),
+            backoff_base=resilience_setting("backoff_base"),
+            backoff_max=resilience_setting("backoff_max"),
+            requests_per_minute=resilience_setting("requests_per_minute"),
+            tokens_per_minute=resilience_setting("tokens_per_minute"),
+            breaker_failures=int(resilience_setting("breaker_failures")),
+            breaker_reset_seconds=resilience_setting("breaker_reset_seconds"),
+        )
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(model)
+            if breaker is None:
+                breaker = self._breakers[model] = CircuitBreaker(self.breaker_failures, self.breaker_reset_seconds)
+            return breaker
+
+    def _count(self, purpose: str, key: str, amount: float = 1) -> None:
+        with self._lock:
+            self._metrics.setdefault(purpose, Counter())[key] += amount
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def call(
+        self,
+        purpose: str,
+        model: str,
+        func: Callable[[], T],
+        *,
+        prompt_chars: int = 0,
+        retry: bool = True,
+    ) -> T:
+        breaker = self.breaker(model)
+        attempts = 1 + (self.max_retries if retry else 0)
+        self._count(purpose, "calls")
+        for attempt in range(attempts):
+            retry_in = breaker.before_call()
+            if retry_in is not None:
+                self._count(purpose, "short_circuited")
+                raise CircuitOpenError(model, retry_in)
+            recorded = False
+            try:
+                wait = max(self.requests.reserve(1), self.tokens.reserve(prompt_chars / CHARS_PER_TOKEN))
+                if wait > 0:
+                    self._count(purpose, "throttled_ms", wait * 1000)
+                    sleep_interruptible(wait)
+                result = func()
+            except Exception as exc:
+                retryable = is_retryable(exc)
+                # Anything but a provider failure means the provider answered.
+                breaker.record(healthy=not retryable)
+                recorded = True
+                if not retryable or attempt == attempts - 1:
+                    self._count(purpose, "failed")
+                    raise
+                self._count(purpose, "retries")
+                sleep_interruptible(max(self.backoff(attempt), _retry_after(exc)))
+                continue
+            finally:
+                if not recorded and breaker.state == "half_open":
+                    # Interrupted before an outcome (task canceled): let another call try.
+                    breaker.abandon_trial()
+            breaker.record(healthy=True)
+            self._count(purpose, "succeeded")
+            return result
+        raise AssertionError("unreachable")
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            purposes = {purpose: dict(counter) for purpose, counter in self._metrics.items()}
+            breakers = {
+                model: {"state": breaker.state, "consecutive_failures": breaker.failures}
+                for model, breaker in self._breakers.items()
+            }
+        return {"purposes": purposes, "breakers": breakers}
+
+
+_shared: Optional[LLMResilience] = None
+_shared_lock = threading.Lock()
+
+
+def get_resilience() -> LLMResilience:
+    """The process-wide layer, so every client shares the same limits and breakers."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = LLMResilience.from_env()
+        return _shared
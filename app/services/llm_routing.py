@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+import yaml
+from pydantic import BaseModel, PositiveFloat, PositiveInt
+
+ROUTING_PATH_ENV = "LLM_ROUTING_PATH"
+DEFAULT_ROUTING_PATH = Path("config/llm_routing.yaml")
+PURPOSES = (
+    "metadata",
+    "eval",
+    "compose",
+    "outline",
+    "compare",
+    "gap_highlight",
+    "refine",
+    "structure",
+    "translate",
+    "chunk",
+    "lexeme",
+    "live",
+)
+
+_cache: dict[Path, tuple[int, dict[str, "ModelRoute"]]] = {}
+_cache_lock = threading.Lock()
+
+
+class ModelRoute(BaseModel):
+    """Model settings for one purpose; unset fields fall back to the client's defaults."""
+
+    model: Optional[str] = None
+    fallback: Optional[str] = None
+    timeout: Optional[PositiveFloat] = None
+    fallback_timeout: Optional[PositiveFloat] = None
+    max_tokens: Optional[PositiveInt] = None
+
+    def is_default(self) -> bool:
+        return not self.model_dump(exclude_none=True)
+
+
+def parse_routing(data: dict) -> dict[str, ModelRoute]:
+    defaults = (data or {}).get("defaults") or {}
+    purposes = (data or {}).get("purposes") or {}
+    unknown = set(purposes) - set(PURPOSES)
+    if unknown:
+        raise ValueError(f"Unknown LLM routing purposes: {', '.join(sorted(unknown))}")
+    return {
+        purpose: ModelRoute.model_validate({**defaults, **(purposes.get(purpose) or {})})
+        for purpose in PURPOSES
+    }
+
+
+def load_routing(path: Path | str | None = None) -> dict[str, ModelRoute]:
+    """The routing table from YAML, re-read only when the file changes; empty if there is none."""
+    path = Path(path or os.getenv(ROUTING_PATH_ENV) or DEFAULT_ROUTING_PATH)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    routing = parse_routing(yaml.safe_load(path.read_text(encoding="utf-8")) or {})
+    with _cache_lock:
+        _cache[path] = (mtime, routing)
+    return routing
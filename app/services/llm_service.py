@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 import json
-from typing import List, Optional
+import time
+from typing import Any, Callable, List, Optional
 
+from langchain_core.runnables import Runnable
+from langchain_core.utils.json import parse_json_markdown
 from langchain_openai import ChatOpenAI
 
 from app.llm import (
@@ -19,7 +22,18 @@ from app.llm import (
     build_refine_answer_chain,
     build_outline_chain,
     build_live_reply_chain,
+    LiveReplySchema,
 )
+from app.services.llm_resilience import CircuitOpenError, LLMResilience, get_resilience
+from app.services.llm_routing import ModelRoute
+from app.services.llm_usage import UsageCollector
+from app.services.task_control import run_interruptible
+
+
+def _prompt_chars(payload) -> int:
+    if isinstance(payload, dict):
+        return sum(len(str(value)) for value in payload.values())
+    return sum(len(str(getattr(message, "content", message))) for message in payload)
 
 
 class LLMError(Exception):
@@ -33,23 +47,23 @@ class QuestionLLMClient:
         model: Optional[str] = None,
         base_url: str = "https://api.openai.com/v1",
         timeout: float = 120.0,
+        routing: Optional[dict[str, ModelRoute]] = None,
+        resilience: Optional[LLMResilience] = None,
     ) -> None:
         self.api_key = api_key
         self.model = model or "gpt-4o-mini"
         self.base_url = base_url.rstrip("/") if base_url else None
         self.timeout = timeout
-        self._llm = ChatOpenAI(
-            model=self.model,
-            api_key=self.api_key,
-            base_url=self.base_url,
-            timeout=self.timeout,
-        )
-        self._metadata_chain, self._metadata_parser = build_metadata_chain(self._llm)
+        self.routing = routing or {}
+        self._resilience = resilience or get_resilience()
+        self._routed: dict[str, Runnable] = {}
+        self._llm = self._chat_model(self.model)
+        self._metadata_chain, self._metadata_parser = build_metadata_chain(self._model("metadata"))
         self._eval_chain, self._eval_parser, self._eval_prompt = build_evaluation_chain(self._llm)
         self._compose_chain, self._compose_parser, self._compose_prompt = build_compose_chain(self._llm)
-        self._structure_chain, self._structure_parser = build_structure_chain(self._llm)
+        self._structure_chain, self._structure_parser = build_structure_chain(self._model("structure"))
         self._sentence_translation_chain, self._sentence_translation_parser = build_sentence_translation_chain(
-            self._llm
+            self._model("translate")
         )
         (
             self._chunk_split_chain,
@@ -97,15 +111,18 @@ class QuestionLLMClient:
     ) -> GeneratedQuestionMetadata:
         existing_tags = ", ".join(tags) if tags else "无"
         try:
-            result = self._metadata_chain.invoke(
+            result, usage = self._invoke(
+                "metadata",
                 {
                     "slug": slug or "未知",
                     "body": body,
                     "question_type": question_type,
                     "existing_tags": existing_tags,
-                    "format_instructions": self._metadata_parser.get_format_instructions(),
-                }
+                },
+                self._metadata_chain,
             )
+        except CircuitOpenError as exc:
+            raise LLMError(str(exc)) from exc
         except Exception as exc:  # pragma: no cover - LangChain errors depend on runtime env
             raise LLMError("LLM 请求失败，请检查配置或响应格式") from exc
 
@@ -122,7 +139,7 @@ class QuestionLLMClient:
                 cleaned = tag.strip()
                 if cleaned and cleaned not in normalized_tags:
                     normalized_tags.append(cleaned)
-        return GeneratedQuestionMetadata(title=title, tags=normalized_tags[:5])
+        return GeneratedQuestionMetadata(title=title, tags=normalized_tags[:5], usage=usage)
 
     def evaluate_answer(
         self,
@@ -140,9 +157,8 @@ class QuestionLLMClient:
                 question_title=question_title,
                 question_body=question_body,
                 answer_draft=answer_draft,
-                format_instructions=self._eval_parser.get_format_instructions(),
             )
-            raw = self._llm.invoke(prompt_messages)
+            raw, usage = self._invoke("eval", prompt_messages)
             response_text = getattr(raw, "content", raw)
             if isinstance(response_text, list):
                 response_text = "\n".join(
@@ -155,6 +171,9 @@ class QuestionLLMClient:
             else:
                 result = dict(parsed)
             result["_prompt_messages"] = self._serialize_messages(prompt_messages)
+            result["_usage"] = usage
+        except CircuitOpenError as exc:
+            raise LLMError(str(exc)) from exc
         except Exception as exc:  # pragma: no cover
             raise LLMError("LLM 请求失败，请检查配置或响应格式") from exc
         return result
@@ -182,9 +201,8 @@ class QuestionLLMClient:
                 question_body=question_body,
                 sentence_text=sentence_text,
                 known_issues=issues_block,
-                format_instructions=self._chunk_split_parser.get_format_instructions(),
             )
-            raw = self._llm.invoke(prompt_messages)
+            raw, usage = self._invoke("chunk", prompt_messages)
             response_text = getattr(raw, "content", raw)
             if isinstance(response_text, list):
                 response_text = "\n".join(
@@ -194,6 +212,9 @@ class QuestionLLMClient:
             parsed = self._chunk_split_parser.parse(response_text)
             result = parsed.model_dump() if hasattr(parsed, "model_dump") else dict(parsed)
             result["_prompt_messages"] = self._serialize_messages(prompt_messages)
+            result["_usage"] = usage
+        except CircuitOpenError as exc:
+            raise LLMError(str(exc)) from exc
         except Exception as exc:  # pragma: no cover
             raise LLMError("LLM 请求失败，请检查配置或响应格式") from exc
         return result
@@ -217,9 +238,8 @@ class QuestionLLMClient:
                 question_title=question_title,
                 sentence_text=sentence_text,
                 chunks_block=chunks_block,
-                format_instructions=self._chunk_lexeme_parser.get_format_instructions(),
             )
-            raw = self._llm.invoke(prompt_messages)
+            raw, usage = self._invoke("lexeme", prompt_messages)
             response_text = getattr(raw, "content", raw)
             if isinstance(response_text, list):
                 response_text = "\n".join(
@@ -229,6 +249,9 @@ class QuestionLLMClient:
             parsed = self._chunk_lexeme_parser.parse(response_text)
             result = parsed.model_dump() if hasattr(parsed, "model_dump") else dict(parsed)
             result["_prompt_messages"] = self._serialize_messages(prompt_messages)
+            result["_usage"] = usage
+        except CircuitOpenError as exc:
+            raise LLMError(str(exc)) from exc
         except Exception as exc:  # pragma: no cover
             raise LLMError("LLM 请求失败，请检查配置或响应格式") from exc
         return result
@@ -255,9 +278,8 @@ class QuestionLLMClient:
                 dialogue_profile_hint=dialogue_block,
                 eval_summary=eval_block,
                 answer_draft=answer_draft,
-                format_instructions=self._compose_parser.get_format_instructions(),
             )
-            raw = self._llm.invoke(prompt_messages)
+            raw, usage = self._invoke("compose", prompt_messages)
             response_text = getattr(raw, "content", raw)
             if isinstance(response_text, list):
                 response_text = "\n".join(
@@ -270,6 +292,9 @@ class QuestionLLMClient:
             else:
                 result = dict(parsed)
             result["_prompt_messages"] = self._serialize_messages(prompt_messages)
+            result["_usage"] = usage
+        except CircuitOpenError as exc:
+            raise LLMError(str(exc)) from exc
         except Exception as exc:  # pragma: no cover
             raise LLMError("LLM 请求失败，请检查配置或响应格式") from exc
         return result
@@ -288,9 +313,8 @@ class QuestionLLMClient:
                 question_title=question_title,
                 question_body=question_body,
                 answer_draft=answer_draft or "（考生尚未填写草稿）",
-                format_instructions=self._outline_parser.get_format_instructions(),
             )
-            raw = self._llm.invoke(prompt_messages)
+            raw, usage = self._invoke("outline", prompt_messages)
             response_text = getattr(raw, "content", raw)
             if isinstance(response_text, list):
                 response_text = "\n".join(
@@ -300,6 +324,9 @@ class QuestionLLMClient:
             parsed = self._outline_parser.parse(response_text)
             result = parsed.model_dump() if hasattr(parsed, "model_dump") else dict(parsed)
             result["_prompt_messages"] = self._serialize_messages(prompt_messages)
+            result["_usage"] = usage
+        except CircuitOpenError as exc:
+            raise LLMError(str(exc)) from exc
         except Exception as exc:  # pragma: no cover
             raise LLMError("LLM 请求失败，请检查配置或响应格式") from exc
         return result
@@ -335,9 +362,8 @@ class QuestionLLMClient:
                 answer_draft=answer_draft,
                 direction_plan=direction_plan or "暂无题意方向候选",
                 existing_groups=groups_block,
-                format_instructions=self._answer_comparator_parser.get_format_instructions(),
             )
-            raw = self._llm.invoke(prompt_messages)
+            raw, usage = self._invoke("compare", prompt_messages)
             response_text = getattr(raw, "content", raw)
             if isinstance(response_text, list):
                 response_text = "\n".join(
@@ -350,6 +376,9 @@ class QuestionLLMClient:
             else:
                 result = dict(parsed)
             result["_prompt_messages"] = self._serialize_messages(prompt_messages)
+            result["_usage"] = usage
+        except CircuitOpenError as exc:
+            raise LLMError(str(exc)) from exc
         except Exception as exc:  # pragma: no cover
             raise LLMError("对比现有答案组失败") from exc
         return result
@@ -365,6 +394,8 @@ class QuestionLLMClient:
         direction_hint: str | None = None,
         dialogue_profile_hint: str | None = None,
         turn_index: int,
+        history_summary: str | None = None,
+        on_delta: Callable[[str], None] | None = None,
     ) -> dict:
         history_lines = []
         for item in history:
@@ -385,25 +416,67 @@ class QuestionLLMClient:
                 question_body=question_body,
                 direction_hint=direction_hint or "无特定方向，可保持原有主线。",
                 dialogue_profile_hint=dialogue_profile_hint or "无特殊人设要求。",
+                history_summary=history_summary or "（无）",
                 history_block=history_block,
                 candidate_query=candidate_query,
                 turn_index=turn_index,
-                format_instructions=self._live_reply_parser.get_format_instructions(),
             )
-            raw = self._llm.invoke(prompt_messages)
-            response_text = getattr(raw, "content", raw)
-            if isinstance(response_text, list):
-                response_text = "\n".join(
-                    item["text"] if isinstance(item, dict) and item.get("type") == "text" else str(item)
-                    for item in response_text
+            if on_delta is None:
+                raw, usage = self._invoke("live", prompt_messages)
+                response_text = getattr(raw, "content", raw)
+                if isinstance(response_text, list):
+                    response_text = "\n".join(
+                        item["text"] if isinstance(item, dict) and item.get("type") == "text" else str(item)
+                        for item in response_text
+                    )
+            else:
+                collector = UsageCollector(self._model_name("live"))
+                started = time.perf_counter()
+                # Deltas already sent cannot be taken back, so a stream is never retried.
+                response_text = self._resilience.call(
+                    "live",
+                    self._model_name("live"),
+                    lambda: self._stream_live_reply_text(prompt_messages, on_delta, collector),
+                    prompt_chars=_prompt_chars(prompt_messages),
+                    retry=False,
                 )
+                usage = collector.usage(int((time.perf_counter() - started) * 1000))
             parsed = self._live_reply_parser.parse(response_text)
-            result = parsed.model_dump() if hasattr(parsed, "model_dump") else dict(parsed)
+            result = LiveReplySchema.model_validate(parsed).model_dump()
             result["_prompt_messages"] = self._serialize_messages(prompt_messages)
+            result["_usage"] = usage
+        except CircuitOpenError as exc:
+            raise LLMError(str(exc)) from exc
         except Exception as exc:  # pragma: no cover
             raise LLMError("实时对话生成失败") from exc
         return result
 
+    def _stream_live_reply_text(
+        self, prompt_messages, on_delta: Callable[[str], None], collector: UsageCollector
+    ) -> str:
+        buffer = ""
+        emitted = ""
+        for chunk in self._model("live").stream(prompt_messages, {"callbacks": [collector]}):
+            content = getattr(chunk, "content", chunk)
+            if isinstance(content, list):
+                content = "".join(
+                    item["text"] if isinstance(item, dict) and item.get("type") == "text" else str(item)
+                    for item in content
+                )
+            if not content:
+                continue
+            buffer += content
+            # The model streams the JSON envelope; only the growing "reply" value is forwarded.
+            try:
+                partial = parse_json_markdown(buffer)
+            except ValueError:
+                continue
+            reply = partial.get("reply") if isinstance(partial, dict) else None
+            if isinstance(reply, str) and len(reply) > len(emitted) and reply.startswith(emitted):
+                on_delta(reply[len(emitted):])
+                emitted = reply
+        return buffer
+
     def highlight_gaps(
         self,
         *,
@@ -420,9 +493,8 @@ class QuestionLLMClient:
                 question_body=question_body,
                 answer_draft=answer_draft,
                 reference_answer=reference_answer or "（暂无参考答案）",
-                format_instructions=self._gap_highlight_parser.get_format_instructions(),
             )
-            raw = self._llm.invoke(prompt_messages)
+            raw, usage = self._invoke("gap_highlight", prompt_messages)
             response_text = getattr(raw, "content", raw)
             if isinstance(response_text, list):
                 response_text = "\n".join(
@@ -432,6 +504,9 @@ class QuestionLLMClient:
             parsed = self._gap_highlight_parser.parse(response_text)
             result = parsed.model_dump() if hasattr(parsed, "model_dump") else dict(parsed)
             result["_prompt_messages"] = self._serialize_messages(prompt_messages)
+            result["_usage"] = usage
+        except CircuitOpenError as exc:
+            raise LLMError(str(exc)) from exc
         except Exception as exc:  # pragma: no cover
             raise LLMError("GapHighlighter 请求失败") from exc
         return result
@@ -458,9 +533,8 @@ class QuestionLLMClient:
                 question_body=question_body,
                 answer_draft=answer_draft,
                 gap_notes=notes_block or "（暂无提示）",
-                format_instructions=self._refine_answer_parser.get_format_instructions(),
             )
-            raw = self._llm.invoke(prompt_messages)
+            raw, usage = self._invoke("refine", prompt_messages)
             response_text = getattr(raw, "content", raw)
             if isinstance(response_text, list):
                 response_text = "\n".join(
@@ -470,6 +544,9 @@ class QuestionLLMClient:
             parsed = self._refine_answer_parser.parse(response_text)
             result = parsed.model_dump() if hasattr(parsed, "model_dump") else dict(parsed)
             result["_prompt_messages"] = self._serialize_messages(prompt_messages)
+            result["_usage"] = usage
+        except CircuitOpenError as exc:
+            raise LLMError(str(exc)) from exc
         except Exception as exc:  # pragma: no cover
             raise LLMError("RefinedAnswer 请求失败") from exc
         return result
@@ -485,15 +562,20 @@ class QuestionLLMClient:
         if not answer_text:
             raise LLMError("暂无可拆解的答案")
         try:
-            result = self._structure_chain.invoke(
+            result, usage = self._invoke(
+                "structure",
                 {
                     "question_type": question_type,
                     "question_title": question_title,
                     "question_body": question_body,
                     "answer_text": answer_text,
-                    "format_instructions": self._structure_parser.get_format_instructions(),
-                }
+                },
+                self._structure_chain,
             )
+            if isinstance(result, dict):
+                result["_usage"] = usage
+        except CircuitOpenError as exc:
+            raise LLMError(str(exc)) from exc
         except Exception as exc:  # pragma: no cover
             raise LLMError("LLM 请求失败，请检查配置或响应格式") from exc
         return result
@@ -510,19 +592,77 @@ class QuestionLLMClient:
             raise LLMError("暂无可翻译的句子")
         sentences_block = "\n".join(f"{idx+1}. {text}" for idx, text in enumerate(sentences))
         try:
-            result = self._sentence_translation_chain.invoke(
+            result, usage = self._invoke(
+                "translate",
                 {
                     "question_type": question_type,
                     "question_title": question_title,
                     "question_body": question_body,
                     "sentences_block": sentences_block,
-                    "format_instructions": self._sentence_translation_parser.get_format_instructions(),
-                }
+                },
+                self._sentence_translation_chain,
             )
+            if isinstance(result, dict):
+                result["_usage"] = usage
+        except CircuitOpenError as exc:
+            raise LLMError(str(exc)) from exc
         except Exception as exc:  # pragma: no cover
             raise LLMError("LLM 请求失败，请检查配置或响应格式") from exc
         return result
 
+    def _chat_model(
+        self,
+        model: str,
+        timeout: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ) -> ChatOpenAI:
+        kwargs = {}
+        if max_tokens is not None:
+            kwargs["max_tokens"] = max_tokens
+        return ChatOpenAI(
+            model=model,
+            api_key=self.api_key,
+            base_url=self.base_url,
+            timeout=timeout or self.timeout,
+            # Retries happen in LLMResilience, which also sees rate limits and the breaker.
+            max_retries=0,
+            # Streamed replies only report token usage when it is asked for.
+            stream_usage=True,
+            **kwargs,
+        )
+
+    def _model(self, purpose: str) -> Runnable:
+        """The chat model routed for a purpose; unrouted purposes share the client's default model."""
+        route = self.routing.get(purpose)
+        if route is None or route.is_default():
+            return self._llm
+        routed = self._routed.get(purpose)
+        if routed is None:
+            routed = self._chat_model(route.model or self.model, route.timeout, route.max_tokens)
+            if route.fallback:
+                routed = routed.with_fallbacks(
+                    [self._chat_model(route.fallback, route.fallback_timeout or route.timeout, route.max_tokens)]
+                )
+            self._routed[purpose] = routed
+        return routed
+
+    def _model_name(self, purpose: str) -> str:
+        route = self.routing.get(purpose)
+        return (route.model if route else None) or self.model
+
+    def _invoke(self, purpose: str, payload, runnable: Optional[Runnable] = None) -> tuple[Any, dict]:
+        """The call's output and its usage: model, tokens, estimated cost and latency including retries."""
+        runnable = runnable or self._model(purpose)
+        collector = UsageCollector(self._model_name(purpose))
+        started = time.perf_counter()
+        output = self._resilience.call(
+            purpose,
+            self._model_name(purpose),
+            lambda: run_interruptible(runnable.invoke, payload, {"callbacks": [collector]}),
+            prompt_chars=_prompt_chars(payload),
+        )
+        return output, collector.usage(int((time.perf_counter() - started) * 1000))
+
     def _serialize_messages(self, messages):
         serialized = []
         for msg in messages:
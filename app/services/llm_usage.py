@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from typing import Any, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+PRICES_ENV = "LLM_MODEL_PRICES"
+# USD per million tokens: (input, cached input, output). Dated snapshots such as
+# gpt-4o-mini-2024-07-18 match the longest listed prefix. LLM_MODEL_PRICES takes
+# a JSON object of the same shape to add or override models.
+DEFAULT_MODEL_PRICES: dict[str, tuple[float, float, float]] = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+}
+
+
+def model_prices() -> dict[str, tuple[float, float, float]]:
+    prices = dict(DEFAULT_MODEL_PRICES)
+    override = os.getenv(PRICES_ENV)
+    if override:
+        try:
+            prices.update({model: tuple(float(value) for value in rates) for model, rates in json.loads(override).items()})
+        except (TypeError, ValueError, AttributeError):
+            pass
+    return prices
+
+
+def estimate_cost(
+    model: Optional[str],
+    prompt_tokens: int,
+    completion_tokens: int,
+    cached_tokens: int = 0,
+) -> Optional[float]:
+    """Estimated USD cost of one call, or None for a model without a known price."""
+    if not model:
+        return None
+    prices = model_prices()
+    matches = [name for name in prices if model == name or model.startswith(f"{name}-")]
+    if not matches:
+        return None
+    input_rate, cached_rate, output_rate = prices[max(matches, key=len)]
+    cached = min(cached_tokens, prompt_tokens)
+    cost = (prompt_tokens - cached) * input_rate + cached * cached_rate + completion_tokens * output_rate
+    return round(cost / 1_000_000, 8)
+
+
+class UsageCollector(BaseCallbackHandler):
+    """Sums the token usage chat models report during one call, fallback attempts included."""
+
+    def __init__(self, model_name: str) -> None:
+        super().__init__()
+        self.model_name = model_name
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.reported = False
+        self._lock = threading.Lock()
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if not usage:
+                    continue
+                with self._lock:
+                    self.reported = True
+                    self.prompt_tokens += usage.get("input_tokens") or 0
+                    self.completion_tokens += usage.get("output_tokens") or 0
+                    self.cached_tokens += (usage.get("input_token_details") or {}).get("cache_read") or 0
+                    # The provider names the model that actually answered, e.g. a fallback.
+                    self.model_name = (message.response_metadata or {}).get("model_name") or self.model_name
+
+    def usage(self, latency_ms: int) -> dict:
+        """Conversation fields for the call; token counts stay None when the model reported none."""
+        if not self.reported:
+            return {"model_name": self.model_name, "latency_ms": latency_ms}
+        return {
+            "model_name": self.model_name,
+            "latency_ms": latency_ms,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cost_usd": estimate_cost(self.model_name, self.prompt_tokens, self.completion_tokens, self.cached_tokens),
+        }
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
-from typing import List
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional
+from weakref import WeakKeyDictionary
 
 from fastapi import HTTPException, status
+from pydantic import TypeAdapter
 from sqlmodel import Session as DBSession, select
 
 from app.db.schemas import (
@@ -13,8 +18,27 @@ from app.db.schemas import (
     SentenceChunk as SentenceChunkSchema,
     ChunkLexeme as ChunkLexemeSchema,
 )
-from app.models.paragraph import ParagraphRead, SentenceRead
-from app.models.lexeme import SentenceChunkRead, ChunkLexemeRead, LexemeRead
+from app.models.paragraph import ParagraphRead
+
+TREE_CACHE_SIZE = 256
+
+_tree_adapter = TypeAdapter(List[ParagraphRead])
+# Serialized trees per engine, keyed by ETag; a new structure version gives a new key.
+_tree_cache: "WeakKeyDictionary[object, OrderedDict[str, bytes]]" = WeakKeyDictionary()
+_tree_cache_lock = threading.Lock()
+
+
+def _columns(model, prefix: str) -> list:
+    return [column.label(f"{prefix}{column.name}") for column in model.__table__.columns]
+
+
+def _strip(mapping, prefix: str) -> dict:
+    return {key[len(prefix):]: value for key, value in mapping.items() if key.startswith(prefix)}
+
+
+class AnswerTree(NamedTuple):
+    etag: str
+    body: bytes
 
 
 class ParagraphService:
@@ -22,62 +46,96 @@ class ParagraphService:
         self.session = session
 
     def list_by_answer(self, answer_id: int) -> List[ParagraphRead]:
-        answer = self.session.get(AnswerSchema, answer_id)
-        if not answer:
+        return _tree_adapter.validate_json(self.answer_tree(answer_id).body)
+
+    def tree_payload(self, answer_id: int) -> list[dict]:
+        """The tree as JSON-ready dicts, read without the cache."""
+        return _tree_adapter.dump_python(_tree_adapter.validate_python(self._load_tree(answer_id)), mode="json")
+
+    def tree_etag(self, answer_id: int) -> str:
+        row = self.session.exec(
+            select(AnswerSchema.structure_version, AnswerSchema.created_at).where(AnswerSchema.id == answer_id)
+        ).first()
+        if row is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Answer not found")
-        statement = (
-            select(ParagraphSchema)
+        version, created_at = row
+        # created_at tells apart an answer that reuses the id of a deleted one.
+        key = f"{answer_id}:{created_at}:{version}"
+        return '"' + hashlib.blake2b(key.encode("utf-8"), digest_size=12).hexdigest() + '"'
+
+    def answer_tree(self, answer_id: int, etag: Optional[str] = None) -> AnswerTree:
+        """The answer's paragraph tree as JSON, served from cache while its structure is unchanged."""
+        etag = etag or self.tree_etag(answer_id)
+        engine = self.session.get_bind()
+        with _tree_cache_lock:
+            cache = _tree_cache.setdefault(engine, OrderedDict())
+            body = cache.get(etag)
+            if body is not None:
+                cache.move_to_end(etag)
+                return AnswerTree(etag, body)
+        body = _tree_adapter.dump_json(_tree_adapter.validate_python(self._load_tree(answer_id)))
+        with _tree_cache_lock:
+            cache[etag] = body
+            while len(cache) > TREE_CACHE_SIZE:
+                cache.popitem(last=False)
+        return AnswerTree(etag, body)
+
+    def _load_tree(self, answer_id: int) -> list[dict]:
+        # Three queries for the whole answer, assembled into plain dicts in one pass.
+        paragraphs = [
+            dict(row._mapping)
+            for row in self.session.exec(
+                select(*_columns(ParagraphSchema, ""))
+                .where(ParagraphSchema.answer_id == answer_id)
+                .order_by(ParagraphSchema.order_index, ParagraphSchema.id)
+            )
+        ]
+        sentences: dict[int, dict] = {}
+        by_paragraph: dict[int, list[dict]] = {}
+        for paragraph in paragraphs:
+            paragraph["sentences"] = by_paragraph.setdefault(paragraph["id"], [])
+        for row in self.session.exec(
+            select(*_columns(SentenceSchema, ""))
+            .join(ParagraphSchema, ParagraphSchema.id == SentenceSchema.paragraph_id)
             .where(ParagraphSchema.answer_id == answer_id)
-            .order_by(ParagraphSchema.order_index)
-        )
-        paragraphs = self.session.exec(statement).all()
-        return [self._to_paragraph_read(paragraph) for paragraph in paragraphs]
-
-    def _to_paragraph_read(self, paragraph: ParagraphSchema) -> ParagraphRead:
-        sentences = (
-            self.session.exec(
-                select(SentenceSchema)
-                .where(SentenceSchema.paragraph_id == paragraph.id)
-                .order_by(SentenceSchema.order_index)
-            ).all()
+            .order_by(SentenceSchema.paragraph_id, SentenceSchema.order_index, SentenceSchema.id)
+        ):
+            sentence = dict(row._mapping)
+            sentence["chunks"] = []
+            sentences[sentence["id"]] = sentence
+            by_paragraph[sentence["paragraph_id"]].append(sentence)
+
+        chunks: dict[int, dict] = {}
+        rows = self.session.exec(
+            select(
+                *_columns(SentenceChunkSchema, "c_"),
+                *_columns(ChunkLexemeSchema, "cl_"),
+                *_columns(LexemeSchema, "l_"),
+            )
+            .join(SentenceSchema, SentenceSchema.id == SentenceChunkSchema.sentence_id)
+            .join(ParagraphSchema, ParagraphSchema.id == SentenceSchema.paragraph_id)
+            .outerjoin(ChunkLexemeSchema, ChunkLexemeSchema.chunk_id == SentenceChunkSchema.id)
+            .outerjoin(LexemeSchema, LexemeSchema.id == ChunkLexemeSchema.lexeme_id)
+            .where(ParagraphSchema.answer_id == answer_id)
+            .order_by(
+                SentenceChunkSchema.sentence_id,
+                SentenceChunkSchema.order_index,
+                SentenceChunkSchema.id,
+                ChunkLexemeSchema.order_index,
+                ChunkLexemeSchema.id,
+            )
         )
-        sentence_ids = [sentence.id for sentence in sentences]
-        chunk_map: dict[int, list[SentenceChunkRead]] = {sid: [] for sid in sentence_ids if sid is not None}
-        chunk_id_map: dict[int, SentenceChunkRead] = {}
-        if sentence_ids:
-            chunk_rows = self.session.exec(
-                select(SentenceChunkSchema)
-                .where(SentenceChunkSchema.sentence_id.in_(sentence_ids))
-                .order_by(SentenceChunkSchema.order_index)
-            ).all()
-            for chunk in chunk_rows:
-                chunk_data = chunk.model_dump()
-                chunk_data["lexemes"] = []
-                chunk_read = SentenceChunkRead(**chunk_data)
-                chunk_map.setdefault(chunk.sentence_id, []).append(chunk_read)
-                chunk_id_map[chunk.id] = chunk_read
-            chunk_ids = [chunk.id for chunk in chunk_rows]
-            if chunk_ids:
-                lexeme_rows = self.session.exec(
-                    select(ChunkLexemeSchema, LexemeSchema)
-                    .join(LexemeSchema, LexemeSchema.id == ChunkLexemeSchema.lexeme_id)
-                    .where(ChunkLexemeSchema.chunk_id.in_(chunk_ids))
-                    .order_by(ChunkLexemeSchema.order_index)
-                ).all()
-                for association, lexeme in lexeme_rows:
-                    chunk_read = chunk_id_map.get(association.chunk_id)
-                    if not chunk_read:
-                        continue
-                    lexeme_read = LexemeRead.model_validate(lexeme)
-                    assoc_data = association.model_dump()
-                    assoc_data["lexeme"] = lexeme_read
-                    chunk_lexeme = ChunkLexemeRead(**assoc_data)
-                    chunk_read.lexemes.append(chunk_lexeme)
-        sentence_reads = []
-        for sentence in sentences:
-            sentence_data = sentence.model_dump()
-            sentence_data["chunks"] = chunk_map.get(sentence.id, [])
-            sentence_reads.append(SentenceRead.model_validate(sentence_data))
-        data = paragraph.model_dump()
-        data["sentences"] = sentence_reads
-        return ParagraphRead.model_validate(data)
+        for row in rows:
+            mapping = row._mapping
+            chunk = chunks.get(mapping["c_id"])
+            if chunk is None:
+                chunk = _strip(mapping, "c_")
+                chunk["lexemes"] = []
+                chunks[chunk["id"]] = chunk
+                sentences[chunk["sentence_id"]]["chunks"].append(chunk)
+            if mapping["cl_id"] is None or mapping["l_id"] is None:
+                continue
+            link = _strip(mapping, "cl_")
+            link["lexeme"] = _strip(mapping, "l_")
+            chunk["lexemes"].append(link)
+        return paragraphs
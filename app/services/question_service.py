@@ -7,6 +7,7 @@ from sqlmodel import Session, select
 
 from app.db.schemas.question import Question, QuestionTag
 from app.models.question import QuestionCreate, QuestionRead, QuestionUpdate
+from app.services.conversation_store import ConversationStore
 from app.services.llm_service import LLMError, QuestionLLMClient
 
 
@@ -97,6 +98,15 @@ class QuestionService:
             )
         except LLMError as exc:
             raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc)) from exc
+        store = ConversationStore(self.session)
+        self.session.add(
+            store.build(
+                purpose="metadata",
+                messages={"slug": self._build_slug(question), "body": question.body, "tags": existing_tags},
+                result={"title": metadata.title, "tags": metadata.tags},
+                **metadata.usage,
+            )
+        )
         try:
             direction_plan = llm_client.plan_answer_direction(
                 question_type=question.type,
@@ -106,7 +116,16 @@ class QuestionService:
             )
             if isinstance(direction_plan, dict):
                 direction_plan = dict(direction_plan)
-                direction_plan.pop("_prompt_messages", None)
+                prompt_messages = direction_plan.pop("_prompt_messages", None)
+                usage = direction_plan.pop("_usage", None) or {}
+                self.session.add(
+                    store.build(
+                        purpose="outline",
+                        messages={"prompt_messages": prompt_messages},
+                        result=direction_plan,
+                        **usage,
+                    )
+                )
         except LLMError:
             direction_plan = question.direction_plan or {}
         question.title = metadata.title
@@ -5,12 +5,13 @@ from typing import List, Optional
 from uuid import uuid4
 
 from fastapi import HTTPException, status
-from sqlalchemy import or_
+from sqlalchemy import delete, exists, or_, update
 from sqlmodel import Session as DBSession, select
 
 from app.db.schemas import (
     AnswerGroup as AnswerGroupSchema,
     Answer as AnswerSchema,
+    AnswerBundle,
     Question,
     Session as SessionSchema,
     Task,
@@ -22,6 +23,7 @@ from app.db.schemas import (
     Lexeme,
     FlashcardProgress,
     LiveTurn,
+    SessionEvent,
 )
 from app.models.answer import (
     AnswerCreate,
@@ -33,40 +35,54 @@ from app.models.answer import (
     SessionUpdate,
     SessionFinalizePayload,
     AnswerHistoryRead,
-    LLMConversationRead,
     SessionHistoryRead,
+    SessionEventRead,
 )
 from app.models.fetch_task import TaskRead
+from app.services.archive_service import ArchiveService
+from app.services.conversation_store import ConversationStore
+from app.services.live_context import invalidate_live_context
+from app.services.session_state import (
+    clear_task_results,
+    progress_views,
+    save_session,
+    set_phase,
+    split_progress_state,
+)
+from app.services.task_events import track_task_events
 
 
 class SessionService:
     def __init__(self, session: DBSession) -> None:
         self.session = session
+        track_task_events(session)
 
     # Session operations
     def list_sessions(self) -> List[SessionRead]:
         statement = select(SessionSchema)
         sessions = self.session.exec(statement).all()
-        return [self._to_session_read(item) for item in sessions]
+        views = progress_views(self.session, sessions)
+        return [self._to_session_read(item, view) for item, view in zip(sessions, views)]
 
     def create_session(self, data: SessionCreate) -> SessionRead:
         question = self.session.get(Question, data.question_id)
         if not question:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Question not found")
         self._ensure_question_metadata_ready(question)
-        progress_state = dict(data.progress_state or {})
-        progress_state.setdefault("phase", "draft")
-        progress_state.setdefault("phase_status", "idle")
-        progress_state.pop("phase_error", None)
+        progress_state, phase_fields = split_progress_state(data.progress_state)
         entity = SessionSchema(
             question_id=data.question_id,
             answer_id=data.answer_id,
             session_type=data.session_type,
             status=data.status,
             user_answer_draft=data.user_answer_draft,
+            phase=phase_fields.get("phase") or "draft",
+            phase_status=phase_fields.get("phase_status") or "idle",
             progress_state=progress_state,
         )
         self.session.add(entity)
+        self.session.flush()
+        self._log_phase(entity)
         self.session.commit()
         self.session.refresh(entity)
         return self._to_session_read(entity)
@@ -75,28 +91,9 @@ class SessionService:
         session_entity = self._get_session_entity(session_id)
         if session_entity.answer_id and not force:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="已关联答案的 Session 不可删除")
-        tasks = self.session.exec(select(Task).where(Task.session_id == session_id)).all()
-        for task in tasks:
-            conversation = self.session.exec(
-                select(LLMConversation).where(LLMConversation.task_id == task.id)
-            ).first()
-            if conversation:
-                self.session.delete(conversation)
-            self.session.delete(task)
-        conversations = self.session.exec(
-            select(LLMConversation)
-            .where(LLMConversation.session_id == session_id)
-            .where(LLMConversation.task_id.is_(None))
-        ).all()
-        for log in conversations:
-            self.session.delete(log)
-        live_turns = self.session.exec(
-            select(LiveTurn).where(LiveTurn.session_id == session_id)
-        ).all()
-        for turn in live_turns:
-            self.session.delete(turn)
-        self.session.delete(session_entity)
+        self._delete_sessions(select(SessionSchema.id).where(SessionSchema.id == session_id))
         self.session.commit()
+        invalidate_live_context(session_id)
 
     def get_session(self, session_id: int) -> SessionRead:
         session = self._get_session_entity(session_id)
@@ -108,24 +105,25 @@ class SessionService:
         if "answer_id" in update_data and update_data["answer_id"] is not None:
             self._ensure_answer_exists(update_data["answer_id"])
         if "user_answer_draft" in update_data and entity.answer_id is None:
-            progress_state = dict(entity.progress_state or {})
-            progress_state["phase"] = "draft"
-            progress_state["phase_status"] = "idle"
-            for key in ["last_eval", "last_compare", "last_compose"]:
-                progress_state.pop(key, None)
-            progress_state.pop("phase_error", None)
-            entity.progress_state = progress_state
-            entity.status = self._status_from_phase("draft")
-            entity.completed_at = None
+            clear_task_results(self.session, entity)
+            set_phase(self.session, entity, phase="draft", status="idle", clear_error=True)
         if data.progress_state is not None:
-            entity.progress_state = data.progress_state
-            update_data.pop("progress_state", None)
-        for key, value in update_data.items():
-            setattr(entity, key, value)
-        entity.updated_at = datetime.now(timezone.utc)
-        self.session.add(entity)
+            progress_state, phase_fields = split_progress_state(data.progress_state)
+            update_data["progress_state"] = progress_state
+            if phase_fields:
+                set_phase(
+                    self.session,
+                    entity,
+                    phase=phase_fields.get("phase"),
+                    status=phase_fields.get("phase_status"),
+                    error=phase_fields.get("phase_error"),
+                    clear_error="phase_error" not in phase_fields,
+                )
+        update_data["updated_at"] = datetime.now(timezone.utc)
+        save_session(self.session, entity, columns=update_data)
         self.session.commit()
         self.session.refresh(entity)
+        invalidate_live_context(session_id)
         return self._to_session_read(entity)
 
     def start_live_session(self, session_id: int) -> SessionRead:
@@ -136,18 +134,20 @@ class SessionService:
         if question.type != "T2":
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="仅 T2 题目可使用实时对话模式")
         progress = dict(entity.progress_state or {})
-        progress["mode"] = "live"
-        progress["phase"] = "live"
-        progress["phase_status"] = "idle"
-        progress["live_status"] = "active"
-        progress["live_turn_count"] = int(progress.get("live_turn_count") or 0)
-        progress["live_stream_token"] = progress.get("live_stream_token") or uuid4().hex
-        entity.progress_state = progress
-        entity.status = self._status_from_phase("live")
-        entity.updated_at = datetime.now(timezone.utc)
-        self.session.add(entity)
+        save_session(
+            self.session,
+            entity,
+            progress={
+                "mode": "live",
+                "live_status": "active",
+                "live_turn_count": int(progress.get("live_turn_count") or 0),
+                "live_stream_token": progress.get("live_stream_token") or uuid4().hex,
+            },
+        )
+        set_phase(self.session, entity, phase="live", status="idle")
         self.session.commit()
         self.session.refresh(entity)
+        invalidate_live_context(session_id)
         return self._to_session_read(entity)
 
     def create_live_turn(
@@ -168,13 +168,8 @@ class SessionService:
             meta={},
         )
         self.session.add(turn)
-        progress["live_turn_count"] = next_index
-        progress["live_status"] = "active"
-        progress["phase"] = "live"
-        progress["phase_status"] = "running"
-        entity.progress_state = progress
-        entity.updated_at = datetime.now(timezone.utc)
-        self.session.add(entity)
+        save_session(self.session, entity, progress={"live_turn_count": next_index, "live_status": "active"})
+        set_phase(self.session, entity, phase="live", status="running")
         self.session.commit()
         self.session.refresh(turn)
         return turn
@@ -184,6 +179,7 @@ class SessionService:
         turn_id: int,
         reply_text: str,
         meta: Optional[dict] = None,
+        conversation: Optional[dict] = None,
     ) -> LiveTurn:
         turn = self.session.get(LiveTurn, turn_id)
         if not turn:
@@ -194,13 +190,12 @@ class SessionService:
             merged.update(meta)
             turn.meta = merged
         self.session.add(turn)
+        if conversation:
+            self.session.add(ConversationStore(self.session).build(session_id=turn.session_id, **conversation))
         session_entity = self._get_session_entity(turn.session_id)
-        progress = dict(session_entity.progress_state or {})
-        progress["phase_status"] = "idle"
-        progress["live_status"] = "active"
-        session_entity.progress_state = progress
-        session_entity.updated_at = datetime.now(timezone.utc)
-        self.session.add(session_entity)
+        if (session_entity.progress_state or {}).get("live_status") != "active":
+            save_session(self.session, session_entity, progress={"live_status": "active"})
+        set_phase(self.session, session_entity, status="idle")
         self.session.commit()
         self.session.refresh(turn)
         return turn
@@ -214,21 +209,17 @@ class SessionService:
         turn.meta = meta
         self.session.add(turn)
         session_entity = self._get_session_entity(turn.session_id)
-        progress = dict(session_entity.progress_state or {})
-        progress["phase_status"] = "failed"
-        progress["phase_error"] = message
-        session_entity.progress_state = progress
-        session_entity.updated_at = datetime.now(timezone.utc)
-        self.session.add(session_entity)
+        set_phase(self.session, session_entity, status="failed", error=message)
         self.session.commit()
 
     def update_live_status(self, session_id: int, status_value: str) -> None:
         entity = self._get_session_entity(session_id)
-        progress = dict(entity.progress_state or {})
-        progress["live_status"] = status_value
-        entity.progress_state = progress
-        entity.updated_at = datetime.now(timezone.utc)
-        self.session.add(entity)
+        save_session(
+            self.session,
+            entity,
+            columns={"updated_at": datetime.now(timezone.utc)},
+            progress={"live_status": status_value},
+        )
         self.session.commit()
 
     def list_live_turns(self, session_id: int) -> List[LiveTurn]:
@@ -293,7 +284,7 @@ class SessionService:
     def finalize_session(self, session_id: int, payload: SessionFinalizePayload) -> SessionRead:
         session_entity = self._get_session_entity(session_id)
         progress_state = dict(session_entity.progress_state or {})
-        phase = progress_state.get("phase", "draft")
+        phase = session_entity.phase or "draft"
         if not (progress_state.get("mode") == "live" and phase == "live") and phase not in {"await_finalize", "await_new_group"}:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="当前阶段不可完成 Session")
         question = self.session.get(Question, session_entity.question_id)
@@ -338,35 +329,28 @@ class SessionService:
         self.session.add(answer)
         self.session.commit()
         self.session.refresh(answer)
-        session_entity.answer_id = answer.id
-        progress_state = dict(session_entity.progress_state or {})
-        progress_state["phase"] = "structure_pipeline"
-        progress_state["phase_status"] = "running"
-        session_entity.progress_state = progress_state
-        session_entity.status = self._status_from_phase("structure_pipeline")
-        session_entity.completed_at = None
-        session_entity.updated_at = datetime.now(timezone.utc)
-        self.session.add(session_entity)
+        set_phase(
+            self.session,
+            session_entity,
+            phase="structure_pipeline",
+            status="running",
+            columns={"answer_id": answer.id},
+        )
         self.session.commit()
         self.session.refresh(session_entity)
+        invalidate_live_context(session_id)
         return self._to_session_read(session_entity)
 
     def mark_learning_complete(self, session_id: int) -> SessionRead:
         session = self._get_session_entity(session_id)
-        progress = dict(session.progress_state or {})
-        if progress.get("phase") != "learning":
+        if session.phase != "learning":
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="当前阶段不可完成")
-        if progress.get("phase_status") == "running":
+        if session.phase_status == "running":
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="学习数据生成中，请稍候")
-        progress["phase"] = "completed"
-        progress["phase_status"] = "idle"
-        session.progress_state = progress
-        session.status = self._status_from_phase("completed")
-        session.completed_at = datetime.now(timezone.utc)
-        session.updated_at = datetime.now(timezone.utc)
-        self.session.add(session)
+        set_phase(self.session, session, phase="completed", status="idle")
         self.session.commit()
         self.session.refresh(session)
+        invalidate_live_context(session_id)
         return self._to_session_read(session)
 
     # Answer group operations
@@ -404,17 +388,17 @@ class SessionService:
         group = self.session.get(AnswerGroupSchema, group_id)
         if not group:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Answer group not found")
-        answers = self.session.exec(select(AnswerSchema).where(AnswerSchema.answer_group_id == group_id)).all()
-        for answer in answers:
-            sessions = self.session.exec(
-                select(SessionSchema).where(SessionSchema.answer_id == answer.id)
-            ).all()
-            for session in sessions:
-                self.delete_session(session.id, force=True)
-            self._delete_answer_dependencies(answer.id)
-            self.session.delete(answer)
+        answer_ids = select(AnswerSchema.id).where(AnswerSchema.answer_group_id == group_id)
+        session_ids = list(
+            self.session.exec(select(SessionSchema.id).where(SessionSchema.answer_id.in_(answer_ids))).all()
+        )
+        self._delete_sessions(session_ids)
+        self._delete_answer_dependencies(answer_ids)
+        self.session.exec(delete(AnswerSchema).where(AnswerSchema.answer_group_id == group_id))
         self.session.delete(group)
         self.session.commit()
+        for session_id in session_ids:
+            invalidate_live_context(session_id)
 
     def delete_answer(self, answer_id: int) -> None:
         answer = self.session.get(AnswerSchema, answer_id)
@@ -430,7 +414,7 @@ class SessionService:
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="只能删除最新版本的答案",
             )
-        self._delete_answer_dependencies(answer_id)
+        self._delete_answer_dependencies([answer_id])
         self.session.delete(answer)
         self.session.commit()
 
@@ -468,8 +452,6 @@ class SessionService:
         self._ensure_question_metadata_ready(question)
         progress_state = {
             "review_source_answer_id": answer.id,
-            "phase": "draft",
-            "phase_status": "idle",
             "selected_answer_group_id": group.id,
         }
         entity = SessionSchema(
@@ -481,16 +463,26 @@ class SessionService:
             progress_state=progress_state,
         )
         self.session.add(entity)
+        self.session.flush()
+        self._log_phase(entity)
         self.session.commit()
         self.session.refresh(entity)
         return self._to_session_read(entity)
 
-    def get_session_history(self, session_id: int) -> SessionHistoryRead:
-        session_entity = self._get_session_entity(session_id)
-        tasks = self.session.exec(
-            select(Task).where(Task.session_id == session_id).order_by(Task.created_at.desc())
+    def list_session_events(self, session_id: int) -> List[SessionEventRead]:
+        self._get_session_entity(session_id)
+        events = self.session.exec(
+            select(SessionEvent).where(SessionEvent.session_id == session_id).order_by(SessionEvent.id)
         ).all()
-        task_reads = [TaskRead.model_validate(task) for task in tasks]
+        return [SessionEventRead.model_validate(event) for event in events]
+
+    def get_session_history(self, session_id: int, *, include_archived: bool = False) -> SessionHistoryRead:
+        session_entity = self._get_session_entity(session_id)
+        tasks = list(
+            self.session.exec(
+                select(Task).where(Task.session_id == session_id).order_by(Task.created_at.desc())
+            ).all()
+        )
         task_ids = [task.id for task in tasks if task.id is not None]
         conversation_conditions = [LLMConversation.session_id == session_id]
         if task_ids:
@@ -500,15 +492,24 @@ class SessionService:
             .where(or_(*conversation_conditions))
             .order_by(LLMConversation.created_at.desc())
         )
-        conversations = self.session.exec(conversation_statement).all()
-        conversation_reads = [LLMConversationRead.model_validate(conv) for conv in conversations]
+        conversations = list(self.session.exec(conversation_statement).all())
+        if include_archived:
+            archive = ArchiveService(self.session)
+            archived_tasks = archive.archived_tasks(session_ids=[session_id])
+            tasks = self._newest_first(tasks + archived_tasks)
+            conversations = self._newest_first(
+                conversations
+                + archive.archived_conversations(
+                    session_ids=[session_id], task_ids=task_ids + [task.id for task in archived_tasks]
+                )
+            )
         return SessionHistoryRead(
             session=self._to_session_read(session_entity),
-            tasks=task_reads,
-            conversations=conversation_reads,
+            tasks=[TaskRead.model_validate(task) for task in tasks],
+            conversations=ConversationStore(self.session).to_reads(conversations),
         )
 
-    def get_answer_history(self, answer_id: int) -> AnswerHistoryRead:
+    def get_answer_history(self, answer_id: int, *, include_archived: bool = False) -> AnswerHistoryRead:
         answer = self.session.get(AnswerSchema, answer_id)
         if not answer:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Answer not found")
@@ -534,8 +535,7 @@ class SessionService:
         else:
             task_statement = task_statement.where(Task.answer_id == answer_id)
         task_statement = task_statement.order_by(Task.created_at.desc())
-        tasks = self.session.exec(task_statement).all()
-        task_reads = [TaskRead.model_validate(task) for task in tasks]
+        tasks = list(self.session.exec(task_statement).all())
         task_ids = [task.id for task in tasks if task.id is not None]
 
         conversation_conditions = []
@@ -551,17 +551,26 @@ class SessionService:
                 conversation_statement = conversation_statement.where(
                     or_(*conversation_conditions)  # type: ignore[arg-type]
                 )
-            conversations = self.session.exec(conversation_statement).all()
+            conversations = list(self.session.exec(conversation_statement).all())
         else:
             conversations = []
-        conversation_reads = [LLMConversationRead.model_validate(conv) for conv in conversations]
+        if include_archived:
+            archive = ArchiveService(self.session)
+            archived_tasks = archive.archived_tasks(session_ids=session_ids, answer_ids=[answer_id])
+            tasks = self._newest_first(tasks + archived_tasks)
+            conversations = self._newest_first(
+                conversations
+                + archive.archived_conversations(
+                    session_ids=session_ids, task_ids=task_ids + [task.id for task in archived_tasks]
+                )
+            )
 
         return AnswerHistoryRead(
             answer=self._to_answer_read(answer),
             group=self._to_answer_group_read(group, include_answers=True),
             sessions=session_reads,
-            tasks=task_reads,
-            conversations=conversation_reads,
+            tasks=[TaskRead.model_validate(task) for task in tasks],
+            conversations=ConversationStore(self.session).to_reads(conversations),
         )
 
     # Helpers
@@ -595,92 +604,66 @@ class SessionService:
             return base_title
         return f"{base_title}（{trimmed_direction}）"
 
-    def _delete_answer_dependencies(self, answer_id: int | None) -> None:
-        if not answer_id:
-            return
-        paragraphs = self.session.exec(
-            select(ParagraphSchema).where(ParagraphSchema.answer_id == answer_id)
-        ).all()
-        for paragraph in paragraphs:
-            sentences = self.session.exec(
-                select(SentenceSchema).where(SentenceSchema.paragraph_id == paragraph.id)
-            ).all()
-            for sentence in sentences:
-                self._delete_sentence_with_chunks(sentence)
-                self.session.delete(sentence)
-            self.session.delete(paragraph)
-        sessions = self.session.exec(
-            select(SessionSchema).where(SessionSchema.answer_id == answer_id)
-        ).all()
-        for session in sessions:
-            session.answer_id = None
-            session.updated_at = datetime.now(timezone.utc)
-            self.session.add(session)
-        tasks = self.session.exec(select(Task).where(Task.answer_id == answer_id)).all()
-        for task in tasks:
-            conversation = self.session.exec(
-                select(LLMConversation).where(LLMConversation.task_id == task.id)
-            ).first()
-            if conversation:
-                self.session.delete(conversation)
-            self.session.delete(task)
-
-    def _delete_sentence_with_chunks(self, sentence: SentenceSchema) -> None:
-        if not sentence.id:
-            return
-        self._delete_flashcards_for_entities("sentence", [sentence.id])
-        chunks = self.session.exec(
-            select(SentenceChunk).where(SentenceChunk.sentence_id == sentence.id)
-        ).all()
-        if not chunks:
-            return
-        chunk_ids = [chunk.id for chunk in chunks if chunk.id is not None]
-        if chunk_ids:
-            self._delete_flashcards_for_entities("chunk", chunk_ids)
-            links = self.session.exec(
-                select(ChunkLexeme).where(ChunkLexeme.chunk_id.in_(chunk_ids))
+    # Cascades are issued as a fixed number of DELETE ... WHERE ... IN (subquery)
+    # statements, whatever the size of the graph being removed.
+    def _delete_sessions(self, session_ids) -> None:
+        task_ids = select(Task.id).where(Task.session_id.in_(session_ids))
+        self.session.exec(
+            delete(LLMConversation).where(
+                or_(LLMConversation.session_id.in_(session_ids), LLMConversation.task_id.in_(task_ids))
+            )
+        )
+        self.session.exec(delete(Task).where(Task.session_id.in_(session_ids)))
+        self.session.exec(delete(LiveTurn).where(LiveTurn.session_id.in_(session_ids)))
+        self.session.exec(delete(SessionEvent).where(SessionEvent.session_id.in_(session_ids)))
+        self.session.exec(delete(SessionSchema).where(SessionSchema.id.in_(session_ids)))
+
+    def _delete_answer_dependencies(self, answer_ids) -> None:
+        paragraph_ids = select(ParagraphSchema.id).where(ParagraphSchema.answer_id.in_(answer_ids))
+        sentence_ids = select(SentenceSchema.id).where(SentenceSchema.paragraph_id.in_(paragraph_ids))
+        chunk_ids = select(SentenceChunk.id).where(SentenceChunk.sentence_id.in_(sentence_ids))
+        lexeme_ids = list(
+            self.session.exec(
+                select(ChunkLexeme.lexeme_id).where(ChunkLexeme.chunk_id.in_(chunk_ids)).distinct()
             ).all()
-            lexeme_ids: set[int] = set()
-            for link in links:
-                if link.lexeme_id:
-                    lexeme_ids.add(link.lexeme_id)
-                self.session.delete(link)
-            for chunk in chunks:
-                self.session.delete(chunk)
-            for lexeme_id in lexeme_ids:
-                self._cleanup_lexeme_if_orphan(lexeme_id)
-
-    def _cleanup_lexeme_if_orphan(self, lexeme_id: int | None) -> None:
-        if not lexeme_id:
-            return
-        linked = self.session.exec(
-            select(ChunkLexeme.id).where(ChunkLexeme.lexeme_id == lexeme_id)
-        ).first()
-        if linked:
-            return
-        self._delete_flashcards_for_entities("lexeme", [lexeme_id])
-        lexeme = self.session.get(Lexeme, lexeme_id)
-        if lexeme:
-            self.session.delete(lexeme)
-
-    def _delete_flashcards_for_entities(self, entity_type: str, entity_ids: list[int | None]) -> None:
-        valid_ids = [entity_id for entity_id in entity_ids if entity_id is not None]
-        if not valid_ids:
-            return
-        rows = self.session.exec(
-            select(FlashcardProgress)
+        )
+        self._delete_flashcards_for_entities("sentence", sentence_ids)
+        self._delete_flashcards_for_entities("chunk", chunk_ids)
+        self.session.exec(delete(ChunkLexeme).where(ChunkLexeme.chunk_id.in_(chunk_ids)))
+        self.session.exec(delete(SentenceChunk).where(SentenceChunk.sentence_id.in_(sentence_ids)))
+        self.session.exec(delete(SentenceSchema).where(SentenceSchema.paragraph_id.in_(paragraph_ids)))
+        self.session.exec(delete(ParagraphSchema).where(ParagraphSchema.answer_id.in_(answer_ids)))
+        if lexeme_ids:
+            orphan_ids = select(Lexeme.id).where(Lexeme.id.in_(lexeme_ids)).where(
+                ~exists().where(ChunkLexeme.lexeme_id == Lexeme.id)
+            )
+            self._delete_flashcards_for_entities("lexeme", orphan_ids)
+            self.session.exec(delete(Lexeme).where(Lexeme.id.in_(orphan_ids)))
+        self.session.exec(
+            update(SessionSchema)
+            .where(SessionSchema.answer_id.in_(answer_ids))
+            .values(answer_id=None, version=SessionSchema.version + 1, updated_at=datetime.now(timezone.utc))
+        )
+        task_ids = select(Task.id).where(Task.answer_id.in_(answer_ids))
+        self.session.exec(delete(LLMConversation).where(LLMConversation.task_id.in_(task_ids)))
+        self.session.exec(delete(Task).where(Task.answer_id.in_(answer_ids)))
+        self.session.exec(delete(AnswerBundle).where(AnswerBundle.answer_id.in_(answer_ids)))
+
+    def _delete_flashcards_for_entities(self, entity_type: str, entity_ids) -> None:
+        self.session.exec(
+            delete(FlashcardProgress)
             .where(FlashcardProgress.entity_type == entity_type)
-            .where(FlashcardProgress.entity_id.in_(valid_ids))
-        ).all()
-        for row in rows:
-            self.session.delete(row)
+            .where(FlashcardProgress.entity_id.in_(entity_ids))
+        )
 
-    def _status_from_phase(self, phase: str | None) -> str:
-        if not phase or phase == "draft":
-            return "draft"
-        if phase == "completed":
-            return "completed"
-        return "in_progress"
+    def _newest_first(self, rows: list) -> list:
+        # Rows fresh from SQLite are naive UTC; ones created in this session may still be aware.
+        return sorted(rows, key=lambda row: row.created_at.replace(tzinfo=None), reverse=True)
+
+    def _log_phase(self, entity: SessionSchema) -> None:
+        self.session.add(
+            SessionEvent(session_id=entity.id, kind="phase", phase=entity.phase, phase_status=entity.phase_status)
+        )
 
     def _get_session_entity(self, session_id: int) -> SessionSchema:
         entity = self.session.get(SessionSchema, session_id)
@@ -695,7 +678,9 @@ class SessionService:
             return 1
         return max(answer.version_index for answer in answers) + 1
 
-    def _to_session_read(self, session: SessionSchema) -> SessionRead:
+    def _to_session_read(self, session: SessionSchema, progress_state: Optional[dict] = None) -> SessionRead:
+        if progress_state is None:
+            progress_state = progress_views(self.session, [session])[0]
         return SessionRead(
             id=session.id,
             question_id=session.question_id,
@@ -703,7 +688,7 @@ class SessionService:
             session_type=session.session_type,
             status=session.status,
             user_answer_draft=session.user_answer_draft,
-            progress_state=session.progress_state,
+            progress_state=progress_state,
             started_at=session.started_at,
             completed_at=session.completed_at,
         )
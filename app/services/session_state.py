@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any, Iterable, Optional
+
+from fastapi import HTTPException, status as http_status
+from sqlalchemy import update
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.exc import StaleDataError
+from sqlmodel import Session as DBSession, select
+
+from app.db.schemas import Session as SessionSchema, SessionEvent, Task
+from app.services.live_context import invalidate_live_context
+from app.services.task_events import queue_session_change
+
+PHASE_KEYS = ("phase", "phase_status", "phase_error")
+_PUBLISHED_COLUMNS = {"status", *PHASE_KEYS}
+# progress_state keys the API still shows, now backed by a task reference.
+RESULT_REFS = {
+    "last_eval": "last_eval_task_id",
+    "last_compare": "last_compare_task_id",
+    "last_compose": "last_compose_task_id",
+}
+# Never stored in progress_state: columns, task results, or the question's own plan.
+DERIVED_KEYS = {*PHASE_KEYS, *RESULT_REFS, "outline_plan"}
+MAX_SAVE_ATTEMPTS = 5
+# Timestamps every writer sets; differing values there are not a conflict.
+_UNCHECKED_COLUMNS = {"updated_at", "completed_at"}
+_MISSING = object()
+
+
+def status_from_phase(phase: Optional[str]) -> str:
+    if not phase or phase == "draft":
+        return "draft"
+    if phase == "completed":
+        return "completed"
+    return "in_progress"
+
+
+def split_progress_state(progress_state: Optional[dict]) -> tuple[dict, dict]:
+    """Split a client-supplied progress_state into stored context and phase columns."""
+    state = dict(progress_state or {})
+    phase_fields = {key: state[key] for key in PHASE_KEYS if key in state}
+    context = {key: value for key, value in state.items() if key not in DERIVED_KEYS}
+    return context, phase_fields
+
+
+def _conflicts(seen: dict, current: dict, ours: dict) -> list[str]:
+    # A key is in conflict when another writer changed it since we read it
+    # and left it at something other than what we are about to write.
+    conflicts = []
+    for key, value in ours.items():
+        theirs = current.get(key, _MISSING)
+        if theirs != seen.get(key, _MISSING) and theirs != value:
+            conflicts.append(key)
+    return conflicts
+
+
+def save_session(
+    db: DBSession,
+    entity: SessionSchema,
+    *,
+    columns: Optional[dict[str, Any]] = None,
+    progress: Optional[dict[str, Any]] = None,
+    removed: Iterable[str] = (),
+) -> None:
+    """Compare-and-swap columns and progress_state keys onto the session row.
+
+    The UPDATE only applies if ``version`` is still the one this entity was
+    read at. Otherwise the row is re-read: keys only the other writer changed
+    are kept, ours are applied on top and the write is retried. A key both
+    sides changed to different values raises 409.
+    """
+    columns = dict(columns or {})
+    progress = dict(progress or {})
+    removed = set(removed)
+    try:
+        db.flush()
+    except StaleDataError:
+        # A pending plain attribute write lost the version check; its value cannot be merged.
+        db.rollback()
+        raise HTTPException(status_code=http_status.HTTP_409_CONFLICT, detail="Session 更新冲突，请重试")
+    table = SessionSchema.__table__
+    for _ in range(MAX_SAVE_ATTEMPTS):
+        seen_columns = {key: getattr(entity, key) for key in columns}
+        seen_progress = dict(entity.progress_state or {})
+        values = dict(columns)
+        if progress or removed:
+            merged = {key: value for key, value in seen_progress.items() if key not in removed}
+            merged.update(progress)
+            values["progress_state"] = merged
+        values["version"] = entity.version + 1
+        result = db.exec(
+            update(table).where(table.c.id == entity.id).where(table.c.version == entity.version).values(**values)
+        )
+        if result.rowcount:
+            for key, value in values.items():
+                set_committed_value(entity, key, value)
+            if _PUBLISHED_COLUMNS & values.keys():
+                queue_session_change(db, entity)
+            return
+        current = db.execute(table.select().where(table.c.id == entity.id)).one()._mapping
+        current_progress = dict(current["progress_state"] or {})
+        conflicts = _conflicts(
+            seen_columns,
+            dict(current),
+            {key: value for key, value in columns.items() if key not in _UNCHECKED_COLUMNS},
+        )
+        conflicts += _conflicts(
+            seen_progress,
+            current_progress,
+            {**progress, **{key: _MISSING for key in removed}},
+        )
+        if conflicts:
+            raise HTTPException(
+                status_code=http_status.HTTP_409_CONFLICT,
+                detail=f"Session 已被其他任务修改：{', '.join(sorted(conflicts))}",
+            )
+        for column in table.columns:
+            set_committed_value(entity, column.key, current[column.name])
+    raise HTTPException(status_code=http_status.HTTP_409_CONFLICT, detail="Session 更新冲突，请重试")
+
+
+def set_phase(
+    db: DBSession,
+    entity: SessionSchema,
+    *,
+    phase: Optional[str] = None,
+    status: Optional[str] = None,
+    error: Optional[str] = None,
+    clear_error: bool = False,
+    columns: Optional[dict[str, Any]] = None,
+) -> None:
+    """Write only the changed phase columns (compare-and-swap) and log the transition.
+
+    ``columns`` are written in the same compare-and-swap, so they only land
+    together with the phase they belong to.
+    """
+    before = (entity.phase, entity.phase_status, entity.phase_error)
+    now = datetime.now(timezone.utc)
+    columns = {**(columns or {}), "updated_at": now}
+    if phase is not None:
+        columns["phase"] = phase
+        columns["status"] = status_from_phase(phase)
+        if columns["status"] != "completed":
+            columns["completed_at"] = None
+        elif entity.completed_at is None:
+            columns["completed_at"] = now
+    if status is not None:
+        columns["phase_status"] = status
+    if clear_error:
+        columns["phase_error"] = None
+    elif error is not None:
+        columns["phase_error"] = error
+    save_session(db, entity, columns=columns)
+    if (entity.phase, entity.phase_status, entity.phase_error) != before:
+        db.add(
+            SessionEvent(
+                session_id=entity.id,
+                kind="phase",
+                phase=entity.phase,
+                phase_status=entity.phase_status,
+                error=entity.phase_error,
+            )
+        )
+    # Live contexts depend on the phase, not on a turn's running/idle status.
+    if entity.phase != before[0]:
+        invalidate_live_context(entity.id)
+
+
+def record_task_result(db: DBSession, entity: SessionSchema, key: str, task: Task) -> None:
+    save_session(db, entity, columns={RESULT_REFS[key]: task.id, "updated_at": datetime.now(timezone.utc)})
+    db.add(SessionEvent(session_id=entity.id, kind=key, phase=entity.phase, task_id=task.id))
+
+
+def clear_task_results(db: DBSession, entity: SessionSchema) -> None:
+    save_session(db, entity, columns={column: None for column in RESULT_REFS.values()})
+
+
+def latest_result(db: DBSession, entity: SessionSchema, key: str) -> dict:
+    task_id = getattr(entity, RESULT_REFS[key])
+    task = db.get(Task, task_id) if task_id else None
+    return dict(task.result_summary or {}) if task else {}
+
+
+def progress_views(db: DBSession, sessions: Iterable[SessionSchema]) -> list[dict]:
+    """progress_state as the API has always shown it, with the referenced results in one query."""
+    sessions = list(sessions)
+    task_ids = {
+        getattr(entity, column)
+        for entity in sessions
+        for column in RESULT_REFS.values()
+        if getattr(entity, column)
+    }
+    results: dict[int, dict] = {}
+    if task_ids:
+        results = {
+            task_id: summary or {}
+            for task_id, summary in db.exec(select(Task.id, Task.result_summary).where(Task.id.in_(task_ids)))
+        }
+    views = []
+    for entity in sessions:
+        view = dict(entity.progress_state or {})
+        view["phase"] = entity.phase
+        view["phase_status"] = entity.phase_status
+        if entity.phase_error:
+            view["phase_error"] = entity.phase_error
+        for key, column in RESULT_REFS.items():
+            task_id = getattr(entity, column)
+            if task_id in results:
+                view[key] = results[task_id]
+        views.append(view)
+    return views
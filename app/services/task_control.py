@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Optional
+
+# Hard wall-clock limits (seconds) per task type; TASK_TIMEOUT_<TYPE> overrides one.
+DEFAULT_TASK_TIMEOUTS: dict[str, float] = {
+    "eval": 90.0,
+    "compose": 120.0,
+    "compare": 90.0,
+    "gap_highlight": 90.0,
+    "refine_answer": 120.0,
+    "structure": 180.0,
+    "sentence_translate": 180.0,
+    "chunk_sentence": 90.0,
+    "chunk_lexeme": 90.0,
+    "structure_pipeline": 900.0,
+}
+FALLBACK_TASK_TIMEOUT = 120.0
+POLL_INTERVAL = 0.1
+
+_llm_call_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-call")
+# Runs sibling tasks that a request fans out next to the one it runs itself.
+_branch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="task-branch")
+
+
+class TaskInterrupted(BaseException):
+    """Raised inside a running task once it was canceled or ran past its deadline.
+
+    Derives from BaseException, like asyncio.CancelledError, so the broad
+    ``except Exception`` handlers around LLM calls do not turn it into an LLMError.
+    """
+
+    status = "canceled"
+
+
+class TaskCanceled(TaskInterrupted):
+    status = "canceled"
+
+    def __init__(self) -> None:
+        super().__init__("任务已取消")
+
+
+class TaskTimedOut(TaskInterrupted):
+    status = "timed_out"
+
+    def __init__(self, timeout: float) -> None:
+        super().__init__(f"任务超时（{timeout:.0f} 秒）")
+
+
+def task_timeout(task_type: str) -> float:
+    override = os.getenv(f"TASK_TIMEOUT_{task_type.upper()}")
+    if override:
+        try:
+            return float(override)
+        except ValueError:
+            pass
+    return DEFAULT_TASK_TIMEOUTS.get(task_type, FALLBACK_TASK_TIMEOUT)
+
+
+class CancellationToken:
+    def __init__(self, timeout: float, parent: Optional["CancellationToken"] = None) -> None:
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout
+        self.parent = parent
+        self._canceled = threading.Event()
+
+    def cancel(self) -> None:
+        self._canceled.set()
+
+    @property
+    def canceled(self) -> bool:
+        return self._canceled.is_set() or (self.parent is not None and self.parent.canceled)
+
+    def remaining(self) -> float:
+        remaining = self.deadline - time.monotonic()
+        if self.parent is not None:
+            remaining = min(remaining, self.parent.remaining())
+        return remaining
+
+    def check(self) -> None:
+        # A step started by a pipeline task stops together with its parent.
+        if self.parent is not None:
+            self.parent.check()
+        if self._canceled.is_set():
+            raise TaskCanceled()
+        if self.deadline - time.monotonic() <= 0:
+            raise TaskTimedOut(self.timeout)
+
+
+_tokens: dict[int, CancellationToken] = {}
+_tokens_lock = threading.Lock()
+_local = threading.local()
+
+
+def start_task(task_id: int, timeout: float) -> CancellationToken:
+    """Register a token for a running task and bind it to the current thread.
+
+    A task started while another one runs on this thread becomes its child.
+    """
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    token = CancellationToken(timeout, parent=stack[-1] if stack else None)
+    with _tokens_lock:
+        _tokens[task_id] = token
+    stack.append(token)
+    return token
+
+
+def submit_task(task_id: int, timeout: float, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+    """Run a task's blocking call on a branch thread under its own token.
+
+    The token is registered before this returns, so the task can be canceled
+    right away. ``func`` must not use the caller's DB session.
+    """
+    token = CancellationToken(timeout)
+    with _tokens_lock:
+        _tokens[task_id] = token
+
+    def run() -> Any:
+        _local.stack = [token]
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.stack = []
+            with _tokens_lock:
+                if _tokens.get(task_id) is token:
+                    del _tokens[task_id]
+
+    return _branch_executor.submit(run)
+
+
+def finish_task(task_id: int) -> None:
+    with _tokens_lock:
+        token = _tokens.pop(task_id, None)
+    stack = getattr(_local, "stack", None)
+    if stack and token is not None and token in stack:
+        stack.remove(token)
+
+
+def cancel_running_task(task_id: int) -> bool:
+    """Signal the running task; False when no task with this id runs in this process."""
+    with _tokens_lock:
+        token = _tokens.get(task_id)
+    if token is None:
+        return False
+    token.cancel()
+    return True
+
+
+def current_token() -> Optional[CancellationToken]:
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+
+def check_interrupted() -> None:
+    token = current_token()
+    if token is not None:
+        token.check()
+
+
+def sleep_interruptible(seconds: float) -> None:
+    """Sleep, but raise TaskInterrupted as soon as the bound task is canceled or times out."""
+    token = current_token()
+    if token is None:
+        time.sleep(seconds)
+        return
+    deadline = time.monotonic() + seconds
+    while True:
+        token.check()
+        left = deadline - time.monotonic()
+        if left <= 0:
+            return
+        token._canceled.wait(max(0.0, min(left, POLL_INTERVAL, token.remaining())))
+
+
+def run_interruptible(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking LLM call so the bound task's cancel/deadline can abandon it.
+
+    Without a bound token the call runs inline. Otherwise it runs on a helper
+    thread while this thread keeps checking the token; an abandoned call
+    finishes in the background within the HTTP client's own timeout.
+    """
+    token = current_token()
+    if token is None:
+        return func(*args, **kwargs)
+    token.check()
+    future = _llm_call_executor.submit(func, *args, **kwargs)
+    while True:
+        done, _ = wait([future], timeout=max(0.0, min(POLL_INTERVAL, token.remaining())), return_when=FIRST_COMPLETED)
+        if done:
+            break
+        try:
+            token.check()
+        except TaskInterrupted:
+            future.cancel()
+            raise
+    result = future.result()
+    token.check()
+    return result
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from collections import deque
+from typing import AsyncIterator, Deque, Optional
+
+from sqlalchemy import event, inspect
+from sqlmodel import Session as DBSession
+
+from app.db.schemas import Task, Session as SessionSchema
+
+EVENT_BUFFER_SIZE = 1000
+HEARTBEAT_SECONDS = 15.0
+
+_TRACKED_FLAG = "task_events_tracked"
+_PENDING_KEY = "task_events_pending"
+
+
+class TaskEvent:
+    __slots__ = ("id", "kind", "session_id", "answer_id", "data")
+
+    def __init__(self, event_id: int, kind: str, session_id: Optional[int], answer_id: Optional[int], data: dict) -> None:
+        self.id = event_id
+        self.kind = kind
+        self.session_id = session_id
+        self.answer_id = answer_id
+        self.data = data
+
+    def matches(self, session_id: Optional[int], answer_id: Optional[int]) -> bool:
+        if session_id is not None and self.session_id != session_id:
+            return False
+        if answer_id is not None and self.answer_id != answer_id:
+            return False
+        return True
+
+    def encode(self) -> str:
+        payload = json.dumps(self.data, ensure_ascii=False, default=str)
+        return f"id: {self.id}\nevent: {self.kind}\ndata: {payload}\n\n"
+
+
+class _Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop, session_id: Optional[int], answer_id: Optional[int]) -> None:
+        self.loop = loop
+        self.session_id = session_id
+        self.answer_id = answer_id
+        self.queue: asyncio.Queue[TaskEvent] = asyncio.Queue()
+
+
+class TaskEventBroker:
+    """In-process pub/sub for task status and session phase transitions.
+
+    Publishers run on worker threads; each subscriber is fed on its own event
+    loop. The most recent events are buffered so a reconnecting client can
+    resume from its Last-Event-ID.
+    """
+
+    def __init__(self, buffer_size: int = EVENT_BUFFER_SIZE) -> None:
+        self._lock = threading.Lock()
+        self._buffer: Deque[TaskEvent] = deque(maxlen=buffer_size)
+        self._subscribers: set[_Subscriber] = set()
+        self._last_id = 0
+
+    @property
+    def last_event_id(self) -> int:
+        with self._lock:
+            return self._last_id
+
+    def publish(self, kind: str, data: dict, *, session_id: Optional[int], answer_id: Optional[int] = None) -> TaskEvent:
+        with self._lock:
+            self._last_id += 1
+            item = TaskEvent(self._last_id, kind, session_id, answer_id, data)
+            self._buffer.append(item)
+            targets = [sub for sub in self._subscribers if item.matches(sub.session_id, sub.answer_id)]
+        for sub in targets:
+            try:
+                sub.loop.call_soon_threadsafe(sub.queue.put_nowait, item)
+            except RuntimeError:
+                # The subscriber's loop has shut down; it will be discarded on exit.
+                pass
+        return item
+
+    def subscribe(
+        self,
+        *,
+        session_id: Optional[int] = None,
+        answer_id: Optional[int] = None,
+        last_event_id: Optional[int] = None,
+    ) -> tuple[_Subscriber, list[TaskEvent], bool]:
+        """Register a subscriber and return the events it missed since last_event_id.
+
+        The flag is False when the requested id fell out of the buffer, in which
+        case the client has to refetch its state instead of replaying.
+        """
+        sub = _Subscriber(asyncio.get_running_loop(), session_id, answer_id)
+        with self._lock:
+            self._subscribers.add(sub)
+            if last_event_id is None:
+                return sub, [], True
+            if last_event_id > self._last_id:
+                # Id from a previous process: everything buffered is new to the client.
+                return sub, [item for item in self._buffer if item.matches(session_id, answer_id)], False
+            oldest = self._buffer[0].id if self._buffer else self._last_id + 1
+            missed = [item for item in self._buffer if item.id > last_event_id and item.matches(session_id, answer_id)]
+            complete = oldest <= last_event_id + 1
+        return sub, missed, complete
+
+    def unsubscribe(self, sub: _Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(sub)
+
+
+task_events = TaskEventBroker()
+
+
+async def stream_task_events(
+    broker: TaskEventBroker,
+    *,
+    session_id: Optional[int] = None,
+    answer_id: Optional[int] = None,
+    last_event_id: Optional[int] = None,
+    heartbeat: float = HEARTBEAT_SECONDS,
+) -> AsyncIterator[str]:
+    sub, missed, complete = broker.subscribe(
+        session_id=session_id, answer_id=answer_id, last_event_id=last_event_id
+    )
+    try:
+        yield "retry: 3000\n\n"
+        if not complete:
+            yield f"id: {broker.last_event_id}\nevent: reset\ndata: {{}}\n\n"
+        for item in missed:
+            yield item.encode()
+        while True:
+            try:
+                item = await asyncio.wait_for(sub.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield item.encode()
+    finally:
+        broker.unsubscribe(sub)
+
+
+def _task_payload(task: Task) -> dict:
+    return {
+        "id": task.id,
+        "type": task.type,
+        "status": task.status,
+        "session_id": task.session_id,
+        "answer_id": task.answer_id,
+        "error_message": task.error_message,
+        "updated_at": task.updated_at.isoformat() if task.updated_at else None,
+    }
+
+
+def _phase_fields(entity: SessionSchema) -> dict:
+    return {
+        "phase": entity.phase,
+        "phase_status": entity.phase_status,
+        "phase_error": entity.phase_error,
+    }
+
+
+def _queue_session(pending: dict, entity: SessionSchema) -> None:
+    data = {"session_id": entity.id, "status": entity.status, **_phase_fields(entity)}
+    pending[("session", entity.id)] = (data, entity.id, None)
+
+
+def queue_session_change(db: DBSession, entity: SessionSchema) -> None:
+    """Publish a session phase change written outside the ORM flush once it commits."""
+    _queue_session(db.info.setdefault(_PENDING_KEY, {}), entity)
+
+
+def _collect_changes(db: DBSession, flush_context) -> None:
+    # Snapshot in after_flush: ids are assigned and attribute history is still
+    # intact, while after_commit can no longer load expired attributes.
+    pending: dict = db.info.setdefault(_PENDING_KEY, {})
+    for obj in list(db.new) + list(db.dirty):
+        if isinstance(obj, Task):
+            if obj in db.new or inspect(obj).attrs.status.history.has_changes():
+                pending[("task", obj.id)] = (_task_payload(obj), obj.session_id, obj.answer_id)
+        elif isinstance(obj, SessionSchema):
+            attrs = inspect(obj).attrs
+            if any(attrs[name].history.has_changes() for name in ("status", "phase", "phase_status", "phase_error")):
+                _queue_session(pending, obj)
+
+
+def _publish_changes(db: DBSession) -> None:
+    pending: dict = db.info.pop(_PENDING_KEY, {})
+    for (kind, _), (data, session_id, answer_id) in pending.items():
+        task_events.publish(kind, data, session_id=session_id, answer_id=answer_id)
+
+
+def _discard_changes(db: DBSession) -> None:
+    db.info.pop(_PENDING_KEY, None)
+
+
+def track_task_events(db: DBSession) -> None:
+    """Publish task status and session phase transitions of this DB session once they commit."""
+    if db.info.get(_TRACKED_FLAG):
+        return
+    db.info[_TRACKED_FLAG] = True
+    event.listen(db, "after_flush", _collect_changes)
+    event.listen(db, "after_commit", _publish_changes)
+    event.listen(db, "after_rollback", _discard_changes)
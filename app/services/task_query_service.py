@@ -1,11 +1,17 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import List, Optional, Sequence
 
+from sqlalchemy import tuple_
 from sqlmodel import Session as DBSession, select
 
 from app.db.schemas import Task, Session as SessionSchema
-from app.models.fetch_task import TaskRead
+from app.models.fetch_task import TaskListItem, TaskRead
+
+TASK_LIST_FIELDS = tuple(TaskRead.model_fields)
+DEFAULT_TASK_LIST_FIELDS = tuple(field for field in TASK_LIST_FIELDS if field != "result_summary")
+DEFAULT_TASK_PAGE_SIZE = 50
+MAX_TASK_PAGE_SIZE = 200
 
 
 class TaskQueryService:
@@ -20,8 +26,20 @@ class TaskQueryService:
         task_type: Optional[str] = None,
         status: Optional[str] = None,
         answer_id: Optional[int] = None,
-    ) -> List[TaskRead]:
-        statement = select(Task)
+        before_id: Optional[int] = None,
+        limit: int = DEFAULT_TASK_PAGE_SIZE,
+        fields: Optional[Sequence[str]] = None,
+    ) -> tuple[List[TaskListItem], Optional[int]]:
+        """Return one page, newest first, and the before_id of the next page (None on the last)."""
+        fields = list(fields or DEFAULT_TASK_LIST_FIELDS)
+        unknown = [field for field in fields if field not in TASK_LIST_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown task fields: {', '.join(unknown)}")
+        if "id" not in fields:
+            fields.insert(0, "id")
+        limit = max(1, min(limit, MAX_TASK_PAGE_SIZE))
+        # Only the requested columns are read, so unneeded JSON blobs are never decoded.
+        statement = select(*[getattr(Task, field) for field in fields])
         if session_id is not None:
             statement = statement.where(Task.session_id == session_id)
         if answer_id is not None:
@@ -31,10 +49,19 @@ class TaskQueryService:
         if status is not None:
             statement = statement.where(Task.status == status)
         if question_id is not None:
-            statement = statement.join(SessionSchema).where(SessionSchema.question_id == question_id)
-        statement = statement.order_by(Task.created_at.desc())
-        tasks = self.session.exec(statement).all()
-        return [TaskRead.model_validate(task) for task in tasks]
+            statement = statement.join(SessionSchema, SessionSchema.id == Task.session_id).where(
+                SessionSchema.question_id == question_id
+            )
+        if before_id is not None:
+            cursor = self.session.exec(select(Task.created_at).where(Task.id == before_id)).first()
+            if cursor is None:
+                raise ValueError("before_id does not match a task")
+            statement = statement.where(tuple_(Task.created_at, Task.id) < tuple_(cursor, before_id))
+        statement = statement.order_by(Task.created_at.desc(), Task.id.desc()).limit(limit + 1)
+        rows = self.session.exec(statement).all()
+        items = [TaskListItem(**row._mapping) for row in rows[:limit]]
+        next_before_id = items[-1].id if len(rows) > limit else None
+        return items, next_before_id
 
     def get_task(self, task_id: int) -> TaskRead:
         task = self.session.get(Task, task_id)
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
-from typing import Any, Set
+import time
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import Future, wait
+from typing import Any, Callable, Set
 
 from fastapi import HTTPException, status
 from sqlmodel import Session as DBSession, select
@@ -11,7 +13,6 @@ from app.db.schemas import (
     Task,
     Session as SessionSchema,
     Question,
-    LLMConversation,
     Answer as AnswerSchema,
     AnswerGroup as AnswerGroupSchema,
     Paragraph,
@@ -22,20 +23,48 @@ from app.db.schemas import (
     FlashcardProgress,
     LiveTurn,
 )
+from app.llm import CHUNK_LEXEME_PROMPT_VERSION, CHUNK_SPLIT_PROMPT_VERSION
 from app.models.fetch_task import TaskRead
 from app.models.flashcard import FlashcardProgressCreate
+from app.services.answer_bundle_service import AnswerBundleService
+from app.services.conversation_store import ConversationStore
+from app.services.draft_diff import gap_diff
 from app.services.llm_service import QuestionLLMClient, LLMError
 from app.services.flashcard_service import FlashcardService
+from app.services.group_index import group_index, local_reuse, shortlist_size
+from app.services.live_context import LiveReplyContext
+from app.services.session_state import latest_result, record_task_result, save_session, set_phase
+from app.services.task_control import (
+    CancellationToken,
+    TaskInterrupted,
+    cancel_running_task,
+    check_interrupted,
+    finish_task,
+    start_task,
+    submit_task,
+    task_timeout,
+)
+from app.services.task_events import track_task_events
+from app.services.translation_memory_service import TranslationMemoryService, source_hash
 
 
 logger = logging.getLogger(__name__)
 
 
+def _timed_call(func: Callable[..., dict], **kwargs: Any) -> tuple[dict, datetime]:
+    result = func(**kwargs)
+    return result, datetime.now(timezone.utc)
+
+
 class TaskService:
     def __init__(self, session: DBSession, llm_client: QuestionLLMClient) -> None:
         self.session = session
         self.llm_client = llm_client
         self.flashcard_service = FlashcardService(session)
+        self.translation_memory = TranslationMemoryService(session)
+        self.conversation_store = ConversationStore(session)
+        self.bundles = AnswerBundleService(session)
+        track_task_events(session)
 
     def _question_has_answers(self, question_id: int) -> bool:
         exists = self.session.exec(
@@ -57,30 +86,43 @@ class TaskService:
         error: str | None = None,
         clear_error: bool = False,
     ) -> None:
-        progress_state = dict(session_entity.progress_state or {})
-        if phase is not None:
-            progress_state["phase"] = phase
-            new_status = self._status_from_phase(phase)
-            session_entity.status = new_status
-            if new_status != "completed":
-                session_entity.completed_at = None
-            elif session_entity.completed_at is None:
-                session_entity.completed_at = datetime.now(timezone.utc)
-        if status is not None:
-            progress_state["phase_status"] = status
-        if clear_error:
-            progress_state.pop("phase_error", None)
-        elif error is not None:
-            progress_state["phase_error"] = error
-        session_entity.progress_state = progress_state
-        session_entity.updated_at = datetime.now(timezone.utc)
-        self.session.add(session_entity)
+        set_phase(self.session, session_entity, phase=phase, status=status, error=error, clear_error=clear_error)
+
+    def _begin_task(self, task: Task) -> CancellationToken:
+        token = start_task(task.id, task_timeout(task.type))
+        self._mark_running(task)
+        return token
+
+    def _mark_running(self, task: Task) -> None:
+        task.status = "running"
+        task.updated_at = datetime.now(timezone.utc)
+        self.session.add(task)
+        self.session.commit()
+
+    def _interrupt_task(
+        self,
+        task: Task,
+        exc: TaskInterrupted,
+        session_entity: SessionSchema | None = None,
+        *,
+        phase: str | None = None,
+    ) -> None:
+        self.session.rollback()
+        task.status = exc.status
+        task.error_message = str(exc)
+        task.updated_at = datetime.now(timezone.utc)
+        self.session.add(task)
+        if session_entity is not None:
+            self._set_phase_state(session_entity, phase=phase, status="failed", error=str(exc))
+        self.session.commit()
+        self.session.refresh(task)
+        code = status.HTTP_504_GATEWAY_TIMEOUT if exc.status == "timed_out" else status.HTTP_409_CONFLICT
+        raise HTTPException(status_code=code, detail=str(exc)) from exc
 
     def _require_phase(
         self, session_entity: SessionSchema, allowed_phases: set[str], action: str
     ) -> str:
-        progress_state = session_entity.progress_state or {}
-        current = progress_state.get("phase", "draft")
+        current = session_entity.phase or "draft"
         if allowed_phases and current not in allowed_phases:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -97,58 +139,49 @@ class TaskService:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Question not found")
         self._require_phase(session_entity, {"draft", "await_eval_confirm", "await_new_group"}, "评估任务")
         self._set_phase_state(session_entity, status="running", clear_error=True)
+        has_answers = self._question_has_answers(question.id)
         task = Task(type="eval", status="pending", payload={"session_id": session_id}, session_id=session_id)
         self.session.add(task)
+        # compare_answer does not read the evaluation, so both calls go out together.
+        compare_task = None
+        if has_answers:
+            compare_task = Task(type="compare", status="pending", payload={"session_id": session_id}, session_id=session_id)
+            self.session.add(compare_task)
         self.session.commit()
+        compare_future = None
+        if compare_task is not None:
+            existing_groups, compare_kwargs, local_result = self._compare_request(question, session_entity)
+            self._mark_running(compare_task)
+            compare_start = datetime.now(timezone.utc)
+            if local_result is not None:
+                compare_future = Future()
+                compare_future.set_result((local_result, compare_start))
+            else:
+                compare_future = submit_task(
+                    compare_task.id,
+                    task_timeout("compare"),
+                    _timed_call,
+                    self.llm_client.compare_answer,
+                    **compare_kwargs,
+                )
+        self._begin_task(task)
         try:
             start = datetime.now(timezone.utc)
-            eval_result = self.llm_client.evaluate_answer(
+            eval_result, saved_at = _timed_call(
+                self.llm_client.evaluate_answer,
                 question_type=question.type,
                 question_title=question.title,
                 question_body=question.body,
                 answer_draft=session_entity.user_answer_draft or "",
             )
-            prompt_messages = eval_result.pop("_prompt_messages", None)
-            saved_at = datetime.now(timezone.utc)
-            latency = int((saved_at - start).total_seconds() * 1000)
-            conversation = LLMConversation(
-                session_id=session_id,
-                task_id=task.id,
-                purpose="eval",
-                messages={
-                    "question": question.body,
-                    "draft": session_entity.user_answer_draft or "",
-                    "prompt_messages": prompt_messages,
-                },
-                result=eval_result,
-                model_name=getattr(self.llm_client, "model", None),
-                latency_ms=latency,
-            )
-            self.session.add(conversation)
-            has_answers = self._question_has_answers(question.id)
-            eval_payload = dict(eval_result)
-            eval_payload["saved_at"] = saved_at.isoformat()
-            progress_state = dict(session_entity.progress_state or {})
-            progress_state["last_eval"] = eval_payload
-            session_entity.progress_state = progress_state
-            self._set_phase_state(
-                session_entity,
-                phase="await_eval_confirm" if has_answers else "await_new_group",
-                status="idle",
-                clear_error=True,
-            )
-            task.status = "succeeded"
-            task.result_summary = eval_payload
-            task.updated_at = datetime.now(timezone.utc)
-            self.session.add(task)
-            self.session.commit()
-            self.session.refresh(task)
-            if has_answers:
-                try:
-                    self.run_answer_compare_task(session_id)
-                except HTTPException:
-                    pass
+            self._apply_eval_result(task, session_entity, question, eval_result, start, saved_at)
+            if compare_future is None:
+                self._set_phase_state(session_entity, phase="await_new_group", status="idle", clear_error=True)
+                self.session.commit()
+                self.session.refresh(task)
+                return TaskRead.model_validate(task)
         except LLMError as exc:
+            self._abandon_branch(compare_task, compare_future)
             task.status = "failed"
             task.error_message = str(exc)
             task.updated_at = datetime.now(timezone.utc)
@@ -157,8 +190,121 @@ class TaskService:
             self._set_phase_state(session_entity, phase="draft", status="failed", error=str(exc))
             self.session.commit()
             raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc)) from exc
+        except TaskInterrupted as exc:
+            self._abandon_branch(compare_task, compare_future)
+            self._interrupt_task(task, exc, session_entity, phase="draft")
+        except Exception as exc:
+            # e.g. a 409 from save_session; nothing may stay "running" behind it.
+            self.session.rollback()
+            self._abandon_branch(compare_task, compare_future)
+            self._fail_tasks((task, compare_task), exc, session_entity, phase="draft")
+            raise
+        finally:
+            finish_task(task.id)
+
+        # Both results land in one state transition; a failed compare leaves the
+        # evaluation in place and the session waiting for a compare retry.
+        decision = None
+        try:
+            compare_result, compare_saved_at = compare_future.result()
+            decision = self._apply_compare_result(
+                compare_task, session_entity, question, existing_groups, compare_result, compare_start, compare_saved_at
+            )
+            self._set_phase_state(
+                session_entity,
+                phase="gap_highlight" if decision == "reuse" else "await_new_group",
+                status="idle",
+                clear_error=True,
+            )
+            self.session.commit()
+        except (LLMError, TaskInterrupted) as exc:
+            compare_task.status = exc.status if isinstance(exc, TaskInterrupted) else "failed"
+            compare_task.error_message = str(exc)
+            compare_task.updated_at = datetime.now(timezone.utc)
+            self.session.add(compare_task)
+            self._set_phase_state(session_entity, phase="await_eval_confirm", status="failed", error=str(exc))
+            self.session.commit()
+        except Exception as exc:
+            # The evaluation is only committed with the compare result, so both are lost.
+            self.session.rollback()
+            self._fail_tasks((task, compare_task), exc, session_entity, phase="draft")
+            raise
+        self.session.refresh(task)
+        if decision == "reuse":
+            try:
+                self.run_gap_highlight_task(session_id)
+            except HTTPException:
+                pass
         return TaskRead.model_validate(task)
 
+    def _usage_fields(self, usage: dict | None, latency_ms: int | None = None) -> dict:
+        """Conversation columns for an LLM call; the measured call replaces the client model and task timing."""
+        fields = {"model_name": getattr(self.llm_client, "model", None), "latency_ms": latency_ms}
+        fields.update({key: value for key, value in (usage or {}).items() if value is not None})
+        return fields
+
+    def _apply_eval_result(
+        self,
+        task: Task,
+        session_entity: SessionSchema,
+        question: Question,
+        eval_result: dict,
+        start: datetime,
+        saved_at: datetime,
+    ) -> None:
+        prompt_messages = eval_result.pop("_prompt_messages", None)
+        usage = eval_result.pop("_usage", None)
+        conversation = self.conversation_store.build(
+            session_id=session_entity.id,
+            task_id=task.id,
+            purpose="eval",
+            messages={
+                "question": question.body,
+                "draft": session_entity.user_answer_draft or "",
+                "prompt_messages": prompt_messages,
+            },
+            result=eval_result,
+            **self._usage_fields(usage, int((saved_at - start).total_seconds() * 1000)),
+        )
+        self.session.add(conversation)
+        eval_payload = dict(eval_result)
+        eval_payload["saved_at"] = saved_at.isoformat()
+        record_task_result(self.session, session_entity, "last_eval", task)
+        task.status = "succeeded"
+        task.result_summary = eval_payload
+        task.updated_at = datetime.now(timezone.utc)
+        self.session.add(task)
+
+    def _fail_tasks(
+        self,
+        tasks: tuple[Task | None, ...],
+        exc: Exception,
+        session_entity: SessionSchema,
+        *,
+        phase: str,
+    ) -> None:
+        detail = str(getattr(exc, "detail", None) or exc)
+        for task in tasks:
+            if task is None:
+                continue
+            task.status = "failed"
+            task.error_message = detail
+            task.updated_at = datetime.now(timezone.utc)
+            self.session.add(task)
+        self._set_phase_state(session_entity, phase=phase, status="failed", error=detail)
+        self.session.commit()
+
+    def _abandon_branch(self, task: Task | None, future: Future | None) -> None:
+        if task is None or future is None:
+            return
+        cancel_running_task(task.id)
+        wait([future])
+        task.status = "canceled"
+        task.error_message = "评估失败，对比已取消"
+        task.updated_at = datetime.now(timezone.utc)
+        self.session.add(task)
+        self.session.commit()
+
     def run_compose_task(self, session_id: int) -> TaskRead:
         session_entity = self.session.get(SessionSchema, session_id)
         if not session_entity:
@@ -172,20 +318,18 @@ class TaskService:
         self.session.add(task)
         self.session.commit()
         self.session.refresh(task)
+        self._begin_task(task)
         try:
             start = datetime.now(timezone.utc)
             progress_state = dict(session_entity.progress_state or {})
             outline_plan = self._get_question_direction_plan(question)
-            if outline_plan and not progress_state.get("outline_plan"):
-                progress_state["outline_plan"] = outline_plan
             if not progress_state.get("selected_direction_descriptor"):
                 recommended = (outline_plan or {}).get("recommended") or {}
                 if descriptor := recommended.get("title"):
                     progress_state["selected_direction_descriptor"] = descriptor
-            session_entity.progress_state = progress_state
-            self.session.add(session_entity)
-            self.session.commit()
-            last_eval = progress_state.get("last_eval") or {}
+                    save_session(self.session, session_entity, progress={"selected_direction_descriptor": descriptor})
+                    self.session.commit()
+            last_eval = latest_result(self.session, session_entity, "last_eval")
             eval_summary = None
             if last_eval:
                 score = last_eval.get("score")
@@ -213,9 +357,10 @@ class TaskService:
                 dialogue_profile_hint=dialogue_hint,
             )
             prompt_messages = compose_result.pop("_prompt_messages", None)
+            usage = compose_result.pop("_usage", None)
             saved_at = datetime.now(timezone.utc)
             latency = int((saved_at - start).total_seconds() * 1000)
-            conversation = LLMConversation(
+            conversation = self.conversation_store.build(
                 session_id=session_id,
                 task_id=task.id,
                 purpose="compose",
@@ -225,15 +370,12 @@ class TaskService:
                     "prompt_messages": prompt_messages,
                 },
                 result=compose_result,
-                model_name=getattr(self.llm_client, "model", None),
-                latency_ms=latency,
+                **self._usage_fields(usage, latency),
             )
             self.session.add(conversation)
-            progress_state = dict(session_entity.progress_state or {})
             compose_payload = dict(compose_result)
             compose_payload["saved_at"] = saved_at.isoformat()
-            progress_state["last_compose"] = compose_payload
-            session_entity.progress_state = progress_state
+            record_task_result(self.session, session_entity, "last_compose", task)
             self._set_phase_state(session_entity, phase="await_finalize", status="idle", clear_error=True)
             task.status = "succeeded"
             task.result_summary = compose_payload
@@ -250,8 +392,19 @@ class TaskService:
             self._set_phase_state(session_entity, status="failed", error=str(exc))
             self.session.commit()
             raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc)) from exc
+        except TaskInterrupted as exc:
+            self._interrupt_task(task, exc, session_entity)
+        finally:
+            finish_task(task.id)
         return TaskRead.model_validate(task)
 
+    def _is_stale(self, task: Task) -> bool:
+        """True once a task has gone without an update for longer than its type may run."""
+        updated_at = task.updated_at
+        if updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        return datetime.now(timezone.utc) - updated_at > timedelta(seconds=task_timeout(task.type))
+
     def retry_task(self, task_id: int) -> TaskRead:
         task = self._get_task(task_id)
         if not task.session_id:
@@ -270,7 +423,13 @@ class TaskService:
 
     def cancel_task(self, task_id: int) -> TaskRead:
         task = self._get_task(task_id)
-        if task.status not in {"pending", "failed"}:
+        if task.status == "running" and cancel_running_task(task_id):
+            # The worker running the task records the cancellation at its next checkpoint.
+            return TaskRead.model_validate(task)
+        if task.status == "running" and not self._is_stale(task):
+            # Another worker process or the reprocess CLI runs it and would overwrite the status.
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="任务正在其他进程中运行，无法取消")
+        if task.status not in {"pending", "running", "failed"}:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Task cannot be canceled")
         task.status = "canceled"
         task.updated_at = datetime.now(timezone.utc)
@@ -280,6 +439,17 @@ class TaskService:
         return TaskRead.model_validate(task)
 
     def generate_live_reply(self, session_id: int, turn_id: int) -> dict:
+        request = self.prepare_live_reply(session_id, turn_id)
+        return self.complete_live_reply(request)
+
+    def prepare_live_reply(self, session_id: int, turn_id: int) -> dict:
+        turn = self.session.get(LiveTurn, turn_id)
+        if not turn or turn.session_id != session_id:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Live turn not found")
+        context = self.load_live_context(session_id, before_turn_index=turn.turn_index)
+        return context.build_request(turn.turn_index, turn.candidate_query)
+
+    def load_live_context(self, session_id: int, *, before_turn_index: int | None = None) -> LiveReplyContext:
         session_entity = self.session.get(SessionSchema, session_id)
         if not session_entity:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
@@ -288,54 +458,82 @@ class TaskService:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Question not found")
         if question.type != "T2":
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="仅 T2 题目支持实时对话")
-        turn = self.session.get(LiveTurn, turn_id)
-        if not turn:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Live turn not found")
-        history_statement = (
-            select(LiveTurn)
-            .where(LiveTurn.session_id == session_id)
-            .order_by(LiveTurn.turn_index)
-        )
-        history_rows = self.session.exec(history_statement).all()
-        tail_history = history_rows[-5:]
-        history_payload = [
-            {
-                "turn_index": item.turn_index,
-                "candidate_query": item.candidate_query,
-                "examiner_reply": item.examiner_reply,
-                "candidate_followup": item.candidate_followup,
-            }
-            for item in tail_history
-        ]
         progress_state = dict(session_entity.progress_state or {})
-        outline_plan = progress_state.get("outline_plan") or self._get_question_direction_plan(question)
+        outline_plan = self._get_question_direction_plan(question)
         direction_hint = self._build_direction_hint(
             outline_plan,
             progress_state.get("selected_direction_descriptor"),
             session_entity.answer_id is None,
         )
         dialogue_hint = self._build_dialogue_profile_hint(question, session_entity, progress_state)
+        context = LiveReplyContext(
+            session_id=session_id,
+            question_type=question.type,
+            question_title=question.title,
+            question_body=question.body,
+            direction_hint=direction_hint,
+            dialogue_profile_hint=dialogue_hint,
+        )
+        history_statement = (
+            select(LiveTurn)
+            .where(LiveTurn.session_id == session_id)
+            .order_by(LiveTurn.turn_index)
+        )
+        if before_turn_index is not None:
+            history_statement = history_statement.where(LiveTurn.turn_index < before_turn_index)
+        for item in self.session.exec(history_statement).all():
+            context.remember(
+                {
+                    "turn_index": item.turn_index,
+                    "candidate_query": item.candidate_query,
+                    "examiner_reply": item.examiner_reply,
+                    "candidate_followup": item.candidate_followup,
+                }
+            )
+        return context
+
+    def complete_live_reply(self, request: dict, on_delta: Callable[[str], None] | None = None) -> dict:
+        start = time.perf_counter()
+        first_delta_at: float | None = None
+
+        def forward_delta(delta: str) -> None:
+            nonlocal first_delta_at
+            if first_delta_at is None:
+                first_delta_at = time.perf_counter()
+            on_delta(delta)
+
         try:
+            # Only a caller that forwards deltas gets a stream; a plain call keeps its retries.
             reply_result = self.llm_client.generate_live_reply(
-                question_type=question.type,
-                question_title=question.title,
-                question_body=question.body,
-                history=history_payload,
-                candidate_query=turn.candidate_query,
-                direction_hint=direction_hint,
-                dialogue_profile_hint=dialogue_hint,
-                turn_index=turn.turn_index,
+                **request, on_delta=forward_delta if on_delta else None
             )
         except LLMError as exc:
             raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc)) from exc
+        finished_at = time.perf_counter()
         reply_text = (reply_result or {}).get("reply", "").strip()
         if not reply_text:
             raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="LLM 未返回任何回复")
         meta_payload = dict(reply_result or {})
         meta_payload.pop("reply", None)
-        meta = {"live_result": meta_payload}
-        self.session.refresh(turn)
-        return {"text": reply_text, "meta": meta}
+        prompt_messages = meta_payload.pop("_prompt_messages", None)
+        usage = meta_payload.pop("_usage", None)
+        total_ms = int((finished_at - start) * 1000)
+        conversation = {
+            "purpose": "live",
+            "messages": {"candidate_query": request.get("candidate_query"), "prompt_messages": prompt_messages},
+            "result": {"reply": reply_text, **meta_payload},
+            **self._usage_fields(usage, total_ms),
+        }
+        meta = {
+            "live_result": meta_payload,
+            "timing": {
+                # When the first piece of the "reply" field reached the client, not the first raw chunk.
+                "first_reply_delta_ms": int((first_delta_at - start) * 1000) if first_delta_at else total_ms,
+                "total_ms": total_ms,
+                "streamed": first_delta_at is not None,
+            },
+        }
+        return {"text": reply_text, "meta": meta, "conversation": conversation}
 
     def run_answer_compare_task(self, session_id: int) -> TaskRead:
         session_entity = self.session.get(SessionSchema, session_id)
@@ -346,97 +544,33 @@ class TaskService:
         question = self.session.get(Question, session_entity.question_id)
         if not question:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Question not found")
-        answer_groups = self.session.exec(
-            select(AnswerGroupSchema).where(AnswerGroupSchema.question_id == question.id)
-        ).all()
-        existing_groups: list[dict[str, Any]] = []
-        for group in answer_groups:
-            existing_groups.append(
-                {
-                    "answer_group_id": group.id,
-                    "direction_descriptor": group.direction_descriptor or f"方向#{group.id}",
-                    "dialogue_profile": group.dialogue_profile or {},
-                }
-            )
+        existing_groups, compare_kwargs, local_result = self._compare_request(question, session_entity)
         task = Task(type="compare", status="pending", payload={"session_id": session_id}, session_id=session_id)
         self.session.add(task)
         self.session.commit()
-        progress_state = dict(session_entity.progress_state or {})
+        self._begin_task(task)
         try:
             start = datetime.now(timezone.utc)
-            progress_state = dict(session_entity.progress_state or {})
-            outline_plan = progress_state.get("outline_plan")
-            if not outline_plan:
-                outline_plan = self._get_question_direction_plan(question)
-                if outline_plan:
-                    progress_state["outline_plan"] = outline_plan
-            direction_plan_text = self._format_outline_plan(outline_plan)
-            compare_result = self.llm_client.compare_answer(
-                question_type=question.type,
-                question_title=question.title,
-                question_body=question.body,
-                answer_draft=session_entity.user_answer_draft or "",
-                direction_plan=direction_plan_text,
-                existing_groups=existing_groups,
+            if local_result is not None:
+                compare_result, saved_at = local_result, start
+            else:
+                compare_result, saved_at = _timed_call(self.llm_client.compare_answer, **compare_kwargs)
+            decision = self._apply_compare_result(
+                task, session_entity, question, existing_groups, compare_result, start, saved_at
             )
-            prompt_messages = compare_result.pop("_prompt_messages", None)
-            saved_at = datetime.now(timezone.utc)
-            latency = int((saved_at - start).total_seconds() * 1000)
-            conversation = LLMConversation(
-                session_id=session_id,
-                task_id=task.id,
-                purpose="compare",
-                messages={
-                    "question": question.body,
-                    "draft": session_entity.user_answer_draft or "",
-                    "existing_groups": existing_groups,
-                    "prompt_messages": prompt_messages,
-                },
-                result=compare_result,
-                model_name=getattr(self.llm_client, "model", None),
-                latency_ms=latency,
+            self._set_phase_state(
+                session_entity,
+                phase="gap_highlight" if decision == "reuse" else "await_new_group",
+                status="idle",
+                clear_error=True,
             )
-            self.session.add(conversation)
-            compare_payload = dict(compare_result)
-            compare_payload["saved_at"] = saved_at.isoformat()
-            progress_state["last_compare"] = compare_payload
-            direction_match = compare_payload.get("direction_descriptor")
-            if direction_match:
-                progress_state["direction_match"] = direction_match
-                progress_state["selected_direction_descriptor"] = direction_match
-            decision = compare_payload.get("decision")
-            matched_group_id = compare_payload.get("matched_answer_group_id")
-            if decision == "reuse":
-                if matched_group_id:
-                    progress_state["selected_answer_group_id"] = matched_group_id
-                progress_state["phase"] = "gap_highlight"
-                if not direction_match and compare_payload.get("matched_answer_group_id"):
-                    matched_group = self.session.get(
-                        AnswerGroupSchema, compare_payload.get("matched_answer_group_id")
-                    )
-                    if matched_group and matched_group.direction_descriptor:
-                        progress_state["selected_direction_descriptor"] = matched_group.direction_descriptor
-            elif decision == "new_group":
-                progress_state.pop("selected_answer_group_id", None)
-                progress_state["phase"] = "await_new_group"
-            session_entity.progress_state = progress_state
-            session_entity.updated_at = datetime.now(timezone.utc)
-            self.session.add(session_entity)
-            task.status = "succeeded"
-            task.result_summary = compare_payload
-            task.updated_at = datetime.now(timezone.utc)
-            self.session.add(task)
             self.session.commit()
             self.session.refresh(task)
-            decision = compare_payload.get("decision")
             if decision == "reuse":
-                self._set_phase_state(session_entity, phase="gap_highlight", status="idle", clear_error=True)
                 try:
                     self.run_gap_highlight_task(session_id)
                 except HTTPException:
                     pass
-            else:
-                self._set_phase_state(session_entity, phase="await_new_group", status="idle", clear_error=True)
         except LLMError as exc:
             task.status = "failed"
             task.error_message = str(exc)
@@ -446,8 +580,119 @@ class TaskService:
             self._set_phase_state(session_entity, phase="await_eval_confirm", status="failed", error=str(exc))
             self.session.commit()
             raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc)) from exc
+        except TaskInterrupted as exc:
+            self._interrupt_task(task, exc, session_entity, phase="await_eval_confirm")
+        finally:
+            finish_task(task.id)
         return TaskRead.model_validate(task)
 
+    def _compare_request(
+        self, question: Question, session_entity: SessionSchema
+    ) -> tuple[list[dict], dict, dict | None]:
+        """The groups to show the LLM, the compare_answer arguments, and a local result if no call is needed.
+
+        Groups are ranked by local similarity to the draft and only a
+        shortlist goes into the prompt; a near-identical draft reuses its
+        group without an LLM call.
+        """
+        draft = session_entity.user_answer_draft or ""
+        matches = group_index(self.session, question.id).rank(draft)
+        shortlist = [match.answer_group_id for match in matches[: shortlist_size()]]
+        answer_groups = {
+            group.id: group
+            for group in self.session.exec(select(AnswerGroupSchema).where(AnswerGroupSchema.id.in_(shortlist)))
+        }
+        existing_groups: list[dict[str, Any]] = []
+        for group_id in shortlist:
+            group = answer_groups[group_id]
+            existing_groups.append(
+                {
+                    "answer_group_id": group.id,
+                    "direction_descriptor": group.direction_descriptor or f"方向#{group.id}",
+                    "dialogue_profile": group.dialogue_profile or {},
+                }
+            )
+        local_result = None
+        if draft.strip() and (match := local_reuse(matches)):
+            group = answer_groups[match.answer_group_id]
+            local_result = {
+                "decision": "reuse",
+                "matched_answer_group_id": group.id,
+                "direction_descriptor": group.direction_descriptor,
+                "reason": f"草稿与答案组 #{group.id} 高度相似（本地相似度 {match.score:.2f}）",
+                "differences": [],
+                "coverage_score": None,
+                "local_similarity": round(match.score, 4),
+            }
+        outline_plan = self._get_question_direction_plan(question)
+        return existing_groups, {
+            "question_type": question.type,
+            "question_title": question.title,
+            "question_body": question.body,
+            "answer_draft": draft,
+            "direction_plan": self._format_outline_plan(outline_plan),
+            "existing_groups": existing_groups,
+        }, local_result
+
+    def _apply_compare_result(
+        self,
+        task: Task,
+        session_entity: SessionSchema,
+        question: Question,
+        existing_groups: list[dict],
+        compare_result: dict,
+        start: datetime,
+        saved_at: datetime,
+    ) -> str | None:
+        """Store the compare outcome on the task and session; the caller sets the phase and commits."""
+        prompt_messages = compare_result.pop("_prompt_messages", None)
+        usage = compare_result.pop("_usage", None)
+        # A local match made no LLM call, so there is no conversation to log.
+        if "local_similarity" not in compare_result:
+            conversation = self.conversation_store.build(
+                session_id=session_entity.id,
+                task_id=task.id,
+                purpose="compare",
+                messages={
+                    "question": question.body,
+                    "draft": session_entity.user_answer_draft or "",
+                    "existing_groups": existing_groups,
+                    "prompt_messages": prompt_messages,
+                },
+                result=compare_result,
+                **self._usage_fields(usage, int((saved_at - start).total_seconds() * 1000)),
+            )
+            self.session.add(conversation)
+        compare_payload = dict(compare_result)
+        compare_payload["saved_at"] = saved_at.isoformat()
+        record_task_result(self.session, session_entity, "last_compare", task)
+        direction_match = compare_payload.get("direction_descriptor")
+        progress_updates: dict = {}
+        progress_removed: list[str] = []
+        if direction_match:
+            progress_updates["direction_match"] = direction_match
+            progress_updates["selected_direction_descriptor"] = direction_match
+        decision = compare_payload.get("decision")
+        matched_group_id = compare_payload.get("matched_answer_group_id")
+        if decision == "reuse":
+            if matched_group_id:
+                progress_updates["selected_answer_group_id"] = matched_group_id
+            if not direction_match and compare_payload.get("matched_answer_group_id"):
+                matched_group = self.session.get(
+                    AnswerGroupSchema, compare_payload.get("matched_answer_group_id")
+                )
+                if matched_group and matched_group.direction_descriptor:
+                    progress_updates["selected_direction_descriptor"] = matched_group.direction_descriptor
+        elif decision == "new_group" and "selected_answer_group_id" in (session_entity.progress_state or {}):
+            progress_removed.append("selected_answer_group_id")
+        if progress_updates or progress_removed:
+            save_session(self.session, session_entity, progress=progress_updates, removed=progress_removed)
+        task.status = "succeeded"
+        task.result_summary = compare_payload
+        task.updated_at = datetime.now(timezone.utc)
+        self.session.add(task)
+        return decision
+
     def _get_reference_answer_text(self, question_id: int, prefer_group_id: int | None) -> str:
         group_ids = []
         if prefer_group_id:
@@ -478,28 +723,31 @@ class TaskService:
         question = self.session.get(Question, session_entity.question_id)
         if not question:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Question not found")
-        compare_state = session_entity.progress_state or {}
-        last_compare = compare_state.get("last_compare") or {}
+        last_compare = latest_result(self.session, session_entity, "last_compare")
         reference_text = self._get_reference_answer_text(
             question.id,
             last_compare.get("matched_answer_group_id"),
         )
+        # Only the sentences where draft and reference differ go into the prompt.
+        diff = gap_diff(session_entity.user_answer_draft or "", reference_text)
         task = Task(type="gap_highlight", status="pending", payload={"session_id": session_id}, session_id=session_id)
         self.session.add(task)
         self.session.commit()
+        self._begin_task(task)
         try:
             start = datetime.now(timezone.utc)
             highlight = self.llm_client.highlight_gaps(
                 question_type=question.type,
                 question_title=question.title,
                 question_body=question.body,
-                answer_draft=session_entity.user_answer_draft or "",
-                reference_answer=reference_text,
+                answer_draft=diff.draft,
+                reference_answer=diff.reference,
             )
             prompt_messages = highlight.pop("_prompt_messages", None)
+            usage = highlight.pop("_usage", None)
             saved_at = datetime.now(timezone.utc)
             latency = int((saved_at - start).total_seconds() * 1000)
-            conversation = LLMConversation(
+            conversation = self.conversation_store.build(
                 session_id=session_id,
                 task_id=task.id,
                 purpose="gap_highlight",
@@ -507,11 +755,12 @@ class TaskService:
                     "question": question.body,
                     "draft": session_entity.user_answer_draft or "",
                     "reference_answer": reference_text,
+                    "omitted_sentences": diff.omitted_sentences,
+                    "total_sentences": diff.total_sentences,
                     "prompt_messages": prompt_messages,
                 },
                 result=highlight,
-                model_name=getattr(self.llm_client, "model", None),
-                latency_ms=latency,
+                **self._usage_fields(usage, latency),
             )
             self.session.add(conversation)
             payload = dict(highlight)
@@ -536,6 +785,10 @@ class TaskService:
             self._set_phase_state(session_entity, phase="gap_highlight", status="failed", error=str(exc))
             self.session.commit()
             raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc)) from exc
+        except TaskInterrupted as exc:
+            self._interrupt_task(task, exc, session_entity, phase="gap_highlight")
+        finally:
+            finish_task(task.id)
         return TaskRead.model_validate(task)
 
     def run_refine_answer_task(self, session_id: int, gap_notes: dict | None = None) -> TaskRead:
@@ -552,6 +805,7 @@ class TaskService:
         task = Task(type="refine_answer", status="pending", payload={"session_id": session_id}, session_id=session_id)
         self.session.add(task)
         self.session.commit()
+        self._begin_task(task)
         try:
             start = datetime.now(timezone.utc)
             refined = self.llm_client.refine_answer(
@@ -562,9 +816,10 @@ class TaskService:
                 gap_notes=gap_notes,
             )
             prompt_messages = refined.pop("_prompt_messages", None)
+            usage = refined.pop("_usage", None)
             saved_at = datetime.now(timezone.utc)
             latency = int((saved_at - start).total_seconds() * 1000)
-            conversation = LLMConversation(
+            conversation = self.conversation_store.build(
                 session_id=session_id,
                 task_id=task.id,
                 purpose="refine_answer",
@@ -575,8 +830,7 @@ class TaskService:
                     "prompt_messages": prompt_messages,
                 },
                 result=refined,
-                model_name=getattr(self.llm_client, "model", None),
-                latency_ms=latency,
+                **self._usage_fields(usage, latency),
             )
             self.session.add(conversation)
             payload = dict(refined)
@@ -597,15 +851,99 @@ class TaskService:
             self._set_phase_state(session_entity, phase="refine", status="failed", error=str(exc))
             self.session.commit()
             raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc)) from exc
+        except TaskInterrupted as exc:
+            self._interrupt_task(task, exc, session_entity, phase="refine")
+        finally:
+            finish_task(task.id)
         return TaskRead.model_validate(task)
 
-    def run_structure_pipeline_for_answer(self, answer_id: int, session_id: int | None = None) -> None:
+    def run_structure_pipeline_for_answer(self, answer_id: int, session_id: int | None = None) -> dict:
         session_entity: SessionSchema | None = None
         if session_id:
             session_entity = self.session.get(SessionSchema, session_id)
             if session_entity:
                 self._set_phase_state(session_entity, phase="structure_pipeline", status="running", clear_error=True)
                 self.session.commit()
+        error_message: str | None = None
+        llm_calls = 0
+        try:
+            self.run_structure_task_for_answer(answer_id)
+            llm_calls += 1
+            check_interrupted()
+            sentences = self.session.exec(
+                select(Sentence)
+                .join(Paragraph, Paragraph.id == Sentence.paragraph_id)
+                .where(Paragraph.answer_id == answer_id)
+                .order_by(Paragraph.order_index, Sentence.order_index)
+            ).all()
+            untranslated = [sentence.id for sentence in sentences if not (sentence.translation_en and sentence.translation_zh)]
+            if untranslated:
+                translation = self.run_sentence_translation_for_answer(answer_id, sentence_ids=untranslated)
+                if translation.result_summary.get("memory_misses"):
+                    llm_calls += 1
+            # Skipping the translation call must not skip the cards it used to create.
+            for sentence in sentences:
+                self._ensure_sentence_flashcard(sentence.id)
+            reprocessed = 0
+            for sentence_id in [sentence.id for sentence in sentences]:
+                check_interrupted()
+                needs_chunks, needs_lexemes = self._sentence_pending_steps(sentence_id)
+                if needs_chunks:
+                    chunk_task = self.run_chunk_task(sentence_id)
+                    if not chunk_task.result_summary.get("cache_hit"):
+                        llm_calls += 1
+                    # Chunks cloned from an identical sentence may carry their lexemes too.
+                    _, needs_lexemes = self._sentence_pending_steps(sentence_id)
+                if needs_lexemes:
+                    self.run_chunk_lexeme_task(sentence_id)
+                    llm_calls += 1
+                if needs_chunks or needs_lexemes:
+                    reprocessed += 1
+        except HTTPException as exc:
+            error_message = exc.detail if isinstance(exc.detail, str) else str(exc)
+            raise
+        except TaskInterrupted as exc:
+            # Drop the unfinished step so the session is marked failed, not learning/idle.
+            self.session.rollback()
+            error_message = str(exc) or exc.status
+            raise
+        finally:
+            if session_entity:
+                if not error_message:
+                    issues = self._find_structure_gaps(answer_id)
+                    if issues:
+                        error_message = issues
+                if error_message:
+                    self._set_phase_state(
+                        session_entity, phase="structure_pipeline", status="failed", error=error_message
+                    )
+                else:
+                    self._set_phase_state(session_entity, phase="learning", status="idle", clear_error=True)
+                self.session.commit()
+        if not error_message:
+            self.bundles.write(answer_id)
+            self.session.commit()
+        # A full rebuild costs one structure call, one batched translation and
+        # a chunk plus a lexeme call per sentence.
+        full_rebuild_calls = 2 + 2 * len(sentences)
+        return {
+            "sentences": len(sentences),
+            "reprocessed_sentences": reprocessed,
+            "llm_calls": llm_calls,
+            "llm_calls_saved": full_rebuild_calls - llm_calls,
+        }
+
+    def _sentence_pending_steps(self, sentence_id: int) -> tuple[bool, bool]:
+        chunks = self.session.exec(select(SentenceChunk).where(SentenceChunk.sentence_id == sentence_id)).all()
+        if not chunks:
+            return True, True
+        for chunk in chunks:
+            if chunk.id is None or not self._chunk_requires_lexeme(chunk):
+                continue
+            linked = self.session.exec(select(ChunkLexeme.id).where(ChunkLexeme.chunk_id == chunk.id)).first()
+            if not linked:
+                return False, True
+        return False, False
 
     def run_structure_pipeline_task(self, session_id: int, answer_id: int) -> TaskRead:
         task = Task(
@@ -618,16 +956,24 @@ class TaskService:
         self.session.add(task)
         self.session.commit()
         self.session.refresh(task)
+        token = self._begin_task(task)
         try:
-            self.run_structure_pipeline_for_answer(answer_id, session_id=session_id)
+            report = self.run_structure_pipeline_for_answer(answer_id, session_id=session_id)
             task.status = "succeeded"
-            task.result_summary = {"status": "completed"}
+            task.result_summary = {"status": "completed", **report}
             task.updated_at = datetime.now(timezone.utc)
             task.error_message = None
             self.session.add(task)
             self.session.commit()
             self.session.refresh(task)
         except HTTPException as exc:
+            if token.canceled or token.remaining() <= 0:
+                # A step gave up because this pipeline was canceled or ran out of time.
+                try:
+                    token.check()
+                except TaskInterrupted as interrupted:
+                    session_entity = self.session.get(SessionSchema, session_id)
+                    self._interrupt_task(task, interrupted, session_entity, phase="structure_pipeline")
             task.status = "failed"
             detail = exc.detail if isinstance(exc.detail, str) else str(exc.detail)
             task.error_message = detail
@@ -636,37 +982,12 @@ class TaskService:
             self.session.commit()
             self.session.refresh(task)
             raise
-        return TaskRead.model_validate(task)
-        error_message: str | None = None
-        try:
-            self.run_structure_task_for_answer(answer_id)
-            self.run_sentence_translation_for_answer(answer_id)
-            sentence_rows = self.session.exec(
-            select(Sentence.id)
-            .join(Paragraph, Paragraph.id == Sentence.paragraph_id)
-            .where(Paragraph.answer_id == answer_id)
-            .order_by(Paragraph.order_index, Sentence.order_index)
-        ).all()
-            for row in sentence_rows:
-                sentence_id = row if isinstance(row, int) else row[0]
-                self.run_chunk_task(sentence_id)
-                self.run_chunk_lexeme_task(sentence_id)
-        except HTTPException as exc:
-            error_message = exc.detail if isinstance(exc.detail, str) else str(exc)
-            raise
+        except TaskInterrupted as exc:
+            session_entity = self.session.get(SessionSchema, session_id)
+            self._interrupt_task(task, exc, session_entity, phase="structure_pipeline")
         finally:
-            if session_entity:
-                if not error_message:
-                    issues = self._find_structure_gaps(answer_id)
-                    if issues:
-                        error_message = issues
-                if error_message:
-                    self._set_phase_state(
-                        session_entity, phase="structure_pipeline", status="failed", error=error_message
-                    )
-                else:
-                    self._set_phase_state(session_entity, phase="learning", status="idle", clear_error=True)
-                self.session.commit()
+            finish_task(task.id)
+        return TaskRead.model_validate(task)
 
     def _find_structure_gaps(self, answer_id: int) -> str | None:
         sentence_rows = self.session.exec(
@@ -705,10 +1026,6 @@ class TaskService:
         if chunks_missing_lexemes:
             preview = "；".join(chunks_missing_lexemes[:3])
             return f"部分记忆块缺少关键词，请重新运行 chunk lexeme 任务。示例：{preview}"
-        if incomplete_sentences:
-            return "部分句子尚未拆分记忆块，请重新运行结构任务"
-        if incomplete_chunks:
-            return "部分记忆块尚未生成关键词，请重新运行 chunk lexeme 任务"
         return None
 
     def _chunk_requires_lexeme(self, chunk: SentenceChunk) -> bool:
@@ -753,6 +1070,7 @@ class TaskService:
             self.session.delete(lexeme)
 
     def _remove_sentence_chunks(self, sentence_id: int) -> None:
+        """Flush-only, so a failed re-chunk rolls the old chunks back with its own writes."""
         chunks = self.session.exec(
             select(SentenceChunk).where(SentenceChunk.sentence_id == sentence_id)
         ).all()
@@ -763,7 +1081,7 @@ class TaskService:
         self._remove_chunk_flashcards(chunk_ids)
         for chunk in chunks:
             self.session.delete(chunk)
-        self.session.commit()
+        self.session.flush()
         self._cleanup_orphan_lexemes(orphan_candidates)
 
     def _clear_chunk_lexemes(self, chunk_ids: list[int]) -> Set[int]:
@@ -777,7 +1095,7 @@ class TaskService:
             if link.lexeme_id:
                 orphan_candidates.add(link.lexeme_id)
             self.session.delete(link)
-        self.session.commit()
+        self.session.flush()
         return orphan_candidates
 
     def _remove_chunk_flashcards(self, chunk_ids: list[int]) -> None:
@@ -797,13 +1115,6 @@ class TaskService:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
         return task
 
-    def _status_from_phase(self, phase: str) -> str:
-        if phase == "completed":
-            return "completed"
-        if phase == "draft":
-            return "draft"
-        return "in_progress"
-
     def _get_question_direction_plan(self, question: Question | None) -> dict | None:
         if not question:
             return None
@@ -967,6 +1278,7 @@ class TaskService:
         self.session.add(task)
         self.session.commit()
         self.session.refresh(task)
+        self._begin_task(task)
         try:
             structure = self.llm_client.structure_answer(
                 question_type=question.type,
@@ -976,67 +1288,34 @@ class TaskService:
             )
             if not isinstance(structure, dict):
                 raise LLMError("LLM 没有返回结构化结果")
+            usage = structure.pop("_usage", None)
             paragraphs_payload = structure.get("paragraphs") or []
             total_paragraphs = len(paragraphs_payload)
             print("Structuring answer into", total_paragraphs, "paragraphs")
             with self.session.begin_nested():
-                existing_paragraphs = self.session.exec(
-                    select(Paragraph).where(Paragraph.answer_id == answer_id)
-                ).all()
-                for paragraph in existing_paragraphs:
-                    sentences = self.session.exec(
-                        select(Sentence).where(Sentence.paragraph_id == paragraph.id)
-                    ).all()
-                    for sentence in sentences:
-                        self.session.delete(sentence)
-                    self.session.delete(paragraph)
-                print("Deleted", len(existing_paragraphs), "existing paragraphs for answer", answer_id)
-                for idx, para in enumerate(paragraphs_payload, start=1):
-                    para_extra = para.get("extra")
-                    if not isinstance(para_extra, dict):
-                        para_extra = {}
-                    role_label = para.get("role")
-                    if question.type == "T2":
-                        role_label = self._normalize_t2_role(
-                            role_label,
-                            para_extra,
-                            idx,
-                            total_paragraphs,
-                        )
-                    paragraph = Paragraph(
-                        answer_id=answer_id,
-                        order_index=idx,
-                        role_label=role_label,
-                        summary=para.get("summary"),
-                        extra=para_extra,
-                    )
-                    self.session.add(paragraph)
-                    self.session.flush()
-                    for s_idx, sentence_data in enumerate(para.get("sentences", []), start=1):
-                        translation_en = sentence_data.get("translation_en") or sentence_data.get("translation")
-                        sentence = Sentence(
-                            paragraph_id=paragraph.id,
-                            order_index=s_idx,
-                            text=sentence_data.get("text", ""),
-                            translation_en=translation_en,
-                            translation_zh=sentence_data.get("translation_zh"),
-                            difficulty=sentence_data.get("difficulty"),
-                            extra={},
-                        )
-                        self.session.add(sentence)
-
-                conversation = LLMConversation(
+                diff = self._merge_structure(answer_id, question.type, paragraphs_payload)
+                logger.info(
+                    "structure_task.merged",
+                    extra={
+                        "task_id": task.id,
+                        "answer_id": answer_id,
+                        "kept": diff["kept"],
+                        "added": diff["added"],
+                        "removed": diff["removed"],
+                    },
+                )
+
+                conversation = self.conversation_store.build(
                     session_id=None,
                     task_id=task.id,
                     purpose="structure",
                     messages={"answer": answer.text},
                     result=structure,
-                    model_name=getattr(self.llm_client, "model", None),
-                    latency_ms=None,
+                    **self._usage_fields(usage),
                 )
                 self.session.add(conversation)
                 task.status = "succeeded"
-                task.result_summary = structure
+                task.result_summary = {**structure, "diff": diff}
                 task.updated_at = datetime.now(timezone.utc)
                 task.error_message = None
                 self.session.add(task)
@@ -1070,9 +1349,117 @@ class TaskService:
             self.session.add(task)
             self.session.commit()
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="结构化任务处理失败") from exc
+        except TaskInterrupted as exc:
+            self._interrupt_task(task, exc)
+        finally:
+            finish_task(task.id)
         return TaskRead.model_validate(task)
 
-    def run_sentence_translation_for_answer(self, answer_id: int) -> TaskRead:
+    def _merge_structure(self, answer_id: int, question_type: str, paragraphs_payload: list[dict]) -> dict:
+        existing_paragraphs = self.session.exec(
+            select(Paragraph).where(Paragraph.answer_id == answer_id).order_by(Paragraph.order_index)
+        ).all()
+        existing_sentences = self.session.exec(
+            select(Sentence)
+            .join(Paragraph, Paragraph.id == Sentence.paragraph_id)
+            .where(Paragraph.answer_id == answer_id)
+            .order_by(Paragraph.order_index, Sentence.order_index)
+        ).all()
+        reusable: dict[str, list[Sentence]] = {}
+        for sentence in existing_sentences:
+            # Hashed from the text, not the stored column, so rows hashed before the
+            # normalization matched the translation memory's still line up. Case is
+            # kept: chunks and lexemes quote the sentence, so a case edit is a new one.
+            reusable.setdefault(source_hash(sentence.text, casefold=False), []).append(sentence)
+
+        total_paragraphs = len(paragraphs_payload)
+        kept_ids: list[int] = []
+        added: list[Sentence] = []
+        for idx, para in enumerate(paragraphs_payload, start=1):
+            para_extra = para.get("extra")
+            if not isinstance(para_extra, dict):
+                para_extra = {}
+            role_label = para.get("role")
+            if question_type == "T2":
+                role_label = self._normalize_t2_role(role_label, para_extra, idx, total_paragraphs)
+            if idx <= len(existing_paragraphs):
+                paragraph = existing_paragraphs[idx - 1]
+            else:
+                paragraph = Paragraph(answer_id=answer_id, order_index=idx)
+            paragraph.role_label = role_label
+            paragraph.summary = para.get("summary")
+            paragraph.extra = para_extra
+            self.session.add(paragraph)
+            self.session.flush()
+            for s_idx, sentence_data in enumerate(para.get("sentences", []), start=1):
+                text_value = sentence_data.get("text", "")
+                content_hash = source_hash(text_value, casefold=False)
+                translation_en = sentence_data.get("translation_en") or sentence_data.get("translation")
+                candidates = reusable.get(content_hash)
+                if candidates:
+                    # Unchanged text (up to spacing): keep the row so its chunks,
+                    # lexemes and flashcards survive.
+                    sentence = candidates.pop(0)
+                    sentence.paragraph_id = paragraph.id
+                    sentence.order_index = s_idx
+                    sentence.text = text_value
+                    sentence.content_hash = content_hash
+                    sentence.translation_en = sentence.translation_en or translation_en
+                    sentence.translation_zh = sentence.translation_zh or sentence_data.get("translation_zh")
+                    sentence.difficulty = sentence.difficulty or sentence_data.get("difficulty")
+                    kept_ids.append(sentence.id)
+                else:
+                    sentence = Sentence(
+                        paragraph_id=paragraph.id,
+                        order_index=s_idx,
+                        text=text_value,
+                        content_hash=content_hash,
+                        translation_en=translation_en,
+                        translation_zh=sentence_data.get("translation_zh"),
+                        difficulty=sentence_data.get("difficulty"),
+                        extra={},
+                    )
+                    added.append(sentence)
+                self.session.add(sentence)
+
+        removed = [sentence for candidates in reusable.values() for sentence in candidates]
+        for sentence in removed:
+            self._remove_sentence(sentence)
+        for paragraph in existing_paragraphs[total_paragraphs:]:
+            self.session.delete(paragraph)
+        self.session.flush()
+        return {
+            "kept": len(kept_ids),
+            "added": len(added),
+            "removed": len(removed),
+            "kept_sentence_ids": kept_ids,
+            "added_sentence_ids": [sentence.id for sentence in added],
+        }
+
+    def _remove_sentence(self, sentence: Sentence) -> None:
+        chunk_ids = list(
+            self.session.exec(select(SentenceChunk.id).where(SentenceChunk.sentence_id == sentence.id)).all()
+        )
+        if chunk_ids:
+            links = self.session.exec(select(ChunkLexeme).where(ChunkLexeme.chunk_id.in_(chunk_ids))).all()
+            orphan_candidates = {link.lexeme_id for link in links if link.lexeme_id}
+            for link in links:
+                self.session.delete(link)
+            self._remove_chunk_flashcards(chunk_ids)
+            for chunk in self.session.exec(select(SentenceChunk).where(SentenceChunk.id.in_(chunk_ids))).all():
+                self.session.delete(chunk)
+            self.session.flush()
+            self._cleanup_orphan_lexemes(orphan_candidates)
+        cards = self.session.exec(
+            select(FlashcardProgress)
+            .where(FlashcardProgress.entity_type == "sentence")
+            .where(FlashcardProgress.entity_id == sentence.id)
+        ).all()
+        for card in cards:
+            self.session.delete(card)
+        self.session.delete(sentence)
+
+    def run_sentence_translation_for_answer(self, answer_id: int, sentence_ids: list[int] | None = None) -> TaskRead:
         answer = self.session.get(AnswerSchema, answer_id)
         if not answer:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Answer not found")
@@ -1090,6 +1477,7 @@ class TaskService:
         self.session.add(task)
         self.session.commit()
         self.session.refresh(task)
+        self._begin_task(task)
         try:
             sentence_statement = (
                 select(Sentence, Paragraph.order_index)
@@ -1097,46 +1485,76 @@ class TaskService:
                 .where(Paragraph.answer_id == answer_id)
                 .order_by(Paragraph.order_index, Sentence.order_index)
             )
+            if sentence_ids is not None:
+                sentence_statement = sentence_statement.where(Sentence.id.in_(sentence_ids))
             rows = self.session.exec(sentence_statement).all()
             if not rows:
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No sentences to translate")
             sentences = [row[0] for row in rows]
             texts = [sentence.text for sentence in sentences]
-            translation_result = self.llm_client.translate_sentences(
-                question_type=question.type,
-                question_title=question.title,
-                question_body=question.body,
-                sentences=texts,
-            )
-            translations = translation_result.get("translations") or []
+            memory_hits = self.translation_memory.lookup(texts)
             updated = 0
             sentence_ids_for_cards: Set[int] = set()
-            for item in translations:
-                idx = item.get("sentence_index")
-                if not isinstance(idx, int) or idx < 1 or idx > len(sentences):
-                    continue
-                sentence = sentences[idx - 1]
-                sentence.translation_en = item.get("translation_en") or sentence.translation_en
-                sentence.translation_zh = item.get("translation_zh") or sentence.translation_zh
-                sentence.difficulty = item.get("difficulty") or sentence.difficulty
+            for idx, match in memory_hits.items():
+                sentence = sentences[idx]
+                sentence.translation_en = match.entry.translation_en or sentence.translation_en
+                sentence.translation_zh = match.entry.translation_zh or sentence.translation_zh
+                sentence.difficulty = match.entry.difficulty or sentence.difficulty
                 self.session.add(sentence)
                 updated += 1
                 sentence_ids_for_cards.add(sentence.id)
+            # Only the misses go to the LLM; sentence_index refers to this reduced batch.
+            misses = [idx for idx in range(len(sentences)) if idx not in memory_hits]
+            miss_texts = [texts[idx] for idx in misses]
+            translation_result: dict | None = None
+            if misses:
+                translation_result = self.llm_client.translate_sentences(
+                    question_type=question.type,
+                    question_title=question.title,
+                    question_body=question.body,
+                    sentences=miss_texts,
+                )
+                translation_usage = translation_result.pop("_usage", None)
+                translations = translation_result.get("translations") or []
+                for item in translations:
+                    idx = item.get("sentence_index")
+                    if not isinstance(idx, int) or idx < 1 or idx > len(misses):
+                        continue
+                    sentence = sentences[misses[idx - 1]]
+                    sentence.translation_en = item.get("translation_en") or sentence.translation_en
+                    sentence.translation_zh = item.get("translation_zh") or sentence.translation_zh
+                    sentence.difficulty = item.get("difficulty") or sentence.difficulty
+                    self.session.add(sentence)
+                    self.translation_memory.remember(
+                        sentence.text,
+                        translation_en=item.get("translation_en"),
+                        translation_zh=item.get("translation_zh"),
+                        difficulty=item.get("difficulty"),
+                    )
+                    updated += 1
+                    sentence_ids_for_cards.add(sentence.id)
             self.session.commit()
             for sentence_id in sentence_ids_for_cards:
                 self._ensure_sentence_flashcard(sentence_id)
-            conversation = LLMConversation(
-                session_id=None,
-                task_id=task.id,
-                purpose="sentence_translation",
-                messages={"sentences": texts},
-                result=translation_result,
-                model_name=getattr(self.llm_client, "model", None),
-                latency_ms=None,
-            )
-            self.session.add(conversation)
+            if translation_result is not None:
+                conversation = self.conversation_store.build(
+                    session_id=None,
+                    task_id=task.id,
+                    purpose="sentence_translation",
+                    messages={"sentences": miss_texts},
+                    result=translation_result,
+                    **self._usage_fields(translation_usage),
+                )
+                self.session.add(conversation)
+            fuzzy_hits = sum(1 for match in memory_hits.values() if match.fuzzy)
             task.status = "succeeded"
-            task.result_summary = {"updated_count": updated}
+            task.result_summary = {
+                "updated_count": updated,
+                "memory_hits": len(memory_hits) - fuzzy_hits,
+                "memory_fuzzy_hits": fuzzy_hits,
+                "memory_misses": len(misses),
+                "memory_hit_rate": round(len(memory_hits) / len(sentences), 3),
+            }
             task.updated_at = datetime.now(timezone.utc)
             task.error_message = None
             self.session.add(task)
@@ -1149,6 +1567,10 @@ class TaskService:
             self.session.add(task)
             self.session.commit()
             raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc)) from exc
+        except TaskInterrupted as exc:
+            self._interrupt_task(task, exc)
+        finally:
+            finish_task(task.id)
         return TaskRead.model_validate(task)
 
     def run_chunk_task(self, sentence_id: int) -> TaskRead:
@@ -1177,8 +1599,15 @@ class TaskService:
         self.session.refresh(task)
         sentence_extra = dict(sentence.extra or {})
         known_issues: list[str] = sentence_extra.get("split_issues") or []
-        self._remove_sentence_chunks(sentence_id)
+        had_chunks = self.session.exec(
+            select(SentenceChunk.id).where(SentenceChunk.sentence_id == sentence_id)
+        ).first() is not None
+        self._begin_task(task)
         try:
+            # An explicit re-run (existing chunks or known issues) always asks the LLM again.
+            cache_source = None if had_chunks or known_issues else self._find_cached_chunks(sentence)
+            if cache_source is not None:
+                return self._clone_cached_chunks(task, sentence, cache_source)
             chunk_result = self.llm_client.chunk_sentence(
                 question_type=question.type,
                 question_title=question.title,
@@ -1187,14 +1616,16 @@ class TaskService:
                 known_issues=known_issues,
             )
             split_prompt_messages = chunk_result.pop("_prompt_messages", [])
+            usage = chunk_result.pop("_usage", None)
             chunks = chunk_result.get("chunks") or []
             issues = self._assess_chunk_quality(sentence.text, chunks)
             if issues:
+                # The rejected split replaces nothing: the sentence keeps its previous chunks.
                 sentence_extra["chunk_issues"] = issues
                 sentence.extra = sentence_extra
                 self.session.add(sentence)
                 self.session.commit()
-                conversation = LLMConversation(
+                conversation = self.conversation_store.build(
                     session_id=None,
                     task_id=task.id,
                     purpose="chunk_sentence",
@@ -1208,12 +1639,13 @@ class TaskService:
                         "error": "Chunk 质检失败",
                         "issues": issues,
                     },
-                    model_name=getattr(self.llm_client, "model", None),
-                    latency_ms=None,
+                    **self._usage_fields(usage),
                 )
                 self.session.add(conversation)
                 self.session.commit()
                 raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Chunk 质检失败；" + "；".join(issues))
+            # Old chunks go in the same transaction that inserts the new ones.
+            self._remove_sentence_chunks(sentence_id)
             new_chunk_ids: list[int] = []
             for item in chunks:
                 chunk = SentenceChunk(
@@ -1231,12 +1663,14 @@ class TaskService:
                     new_chunk_ids.append(chunk.id)
             sentence_extra.pop("split_issues", None)
             sentence_extra.pop("chunk_issues", None)
+            sentence_extra.pop("lexeme_prompt_version", None)
+            sentence_extra["chunk_prompt_version"] = CHUNK_SPLIT_PROMPT_VERSION
             sentence.extra = sentence_extra
             self.session.add(sentence)
             self.session.commit()
             for chunk_id in new_chunk_ids:
                 self._ensure_chunk_flashcard(chunk_id)
-            conversation = LLMConversation(
+            conversation = self.conversation_store.build(
                 session_id=None,
                 task_id=task.id,
                 purpose="chunk_sentence",
@@ -1246,8 +1680,7 @@ class TaskService:
                     "known_issues": known_issues,
                 },
                 result=chunk_result,
-                model_name=getattr(self.llm_client, "model", None),
-                latency_ms=None,
+                **self._usage_fields(usage),
             )
             self.session.add(conversation)
             task.status = "succeeded"
@@ -1264,6 +1697,95 @@ class TaskService:
             self.session.add(task)
             self.session.commit()
             raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc)) from exc
+        except TaskInterrupted as exc:
+            self._interrupt_task(task, exc)
+        finally:
+            finish_task(task.id)
+        return TaskRead.model_validate(task)
+
+    def _find_cached_chunks(self, sentence: Sentence) -> Sentence | None:
+        content_hash = source_hash(sentence.text, casefold=False)
+        if sentence.content_hash != content_hash:
+            sentence.content_hash = content_hash
+            self.session.add(sentence)
+        candidates = self.session.exec(
+            select(Sentence)
+            .where(Sentence.content_hash == content_hash)
+            .where(Sentence.id != sentence.id)
+            .order_by(Sentence.id.desc())
+        ).all()
+        for candidate in candidates:
+            extra = candidate.extra or {}
+            if extra.get("chunk_prompt_version") != CHUNK_SPLIT_PROMPT_VERSION or extra.get("chunk_issues"):
+                continue
+            has_chunks = self.session.exec(
+                select(SentenceChunk.id).where(SentenceChunk.sentence_id == candidate.id)
+            ).first()
+            if has_chunks is not None:
+                return candidate
+        return None
+
+    def _clone_cached_chunks(self, task: Task, sentence: Sentence, source: Sentence) -> TaskRead:
+        source_extra = source.extra or {}
+        clone_lexemes = (
+            source_extra.get("lexeme_prompt_version") == CHUNK_LEXEME_PROMPT_VERSION
+            and not source_extra.get("lexeme_issues")
+        )
+        source_chunks = self.session.exec(
+            select(SentenceChunk).where(SentenceChunk.sentence_id == source.id).order_by(SentenceChunk.order_index)
+        ).all()
+        new_chunk_ids: list[int] = []
+        linked = 0
+        for source_chunk in source_chunks:
+            chunk = SentenceChunk(
+                sentence_id=sentence.id,
+                order_index=source_chunk.order_index,
+                text=source_chunk.text,
+                translation_en=source_chunk.translation_en,
+                translation_zh=source_chunk.translation_zh,
+                chunk_type=source_chunk.chunk_type,
+                extra=dict(source_chunk.extra or {}),
+            )
+            self.session.add(chunk)
+            self.session.flush()
+            new_chunk_ids.append(chunk.id)
+            if not clone_lexemes:
+                continue
+            links = self.session.exec(select(ChunkLexeme).where(ChunkLexeme.chunk_id == source_chunk.id)).all()
+            for link in links:
+                self.session.add(
+                    ChunkLexeme(
+                        chunk_id=chunk.id,
+                        lexeme_id=link.lexeme_id,
+                        order_index=link.order_index,
+                        role=link.role,
+                        extra=dict(link.extra or {}),
+                    )
+                )
+                linked += 1
+        sentence_extra = dict(sentence.extra or {})
+        for key in ("split_issues", "chunk_issues", "lexeme_issues", "lexeme_prompt_version"):
+            sentence_extra.pop(key, None)
+        sentence_extra["chunk_prompt_version"] = CHUNK_SPLIT_PROMPT_VERSION
+        if clone_lexemes:
+            sentence_extra["lexeme_prompt_version"] = CHUNK_LEXEME_PROMPT_VERSION
+        sentence.extra = sentence_extra
+        self.session.add(sentence)
+        self.session.commit()
+        for chunk_id in new_chunk_ids:
+            self._ensure_chunk_flashcard(chunk_id)
+        task.status = "succeeded"
+        task.result_summary = {
+            "chunks": len(new_chunk_ids),
+            "cache_hit": True,
+            "source_sentence_id": source.id,
+            "lexeme_links": linked,
+        }
+        task.updated_at = datetime.now(timezone.utc)
+        task.error_message = None
+        self.session.add(task)
+        self.session.commit()
+        self.session.refresh(task)
         return TaskRead.model_validate(task)
 
     def run_chunk_lexeme_task(self, sentence_id: int) -> TaskRead:
@@ -1296,7 +1818,7 @@ class TaskService:
         self.session.commit()
         self.session.refresh(task)
         chunk_ids = [chunk.id for chunk in chunks if chunk.id is not None]
-        orphan_candidates = self._clear_chunk_lexemes(chunk_ids)
+        self._begin_task(task)
         try:
             chunk_dicts = [
                 {
@@ -1314,7 +1836,10 @@ class TaskService:
                 chunks=chunk_dicts,
             )
             prompt_messages = lexeme_result.pop("_prompt_messages", [])
+            usage = lexeme_result.pop("_usage", None)
             lexeme_items = lexeme_result.get("lexemes") or []
+            # Old links go in the same transaction that inserts the new ones.
+            orphan_candidates = self._clear_chunk_lexemes(chunk_ids)
             chunk_index_map = {chunk.order_index: chunk for chunk in chunks}
             per_chunk_counter: dict[int, int] = {chunk.order_index: 0 for chunk in chunks}
             created = 0
@@ -1344,8 +1869,7 @@ class TaskService:
                         extra={},
                     )
                     self.session.add(lexeme)
-                    self.session.commit()
-                    self.session.refresh(lexeme)
+                    self.session.flush()
                 lexeme_ids_for_cards.add(lexeme.id)
                 per_chunk_counter[chunk_index] = per_chunk_counter.get(chunk_index, 0) + 1
                 chunk_lexeme = ChunkLexeme(
@@ -1367,6 +1891,7 @@ class TaskService:
             else:
                 sentence_extra = dict(sentence.extra or {})
                 sentence_extra.pop("lexeme_issues", None)
+                sentence_extra["lexeme_prompt_version"] = CHUNK_LEXEME_PROMPT_VERSION
                 sentence.extra = sentence_extra
             self.session.add(sentence)
             self.session.commit()
@@ -1376,7 +1901,7 @@ class TaskService:
             conversation_result = dict(lexeme_result)
             if warning_issues:
                 conversation_result["warnings"] = warning_issues
-            conversation = LLMConversation(
+            conversation = self.conversation_store.build(
                 session_id=None,
                 task_id=task.id,
                 purpose="chunk_lexeme",
@@ -1385,8 +1910,7 @@ class TaskService:
                     "input_sentence": sentence.text,
                 },
                 result=conversation_result,
-                model_name=getattr(self.llm_client, "model", None),
-                latency_ms=None,
+                **self._usage_fields(usage),
             )
             self.session.add(conversation)
             task.status = "succeeded"
@@ -1406,6 +1930,10 @@ class TaskService:
             self.session.add(task)
             self.session.commit()
             raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc)) from exc
+        except TaskInterrupted as exc:
+            self._interrupt_task(task, exc)
+        finally:
+            finish_task(task.id)
         return TaskRead.model_validate(task)
 
 
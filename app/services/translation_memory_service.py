@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import unicodedata
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+
+from sqlmodel import Session as DBSession, select
+
+from app.db.schemas import TranslationMemory
+
+FUZZY_RATIO_ENV = "TRANSLATION_MEMORY_FUZZY_RATIO"
+FUZZY_CANDIDATE_LIMIT = 200
+
+
+def normalize_source(text: Optional[str], *, casefold: bool = True) -> str:
+    normalized = unicodedata.normalize("NFC", text or "")
+    return " ".join((normalized.casefold() if casefold else normalized).split())
+
+
+def source_hash(text: Optional[str], *, casefold: bool = True) -> str:
+    return hashlib.sha256(normalize_source(text, casefold=casefold).encode("utf-8")).hexdigest()
+
+
+def edit_distance(left: str, right: str, limit: int) -> int:
+    """Levenshtein distance, giving up with limit + 1 once it cannot stay within limit."""
+    if abs(len(left) - len(right)) > limit:
+        return limit + 1
+    previous = list(range(len(right) + 1))
+    for i, left_char in enumerate(left, start=1):
+        current = [i] + [0] * len(right)
+        for j, right_char in enumerate(right, start=1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (left_char != right_char),
+            )
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class TranslationMatch(NamedTuple):
+    entry: TranslationMemory
+    fuzzy: bool
+
+
+class TranslationMemoryService:
+    def __init__(self, session: DBSession, fuzzy_ratio: Optional[float] = None) -> None:
+        self.session = session
+        if fuzzy_ratio is None:
+            try:
+                fuzzy_ratio = float(os.getenv(FUZZY_RATIO_ENV, "0") or 0)
+            except ValueError:
+                fuzzy_ratio = 0.0
+        # Share of characters that may differ for a fuzzy hit; 0 keeps lookups exact.
+        self.fuzzy_ratio = max(0.0, fuzzy_ratio)
+
+    def lookup(self, texts: list[str]) -> dict[int, TranslationMatch]:
+        hashes = [source_hash(text) for text in texts]
+        rows = self.session.exec(
+            select(TranslationMemory).where(TranslationMemory.source_hash.in_(set(hashes)))
+        ).all()
+        by_hash = {row.source_hash: row for row in rows}
+        matches: dict[int, TranslationMatch] = {}
+        for idx, value in enumerate(hashes):
+            entry = by_hash.get(value)
+            if entry is not None:
+                matches[idx] = TranslationMatch(entry, False)
+        if self.fuzzy_ratio > 0:
+            for idx, text in enumerate(texts):
+                if idx in matches:
+                    continue
+                entry = self._fuzzy_match(normalize_source(text))
+                if entry is not None:
+                    matches[idx] = TranslationMatch(entry, True)
+        now = datetime.now(timezone.utc)
+        for match in matches.values():
+            match.entry.hit_count += 1
+            match.entry.updated_at = now
+            self.session.add(match.entry)
+        return matches
+
+    def remember(
+        self,
+        text: str,
+        *,
+        translation_en: Optional[str],
+        translation_zh: Optional[str],
+        difficulty: Optional[str] = None,
+    ) -> None:
+        if not (translation_en or translation_zh):
+            return
+        value = source_hash(text)
+        entry = self.session.exec(select(TranslationMemory).where(TranslationMemory.source_hash == value)).first()
+        if entry is None:
+            entry = TranslationMemory(
+                source_hash=value,
+                source_text=text,
+                text_length=len(normalize_source(text)),
+            )
+        entry.translation_en = translation_en or entry.translation_en
+        entry.translation_zh = translation_zh or entry.translation_zh
+        entry.difficulty = difficulty or entry.difficulty
+        entry.updated_at = datetime.now(timezone.utc)
+        self.session.add(entry)
+
+    def _fuzzy_match(self, normalized: str) -> Optional[TranslationMemory]:
+        limit = int(len(normalized) * self.fuzzy_ratio)
+        if limit == 0:
+            return None
+        candidates = self.session.exec(
+            select(TranslationMemory)
+            .where(TranslationMemory.text_length >= len(normalized) - limit)
+            .where(TranslationMemory.text_length <= len(normalized) + limit)
+            .order_by(TranslationMemory.hit_count.desc())
+            .limit(FUZZY_CANDIDATE_LIMIT)
+        ).all()
+        best: Optional[TranslationMemory] = None
+        best_distance = limit + 1
+        for candidate in candidates:
+            distance = edit_distance(normalized, normalize_source(candidate.source_text), best_distance - 1)
+            if distance < best_distance:
+                best, best_distance = candidate, distance
+        return best
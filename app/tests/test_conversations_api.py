@@ -1,13 +1,15 @@
+from datetime import datetime, timedelta, timezone
 from typing import Generator
 
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.pool import StaticPool
-from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel import SQLModel, Session, create_engine, select
 
 from app.main import app
 from app.api.dependencies import get_session
-from app.db.schemas import LLMConversation
+from app.db.schemas import LLMConversation, LLMPromptSegment
+from app.services.conversation_store import ConversationStore
 
 
 @pytest.fixture(name="session")
@@ -45,3 +47,109 @@ def test_list_conversations(client: TestClient, session: Session) -> None:
     assert len(data) == 1
     assert data[0]["purpose"] == "structure"
 
+
+
+def test_packed_conversations_share_system_prompts(client: TestClient, session: Session) -> None:
+    system_prompt = "Tu es un examinateur TCF. " * 200
+    store = ConversationStore(session)
+    for idx in range(3):
+        messages = {
+            "draft": f"Brouillon {idx}",
+            "prompt_messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "human", "content": f"Évalue le brouillon {idx}"},
+            ],
+        }
+        session.add(store.build(purpose="eval", messages=messages, result={"score": idx}))
+    session.commit()
+    session.add(LLMConversation(purpose="structure", messages={"input": "legacy"}, result={"output": "ok"}))
+    session.commit()
+
+    assert len(session.exec(select(LLMPromptSegment)).all()) == 1
+    resp = client.get("/llm-conversations")
+    assert resp.status_code == 200
+    assert len(resp.json()) == 4
+    data = [client.get(f"/llm-conversations/{item['id']}").json() for item in resp.json()]
+    packed = sorted((item for item in data if item["purpose"] == "eval"), key=lambda item: item["result"]["score"])
+    assert packed[2]["messages"] == {
+        "draft": "Brouillon 2",
+        "prompt_messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "human", "content": "Évalue le brouillon 2"},
+        ],
+    }
+    assert packed[0]["stored_size"] < packed[0]["raw_size"]
+    legacy = next(item for item in data if item["purpose"] == "structure")
+    assert legacy["messages"] == {"input": "legacy"}
+
+    stats = client.get("/llm-conversations/storage").json()
+    assert stats["packed_conversations"] == 3
+    assert stats["legacy_conversations"] == 1
+    assert stats["prompt_segments"] == 1
+    assert stats["saved_bytes"] > 0
+    assert stats["raw_bytes"] > 3 * len(system_prompt)
+
+
+def test_conversation_list_is_lean_and_paged(client: TestClient, session: Session) -> None:
+    store = ConversationStore(session)
+    for idx in range(5):
+        session.add(
+            store.build(
+                purpose="chunk",
+                model_name="gpt-test",
+                latency_ms=100 + idx,
+                messages={"prompt_messages": [{"role": "human", "content": "Phrase " * 50}]},
+                result={"idx": idx},
+            )
+        )
+    session.commit()
+
+    resp = client.get("/llm-conversations", params={"limit": 3})
+    assert resp.status_code == 200
+    page = resp.json()
+    assert [item["latency_ms"] for item in page] == [104, 103, 102]
+    assert "messages" not in page[0] and "result" not in page[0]
+    assert page[0]["model_name"] == "gpt-test"
+    assert 0 < page[0]["stored_size"] < page[0]["raw_size"]
+
+    resp = client.get("/llm-conversations", params={"limit": 3, "before_id": resp.headers["X-Next-Before-Id"]})
+    assert [item["latency_ms"] for item in resp.json()] == [101, 100]
+    assert "X-Next-Before-Id" not in resp.headers
+
+    detail = client.get(f"/llm-conversations/{page[0]['id']}").json()
+    assert detail["result"] == {"idx": 4}
+    assert client.get("/llm-conversations/9999").status_code == 404
+
+
+def test_llm_metrics_aggregate_purposes_in_window(client: TestClient, session: Session) -> None:
+    now = datetime.now(timezone.utc)
+    for latency in range(100, 2100, 100):
+        session.add(
+            LLMConversation(
+                purpose="chunk_sentence",
+                model_name="gpt-4o-mini" if latency <= 1000 else "gpt-4o",
+                latency_ms=latency,
+                prompt_tokens=100,
+                completion_tokens=20,
+                cached_tokens=10,
+                cost_usd=0.001,
+                created_at=now - timedelta(minutes=5),
+            )
+        )
+    session.add(LLMConversation(purpose="eval", model_name="gpt-4o-mini", latency_ms=700, created_at=now))
+    session.add(LLMConversation(purpose="eval", latency_ms=90_000, prompt_tokens=999, created_at=now - timedelta(days=2)))
+    session.commit()
+
+    resp = client.get("/metrics/llm", params={"hours": 1})
+    assert resp.status_code == 200
+    purposes = {item["purpose"]: item for item in resp.json()["purposes"]}
+    assert set(purposes) == {"chunk_sentence", "eval"}
+    chunk = purposes["chunk_sentence"]
+    assert (chunk["calls"], chunk["latency_p50_ms"], chunk["latency_p95_ms"]) == (20, 1000, 1900)
+    assert (chunk["prompt_tokens"], chunk["completion_tokens"], chunk["cached_tokens"]) == (2000, 400, 200)
+    assert chunk["cost_usd"] == pytest.approx(0.02)
+    assert {model["model_name"]: model["calls"] for model in chunk["models"]} == {"gpt-4o-mini": 10, "gpt-4o": 10}
+    eval_usage = purposes["eval"]
+    assert (eval_usage["calls"], eval_usage["latency_p95_ms"], eval_usage["prompt_tokens"]) == (1, 700, 0)
+
+    assert client.get("/metrics/llm", params={"hours": 0}).status_code == 422
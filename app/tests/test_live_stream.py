@@ -0,0 +1,336 @@
+import asyncio
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import openai
+import pytest
+from fastapi import WebSocketDisconnect
+from sqlalchemy import event
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.runnables import RunnableLambda
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from app.api.routes import sessions as sessions_routes
+from app.db.schemas import LLMConversation, LiveTurn, Question, Session as SessionSchema
+from app.services import live_context
+from app.services.live_context import LiveReplyContext, invalidate_live_context
+from app.services.live_stream_service import LiveStreamWorker
+from app.services.llm_resilience import LLMResilience
+from app.services.llm_service import LLMError, QuestionLLMClient
+from app.services.task_service import TaskService
+
+SESSION_COUNT = 50
+TURNS_PER_SESSION = 3
+LLM_DELAY = 0.05
+COMMIT_DELAY = 0.01
+LAG_PROBE_INTERVAL = 0.005
+
+
+class StubLLM:
+    def generate_live_reply(self, **kwargs):
+        time.sleep(LLM_DELAY)
+        return {"reply": f"Réponse {kwargs['turn_index']}", "reminder": None}
+
+
+class StreamingStubLLM:
+    def generate_live_reply(self, on_delta=None, **kwargs):
+        reply = "Bien sûr, je vous écoute."
+        for word in reply.split(" "):
+            if on_delta:
+                on_delta(word + " ")
+        return {"reply": reply, "reminder": None}
+
+
+class FakeWebSocket:
+    def __init__(self, turns: int) -> None:
+        self._incoming = [{"type": "candidate_turn", "text": f"Question {idx + 1}"} for idx in range(turns)]
+        self._reply_received = asyncio.Event()
+        self._reply_received.set()
+        self.sent: list[dict] = []
+
+    async def accept(self) -> None:
+        return None
+
+    async def send_json(self, data: dict) -> None:
+        self.sent.append(data)
+        if data.get("type") in {"examiner_reply", "error"}:
+            self._reply_received.set()
+
+    async def receive_json(self) -> dict:
+        await self._reply_received.wait()
+        if not self._incoming:
+            raise WebSocketDisconnect()
+        self._reply_received.clear()
+        return self._incoming.pop(0)
+
+    async def close(self, code: int = 1000) -> None:
+        return None
+
+
+@pytest.fixture(name="engine")
+def engine_fixture(tmp_path: Path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'live.db'}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+
+    @event.listens_for(engine, "commit")
+    def _slow_commit(_conn) -> None:
+        time.sleep(COMMIT_DELAY)
+
+    yield engine
+    engine.dispose()
+
+
+def _create_live_sessions(engine, count: int) -> list[int]:
+    with Session(engine) as db:
+        question = Question(
+            type="T2",
+            source="mock",
+            year=2024,
+            month=7,
+            title="Live",
+            body="Body",
+            direction_plan={"recommended": {"title": "示例方向"}},
+        )
+        db.add(question)
+        db.commit()
+        db.refresh(question)
+        entities = [
+            SessionSchema(
+                question_id=question.id,
+                phase="live",
+                progress_state={"mode": "live", "live_status": "active", "live_turn_count": 0},
+            )
+            for _ in range(count)
+        ]
+        db.add_all(entities)
+        db.commit()
+        return [entity.id for entity in entities]
+
+
+async def _probe_loop_lag(stop: asyncio.Event, samples: list[float]) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_PROBE_INTERVAL)
+        samples.append(time.perf_counter() - start - LAG_PROBE_INTERVAL)
+
+
+async def _run_load(session_ids: list[int]) -> tuple[list[FakeWebSocket], list[float]]:
+    stop = asyncio.Event()
+    samples: list[float] = []
+    probe = asyncio.create_task(_probe_loop_lag(stop, samples))
+    sockets = [FakeWebSocket(TURNS_PER_SESSION) for _ in session_ids]
+    await asyncio.gather(
+        *(sessions_routes.live_session_stream(ws, session_id) for ws, session_id in zip(sockets, session_ids))
+    )
+    stop.set()
+    await probe
+    return sockets, samples
+
+
+def test_live_stream_keeps_event_loop_responsive(engine, monkeypatch) -> None:
+    monkeypatch.setattr(sessions_routes, "get_engine", lambda: engine)
+    monkeypatch.setattr(sessions_routes, "get_llm_client", lambda: StubLLM())
+    session_ids = _create_live_sessions(engine, SESSION_COUNT)
+
+    sockets, samples = asyncio.run(_run_load(session_ids))
+
+    lags_ms = sorted(sample * 1000 for sample in samples)
+    p95 = lags_ms[int(len(lags_ms) * 0.95) - 1]
+
+    for ws in sockets:
+        replies = [msg for msg in ws.sent if msg["type"] == "examiner_reply"]
+        assert len(replies) == TURNS_PER_SESSION, ws.sent
+    with Session(engine) as db:
+        turns = db.exec(select(LiveTurn)).all()
+        assert len(turns) == SESSION_COUNT * TURNS_PER_SESSION
+        assert all(turn.examiner_reply for turn in turns)
+    # Every DB commit sleeps COMMIT_DELAY; had any of them run on the loop,
+    # the probe would see at least that much lag on most samples.
+    assert p95 < COMMIT_DELAY * 1000
+
+
+def test_live_db_steps_of_different_sockets_overlap(engine) -> None:
+    # Each step waits for the other socket's step; a single shared DB thread would deadlock here.
+    barrier = threading.Barrier(2, timeout=2)
+    workers = [LiveStreamWorker(engine, StubLLM(), session_id) for session_id in (1, 2)]
+
+    async def run() -> list[int]:
+        return await asyncio.gather(*(worker._run_db(barrier.wait) for worker in workers))
+
+    assert sorted(asyncio.run(run())) == [0, 1]
+
+
+def _client_with_fake_model(content: str) -> QuestionLLMClient:
+    client = QuestionLLMClient(api_key="test-key")
+    client._llm = GenericFakeChatModel(messages=iter([AIMessage(content=content)]))
+    return client
+
+
+def _live_reply_kwargs() -> dict:
+    return {
+        "question_type": "T2",
+        "question_title": "Live",
+        "question_body": "Body",
+        "history": [],
+        "candidate_query": "Bonjour",
+        "turn_index": 1,
+    }
+
+
+def test_client_streams_reply_deltas() -> None:
+    client = _client_with_fake_model('```json\n{"reply": "Bonjour, je suis là.", "reminder": null}\n```')
+    deltas: list[str] = []
+    result = client.generate_live_reply(**_live_reply_kwargs(), on_delta=deltas.append)
+    assert len(deltas) > 1
+    assert "".join(deltas) == "Bonjour, je suis là."
+    assert result["reply"] == "Bonjour, je suis là."
+    assert result["reminder"] is None
+
+
+def test_non_streamed_live_reply_is_retried(engine) -> None:
+    resilience = LLMResilience(
+        max_retries=2,
+        backoff_base=0.0,
+        backoff_max=0.0,
+        requests_per_minute=0,
+        tokens_per_minute=0,
+        breaker_failures=5,
+        breaker_reset_seconds=60.0,
+    )
+    client = QuestionLLMClient(api_key="test-key", resilience=resilience)
+    failures = [openai.APITimeoutError(request=httpx.Request("POST", "https://llm.invalid/v1/chat/completions"))]
+
+    def respond(messages):
+        if failures:
+            raise failures.pop(0)
+        return AIMessage(content='{"reply": "Je vous écoute.", "reminder": null}')
+
+    client._llm = RunnableLambda(respond)
+    with Session(engine) as db:
+        reply = TaskService(db, client).complete_live_reply(_live_reply_kwargs())
+    assert reply["text"] == "Je vous écoute."
+    assert reply["meta"]["timing"]["streamed"] is False
+    assert resilience.snapshot()["purposes"]["live"] == {"calls": 1, "retries": 1, "succeeded": 1}
+
+
+def test_client_rejects_streamed_reply_failing_schema() -> None:
+    client = _client_with_fake_model('{"reminder": "sans réponse"}')
+    with pytest.raises(LLMError):
+        client.generate_live_reply(**_live_reply_kwargs(), on_delta=lambda _: None)
+
+
+def test_client_renders_system_prompt_once(monkeypatch) -> None:
+    client = QuestionLLMClient(api_key="test-key")
+    calls = []
+    monkeypatch.setattr(JsonOutputParser, "get_format_instructions", lambda self: calls.append(self) or "")
+    client._llm = GenericFakeChatModel(
+        messages=iter([AIMessage(content=f'{{"feedback": "ok", "score": {score}}}') for score in (3, 4)])
+    )
+    kwargs = {"question_type": "T3", "question_title": "Titre", "question_body": "Corps"}
+    first = client.evaluate_answer(**kwargs, answer_draft="Premier brouillon")
+    second = client.evaluate_answer(**kwargs, answer_draft="Second brouillon")
+    assert calls == []
+    assert first["_prompt_messages"][0] == second["_prompt_messages"][0]
+    assert '"score"' in first["_prompt_messages"][0]["content"]
+    assert second["_prompt_messages"][1]["content"].endswith("Second brouillon")
+
+
+def test_live_stream_sends_reply_deltas_and_records_timing(engine, monkeypatch) -> None:
+    monkeypatch.setattr(sessions_routes, "get_engine", lambda: engine)
+    monkeypatch.setattr(sessions_routes, "get_llm_client", lambda: StreamingStubLLM())
+    [session_id] = _create_live_sessions(engine, 1)
+    ws = FakeWebSocket(1)
+
+    asyncio.run(sessions_routes.live_session_stream(ws, session_id))
+
+    types = [msg["type"] for msg in ws.sent]
+    assert types[0] == "ack"
+    assert types.index("examiner_reply_delta") < types.index("examiner_reply")
+    deltas = "".join(msg["delta"] for msg in ws.sent if msg["type"] == "examiner_reply_delta")
+    assert deltas.strip() == "Bien sûr, je vous écoute."
+    with Session(engine) as db:
+        turn = db.exec(select(LiveTurn).where(LiveTurn.session_id == session_id)).one()
+        timing = turn.meta["timing"]
+        assert timing["streamed"] is True
+        assert 0 <= timing["first_reply_delta_ms"] <= timing["total_ms"]
+        conversation = db.exec(select(LLMConversation).where(LLMConversation.session_id == session_id)).one()
+        assert (conversation.purpose, conversation.latency_ms) == ("live", timing["total_ms"])
+        assert "_usage" not in turn.meta["live_result"]
+
+
+def _make_context() -> LiveReplyContext:
+    return LiveReplyContext(
+        session_id=987654,
+        question_type="T2",
+        question_title="Live",
+        question_body="Body",
+        direction_hint="方向",
+        dialogue_profile_hint="设定",
+    )
+
+
+def test_live_context_keeps_window_and_bounded_summary() -> None:
+    context = _make_context()
+    sizes = []
+    for idx in range(1, 41):
+        request = context.build_request(idx, f"Question {idx} " + "détail " * 20)
+        sizes.append(len(str(request)))
+        context.remember(
+            {"turn_index": idx, "candidate_query": f"Question {idx} " + "détail " * 20, "examiner_reply": "Oui " * 30}
+        )
+    request = context.build_request(41, "Dernière question")
+    assert [item["turn_index"] for item in request["history"]] == [36, 37, 38, 39, 40]
+    summary = request["history_summary"]
+    assert "Turn 35" in summary
+    assert "更早 29 轮话题" in summary
+    # Once the window and summary are full the prompt stops growing.
+    assert max(sizes[20:]) - min(sizes[20:]) < 20
+
+
+def test_live_context_invalidation() -> None:
+    context = _make_context()
+    assert not context.is_stale()
+    invalidate_live_context(context.session_id)
+    assert context.is_stale()
+
+
+def test_live_context_versions_stay_bounded(monkeypatch) -> None:
+    monkeypatch.setattr(live_context, "MAX_TRACKED_SESSIONS", 3)
+    before_change = _make_context()
+    invalidate_live_context(before_change.session_id)
+    for other in range(10_000, 10_010):
+        invalidate_live_context(other)
+    assert len(live_context._versions) <= 3
+    assert before_change.session_id not in live_context._versions
+    # Evicting the session must not make a context from before its last change look fresh.
+    assert before_change.is_stale()
+
+
+def test_live_stream_loads_context_once_until_session_changes(engine, monkeypatch) -> None:
+    monkeypatch.setattr(sessions_routes, "get_engine", lambda: engine)
+    monkeypatch.setattr(sessions_routes, "get_llm_client", lambda: StubLLM())
+    [session_id] = _create_live_sessions(engine, 1)
+    loads: list[int | None] = []
+    original = TaskService.load_live_context
+
+    def counting_load(self, sid, *, before_turn_index=None):
+        loads.append(before_turn_index)
+        return original(self, sid, before_turn_index=before_turn_index)
+
+    monkeypatch.setattr(TaskService, "load_live_context", counting_load)
+
+    class InvalidatingWebSocket(FakeWebSocket):
+        async def send_json(self, data: dict) -> None:
+            if data.get("type") == "examiner_reply" and data["turn"] == 2:
+                invalidate_live_context(session_id)
+            await super().send_json(data)
+
+    ws = InvalidatingWebSocket(4)
+    asyncio.run(sessions_routes.live_session_stream(ws, session_id))
+
+    assert [msg["turn"] for msg in ws.sent if msg["type"] == "examiner_reply"] == [1, 2, 3, 4]
+    assert loads == [1, 3]
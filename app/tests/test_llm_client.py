@@ -0,0 +1,224 @@
+from pathlib import Path
+
+import httpx
+import openai
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.runnables import RunnableLambda, RunnableWithFallbacks
+
+from app.main import app
+from app.services.llm_resilience import LLMResilience, TokenBucket
+from app.services.llm_routing import ModelRoute, PURPOSES, load_routing, parse_routing
+from app.services.llm_usage import estimate_cost
+from app.services.llm_service import LLMError, QuestionLLMClient
+
+ROUTING_PATH = Path(__file__).resolve().parents[2] / "config" / "llm_routing.yaml"
+
+
+def test_shipped_routing_covers_every_purpose() -> None:
+    routing = load_routing(ROUTING_PATH)
+    assert set(routing) == set(PURPOSES)
+    assert routing["live"].timeout < routing["compose"].timeout
+
+
+def test_routing_rejects_unknown_purpose() -> None:
+    with pytest.raises(ValueError):
+        parse_routing({"purposes": {"summarize": {"model": "x"}}})
+
+
+def test_routing_applies_defaults_under_purpose_settings() -> None:
+    routing = parse_routing({"defaults": {"fallback": "gpt-4o"}, "purposes": {"chunk": {"model": "gpt-4o-mini"}}})
+    assert routing["chunk"] == ModelRoute(model="gpt-4o-mini", fallback="gpt-4o")
+    assert routing["eval"] == ModelRoute(fallback="gpt-4o")
+
+
+def test_client_routes_purposes_to_their_models() -> None:
+    client = QuestionLLMClient(
+        api_key="test-key",
+        model="gpt-4o",
+        routing={
+            "chunk": ModelRoute(model="gpt-4o-mini", fallback="gpt-4o", timeout=5, max_tokens=300),
+            "live": ModelRoute(timeout=10, max_tokens=200),
+            "eval": ModelRoute(),
+        },
+    )
+    chunk = client._model("chunk")
+    assert isinstance(chunk, RunnableWithFallbacks)
+    assert (chunk.runnable.model_name, chunk.runnable.max_tokens, chunk.runnable.max_retries) == ("gpt-4o-mini", 300, 0)
+    assert chunk.fallbacks[0].model_name == "gpt-4o"
+    assert client._model("chunk") is chunk
+
+    live = client._model("live")
+    assert (live.model_name, live.request_timeout, live.max_tokens) == ("gpt-4o", 10, 200)
+    assert client._model("eval") is client._llm
+    assert client._model("compose") is client._llm
+
+
+def _resilience(**overrides) -> LLMResilience:
+    settings = {
+        "max_retries": 2,
+        "backoff_base": 0.0,
+        "backoff_max": 0.0,
+        "requests_per_minute": 0,
+        "tokens_per_minute": 0,
+        "breaker_failures": 5,
+        "breaker_reset_seconds": 60.0,
+    }
+    settings.update(overrides)
+    return LLMResilience(**settings)
+
+
+def _flaky_client(resilience: LLMResilience, failures: list[BaseException]) -> tuple[QuestionLLMClient, list]:
+    client = QuestionLLMClient(api_key="test-key", resilience=resilience)
+    calls = []
+
+    def respond(messages):
+        calls.append(messages)
+        if failures:
+            raise failures.pop(0)
+        return AIMessage(content='{"feedback": "ok", "score": 4}')
+
+    client._llm = RunnableLambda(respond)
+    return client, calls
+
+
+def _timeout() -> openai.APITimeoutError:
+    return openai.APITimeoutError(request=httpx.Request("POST", "https://llm.invalid/v1/chat/completions"))
+
+
+EVAL_KWARGS = {"question_type": "T3", "question_title": "Titre", "question_body": "Corps", "answer_draft": "Texte"}
+
+
+def test_transient_errors_are_retried() -> None:
+    resilience = _resilience()
+    client, calls = _flaky_client(resilience, [_timeout(), _timeout()])
+    assert client.evaluate_answer(**EVAL_KWARGS)["score"] == 4
+    assert len(calls) == 3
+    assert resilience.snapshot()["purposes"]["eval"] == {"calls": 1, "retries": 2, "succeeded": 1}
+
+
+def test_non_transient_errors_are_not_retried() -> None:
+    resilience = _resilience()
+    client, calls = _flaky_client(resilience, [ValueError("bad request")])
+    with pytest.raises(LLMError):
+        client.evaluate_answer(**EVAL_KWARGS)
+    assert len(calls) == 1
+    assert resilience.breaker("gpt-4o-mini").state == "closed"
+
+
+def test_breaker_opens_and_fails_fast() -> None:
+    resilience = _resilience(max_retries=0, breaker_failures=2)
+    client, calls = _flaky_client(resilience, [_timeout(), _timeout()])
+    for _ in range(2):
+        with pytest.raises(LLMError):
+            client.evaluate_answer(**EVAL_KWARGS)
+    with pytest.raises(LLMError, match="暂时不可用"):
+        client.evaluate_answer(**EVAL_KWARGS)
+    assert len(calls) == 2
+    snapshot = resilience.snapshot()
+    assert snapshot["breakers"]["gpt-4o-mini"]["state"] == "open"
+    assert snapshot["purposes"]["eval"]["short_circuited"] == 1
+
+    # After the reset period one trial call goes through and closes the breaker again.
+    resilience.breaker("gpt-4o-mini").reset_seconds = 0
+    assert client.evaluate_answer(**EVAL_KWARGS)["score"] == 4
+    assert resilience.breaker("gpt-4o-mini").state == "closed"
+
+
+def test_token_bucket_reports_wait_past_budget() -> None:
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.reserve(60) == 0
+    assert bucket.reserve(30) == pytest.approx(30, abs=0.5)
+    assert TokenBucket(per_minute=0).reserve(10_000) == 0
+
+
+def test_resilience_metrics_endpoint() -> None:
+    response = TestClient(app).get("/metrics/llm/resilience")
+    assert response.status_code == 200
+    assert set(response.json()) == {"purposes", "breakers"}
+
+
+def _reply(content: str) -> AIMessage:
+    return AIMessage(
+        content=content,
+        usage_metadata={
+            "input_tokens": 1200,
+            "output_tokens": 300,
+            "total_tokens": 1500,
+            "input_token_details": {"cache_read": 1000},
+        },
+        response_metadata={"model_name": "gpt-4o-mini-2024-07-18"},
+    )
+
+
+def test_estimate_cost_prices_cached_tokens_and_dated_models() -> None:
+    # 200 fresh + 1000 cached input tokens and 300 output tokens at gpt-4o-mini rates.
+    expected = (200 * 0.15 + 1000 * 0.075 + 300 * 0.60) / 1_000_000
+    assert estimate_cost("gpt-4o-mini-2024-07-18", 1200, 300, 1000) == pytest.approx(expected)
+    assert estimate_cost("gpt-4o", 1000, 0) == pytest.approx(0.0025)
+    assert estimate_cost("local-llama", 1000, 100) is None
+
+
+def test_calls_report_token_usage_and_latency() -> None:
+    client = QuestionLLMClient(api_key="test-key", resilience=_resilience())
+    client._llm = GenericFakeChatModel(messages=iter([_reply('{"feedback": "ok", "score": 4}')]))
+    usage = client.evaluate_answer(**EVAL_KWARGS)["_usage"]
+    assert usage["model_name"] == "gpt-4o-mini-2024-07-18"
+    assert (usage["prompt_tokens"], usage["completion_tokens"], usage["cached_tokens"]) == (1200, 300, 1000)
+    assert usage["cost_usd"] == pytest.approx(estimate_cost("gpt-4o-mini", 1200, 300, 1000))
+    assert usage["latency_ms"] >= 0
+
+    # Parsed chains lose the message, so usage comes from the model callbacks.
+    model = GenericFakeChatModel(messages=iter([_reply('{"paragraphs": []}')]))
+    client._structure_chain = RunnableLambda(lambda payload: payload["answer_text"]) | model | JsonOutputParser()
+    structure = client.structure_answer(
+        question_type="T3", question_title="Titre", question_body="Corps", answer_text="Texte"
+    )
+    assert structure["_usage"]["prompt_tokens"] == 1200
+
+
+class _UsageStreamingModel(GenericFakeChatModel):
+    # Like ChatOpenAI with stream_usage: the token counts arrive in a final empty chunk.
+    def _stream(self, *args, **kwargs):
+        yield from super()._stream(*args, **kwargs)
+        usage = _reply("")
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(
+                content="", usage_metadata=usage.usage_metadata, response_metadata=usage.response_metadata
+            )
+        )
+
+
+def test_streamed_live_reply_reports_token_usage() -> None:
+    client = QuestionLLMClient(api_key="test-key", resilience=_resilience())
+    assert client._llm.stream_usage is True
+    client._llm = _UsageStreamingModel(messages=iter([AIMessage(content='{"reply": "Bonjour", "reminder": null}')]))
+    deltas = []
+    result = client.generate_live_reply(
+        question_type="T2",
+        question_title="Live",
+        question_body="Corps",
+        history=[],
+        candidate_query="Bonjour",
+        turn_index=1,
+        on_delta=deltas.append,
+    )
+    assert "".join(deltas) == "Bonjour"
+    usage = result["_usage"]
+    assert (usage["model_name"], usage["prompt_tokens"], usage["completion_tokens"]) == (
+        "gpt-4o-mini-2024-07-18",
+        1200,
+        300,
+    )
+    assert usage["latency_ms"] >= 0
+
+
+def test_calls_without_reported_usage_keep_tokens_empty() -> None:
+    client, _ = _flaky_client(_resilience(), [])
+    usage = client.evaluate_answer(**EVAL_KWARGS)["_usage"]
+    assert usage["model_name"] == "gpt-4o-mini"
+    assert "prompt_tokens" not in usage and "cost_usd" not in usage
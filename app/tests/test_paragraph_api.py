@@ -2,13 +2,33 @@ from typing import Generator
 
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 from sqlalchemy.pool import StaticPool
 from sqlmodel import SQLModel, Session, create_engine, select
 
 from app.main import app
 from app.api.dependencies import get_session, get_llm_client
-from app.db.schemas import Answer, AnswerGroup, Question, Paragraph, Sentence, LLMConversation
+from app.db.schemas import (
+    Answer,
+    AnswerBundle,
+    AnswerGroup,
+    Question,
+    Paragraph,
+    Sentence,
+    SentenceChunk,
+    ChunkLexeme,
+    Lexeme,
+    FlashcardProgress,
+    LLMConversation,
+    TranslationMemory,
+    Session as SessionSchema,
+)
+from app.services.conversation_store import ConversationStore
 from app.services.llm_service import LLMError
+from app.services import task_service as task_service_module
+from app.services.task_control import TaskCanceled
+from app.services.task_service import TaskService
+from app.services.translation_memory_service import source_hash
 
 
 @pytest.fixture(name="session")
@@ -140,6 +160,61 @@ def test_list_paragraphs(client: TestClient, session: Session) -> None:
     assert len(data[0]["sentences"]) == 1
 
 
+def test_paragraph_tree_uses_three_queries_and_etag(client: TestClient, session: Session) -> None:
+    answer_id = _create_answer(session)
+    paragraph = session.exec(select(Paragraph).where(Paragraph.answer_id == answer_id)).one()
+    for order in range(2, 7):
+        session.add(Paragraph(answer_id=answer_id, order_index=order, role_label=f"p{order}"))
+    session.commit()
+    sentence = session.exec(select(Sentence).where(Sentence.paragraph_id == paragraph.id)).one()
+    chunk = SentenceChunk(sentence_id=sentence.id, order_index=1, text="Bonjour")
+    lexeme = Lexeme(headword="bonjour", lemma="bonjour", hash="bonjour")
+    session.add_all([chunk, lexeme])
+    session.commit()
+    session.add(ChunkLexeme(chunk_id=chunk.id, lexeme_id=lexeme.id, order_index=1))
+    session.commit()
+    lexeme_id = lexeme.id
+
+    statements: list[str] = []
+    engine = session.get_bind()
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count_statement)
+    try:
+        first = client.get(f"/answers/{answer_id}/paragraphs")
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statement)
+    assert first.status_code == 200
+    # One version lookup plus paragraphs, sentences and chunks with their lexemes.
+    assert len(statements) == 4
+    data = first.json()
+    assert [item["order_index"] for item in data] == [1, 2, 3, 4, 5, 6]
+    assert data[0]["sentences"][0]["chunks"][0]["lexemes"][0]["lexeme"]["headword"] == "bonjour"
+    etag = first.headers["etag"]
+
+    cached = client.get(f"/answers/{answer_id}/paragraphs", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+
+    sentence.translation_zh = "你好"
+    session.add(sentence)
+    session.commit()
+    changed = client.get(f"/answers/{answer_id}/paragraphs", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()[0]["sentences"][0]["translation_zh"] == "你好"
+    assert changed.headers["etag"] != etag
+
+    # Lexemes are shared, so editing one changes every answer that links it.
+    etag = changed.headers["etag"]
+    session.get(Lexeme, lexeme_id).gloss = "greeting"
+    session.commit()
+    relinked = client.get(f"/answers/{answer_id}/paragraphs", headers={"If-None-Match": etag})
+    assert relinked.status_code == 200
+    assert relinked.json()[0]["sentences"][0]["chunks"][0]["lexemes"][0]["lexeme"]["gloss"] == "greeting"
+
+
 def test_run_structure_task(client: TestClient, session: Session) -> None:
     answer_id = _create_answer(session)
     response = client.post(f"/answers/{answer_id}/tasks/structure")
@@ -220,9 +295,270 @@ def test_split_task_records_llm_conversation(client: TestClient, session: Sessio
     assert resp.status_code == 201
     resp = client.post(f"/sentences/{sentence.id}/tasks/chunk-lexemes")
     assert resp.status_code == 201
-    conversation = session.exec(select(LLMConversation).order_by(LLMConversation.created_at.desc())).first()
-    assert conversation is not None
+    row = session.exec(select(LLMConversation).order_by(LLMConversation.created_at.desc())).first()
+    assert row is not None
+    conversation = ConversationStore(session).to_read(row)
     assert conversation.purpose == "chunk_lexeme"
     assert conversation.result.get("lexemes")
     messages = conversation.messages
     assert "lexeme_prompt" in messages
+
+
+class CountingStructureLLM:
+    def __init__(self, sentences: list[str]) -> None:
+        self.sentences = sentences
+        self.calls: list[str] = []
+
+    def structure_answer(self, **kwargs):
+        self.calls.append("structure")
+        return {
+            "paragraphs": [
+                {
+                    "role": "body",
+                    "summary": "summary",
+                    "sentences": [
+                        {"text": text, "translation_en": f"en:{text}", "translation_zh": f"zh:{text}"}
+                        for text in self.sentences
+                    ],
+                }
+            ]
+        }
+
+    def chunk_sentence(self, *, sentence_text: str, **kwargs):
+        self.calls.append("chunk")
+        return {"chunks": [{"chunk_index": 1, "text": sentence_text, "chunk_type": "expression"}]}
+
+    def build_chunk_lexemes(self, *, chunks: list[dict], **kwargs):
+        self.calls.append("lexeme")
+        return {
+            "lexemes": [
+                {"chunk_index": 1, "headword": chunks[0]["text"].split()[0].lower(), "sense_label": "", "gloss": "g"}
+            ]
+        }
+
+
+def test_restructure_only_reprocesses_changed_sentences(session: Session) -> None:
+    answer_id = _create_answer(session)
+    llm = CountingStructureLLM(["Je pense que oui", "Il fait beau aujourd'hui"])
+    service = TaskService(session, llm)
+
+    first = service.run_structure_pipeline_for_answer(answer_id)
+    assert llm.calls.count("chunk") == 2
+    assert first["llm_calls"] == 5
+    kept = session.exec(select(Sentence).where(Sentence.text == "Je pense que oui")).one()
+    kept_chunk_ids = session.exec(select(SentenceChunk.id).where(SentenceChunk.sentence_id == kept.id)).all()
+    card = session.exec(
+        select(FlashcardProgress)
+        .where(FlashcardProgress.entity_type == "sentence")
+        .where(FlashcardProgress.entity_id == kept.id)
+    ).one()
+    card.streak = 3
+    session.add(card)
+    session.commit()
+    dropped = session.exec(select(Sentence).where(Sentence.text == "Il fait beau aujourd'hui")).one()
+    dropped_id = dropped.id
+
+    llm.sentences = ["Je pense que oui", "Il pleut beaucoup ce soir"]
+    llm.calls.clear()
+    report = service.run_structure_pipeline_for_answer(answer_id)
+
+    assert llm.calls == ["structure", "chunk", "lexeme"]
+    assert report == {"sentences": 2, "reprocessed_sentences": 1, "llm_calls": 3, "llm_calls_saved": 3}
+    session.refresh(kept)
+    assert session.exec(select(SentenceChunk.id).where(SentenceChunk.sentence_id == kept.id)).all() == kept_chunk_ids
+    session.refresh(card)
+    assert card.streak == 3
+    assert session.get(Sentence, dropped_id) is None
+    assert session.exec(select(SentenceChunk).where(SentenceChunk.sentence_id == dropped_id)).all() == []
+    assert session.exec(
+        select(FlashcardProgress)
+        .where(FlashcardProgress.entity_type == "sentence")
+        .where(FlashcardProgress.entity_id == dropped_id)
+    ).all() == []
+
+
+def test_restructure_keeps_sentences_across_spacing_but_not_case(session: Session) -> None:
+    answer_id = _create_answer(session)
+    llm = CountingStructureLLM(["Je pense que oui"])
+    service = TaskService(session, llm)
+    service.run_structure_pipeline_for_answer(answer_id)
+    kept = session.exec(select(Sentence)).one()
+
+    # Spacing differences are the same sentence, as for the translation memory.
+    llm.sentences = ["Je  pense que oui "]
+    llm.calls.clear()
+    service.run_structure_pipeline_for_answer(answer_id)
+
+    assert llm.calls == ["structure"]
+    session.refresh(kept)
+    assert kept.text == "Je  pense que oui "
+    assert kept.content_hash == source_hash("Je pense que oui", casefold=False)
+
+    # A case change alters what the chunks quote, so the sentence is chunked again.
+    llm.sentences = ["JE PENSE que oui"]
+    llm.calls.clear()
+    service.run_structure_pipeline_for_answer(answer_id)
+
+    assert llm.calls == ["structure", "chunk", "lexeme"]
+    sentence = session.exec(select(Sentence)).one()
+    assert sentence.id != kept.id
+    chunks = session.exec(select(SentenceChunk).where(SentenceChunk.sentence_id == sentence.id)).all()
+    assert [chunk.text for chunk in chunks] == ["JE PENSE que oui"]
+
+
+def test_interrupted_structure_pipeline_marks_session_failed(session: Session, monkeypatch) -> None:
+    answer_id = _create_answer(session)
+    question_id = session.get(AnswerGroup, session.get(Answer, answer_id).answer_group_id).question_id
+    entity = SessionSchema(question_id=question_id, session_type="first", status="draft")
+    session.add(entity)
+    session.commit()
+    checks = []
+
+    def cancel_on_second_check() -> None:
+        checks.append(1)
+        if len(checks) == 2:
+            raise TaskCanceled()
+
+    monkeypatch.setattr(task_service_module, "check_interrupted", cancel_on_second_check)
+    llm = CountingStructureLLM(["Je pense que oui", "Il fait beau aujourd'hui"])
+    with pytest.raises(TaskCanceled):
+        TaskService(session, llm).run_structure_pipeline_for_answer(answer_id, session_id=entity.id)
+
+    session.refresh(entity)
+    assert (entity.phase, entity.phase_status, entity.phase_error) == ("structure_pipeline", "failed", "任务已取消")
+    assert session.exec(select(AnswerBundle).where(AnswerBundle.answer_id == answer_id)).all() == []
+
+
+class CountingTranslationLLM:
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+
+    def translate_sentences(self, *, sentences: list[str], **kwargs):
+        self.batches.append(list(sentences))
+        return {
+            "translations": [
+                {"sentence_index": idx, "translation_en": f"en:{text}", "translation_zh": f"zh:{text}"}
+                for idx, text in enumerate(sentences, start=1)
+            ]
+        }
+
+
+def _create_sibling_answer(session: Session, answer_id: int) -> int:
+    answer = Answer(answer_group_id=session.get(Answer, answer_id).answer_group_id, title="V2", text="Texte", status="active")
+    session.add(answer)
+    session.commit()
+    session.refresh(answer)
+    session.add(Paragraph(answer_id=answer.id, order_index=1, role_label="intro", summary="Summary"))
+    session.commit()
+    return answer.id
+
+
+def _add_sentences(session: Session, answer_id: int, texts: list[str]) -> None:
+    paragraph = session.exec(select(Paragraph).where(Paragraph.answer_id == answer_id)).first()
+    for idx, text in enumerate(texts, start=1):
+        session.add(Sentence(paragraph_id=paragraph.id, order_index=idx, text=text))
+    session.commit()
+
+
+def test_structure_pipeline_writes_answer_bundle(client: TestClient, session: Session) -> None:
+    answer_id = _create_answer(session)
+    llm = CountingStructureLLM(["Je pense que oui", "Il fait beau aujourd'hui"])
+    TaskService(session, llm).run_structure_pipeline_for_answer(answer_id)
+    bundle = session.exec(select(AnswerBundle).where(AnswerBundle.answer_id == answer_id)).one()
+    assert bundle.stored_size < bundle.raw_size
+
+    response = client.get(f"/answers/{answer_id}/bundle", headers={"Accept-Encoding": "deflate"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "deflate"
+    assert response.headers["etag"] == bundle.etag[:-1] + '-deflate"'
+    data = response.json()
+    assert data["structure_version"] == bundle.structure_version
+    sentences = [sentence for paragraph in data["paragraphs"] for sentence in paragraph["sentences"]]
+    assert [sentence["text"] for sentence in sentences] == ["Je pense que oui", "Il fait beau aujourd'hui"]
+    assert sentences[0]["chunks"][0]["lexemes"][0]["lexeme"]["headword"] == "je"
+
+    plain = client.get(f"/answers/{answer_id}/bundle", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["etag"] == bundle.etag
+    assert plain.json() == data
+    refused = client.get(f"/answers/{answer_id}/bundle", headers={"Accept-Encoding": "gzip, deflate;q=0"})
+    assert "content-encoding" not in refused.headers
+    assert refused.json() == data
+    cached = client.get(
+        f"/answers/{answer_id}/bundle", headers={"Accept-Encoding": "identity", "If-None-Match": bundle.etag}
+    )
+    assert cached.status_code == 304
+    # The plain body's validator does not revalidate the deflate one.
+    encoded = client.get(
+        f"/answers/{answer_id}/bundle", headers={"Accept-Encoding": "deflate", "If-None-Match": bundle.etag}
+    )
+    assert encoded.status_code == 200
+
+    # Editing the tree outside the pipeline makes the next read write a newer bundle.
+    sentence = session.exec(select(Sentence).where(Sentence.text == "Je pense que oui")).one()
+    sentence.translation_zh = "我认为是"
+    session.add(sentence)
+    session.commit()
+    changed = client.get(f"/answers/{answer_id}/bundle", headers={"If-None-Match": bundle.etag})
+    assert changed.status_code == 200
+    assert changed.json()["paragraphs"][0]["sentences"][0]["translation_zh"] == "我认为是"
+    assert len(session.exec(select(AnswerBundle).where(AnswerBundle.answer_id == answer_id)).all()) == 1
+    assert client.get("/answers/9999/bundle").status_code == 404
+
+
+def test_translation_memory_skips_known_sentences(session: Session, monkeypatch) -> None:
+    monkeypatch.setenv("TRANSLATION_MEMORY_FUZZY_RATIO", "0.1")
+    llm = CountingTranslationLLM()
+    first_answer = _create_answer(session)
+    _add_sentences(session, first_answer, ["Il fait beau aujourd'hui."])
+    TaskService(session, llm).run_sentence_translation_for_answer(first_answer)
+    assert llm.batches == [["Bonjour", "Il fait beau aujourd'hui."]]
+    assert len(session.exec(select(TranslationMemory)).all()) == 2
+
+    second_answer = _create_sibling_answer(session, first_answer)
+    _add_sentences(session, second_answer, ["bonjour", "Il fait beau aujourd’hui.", "Nous partons demain."])
+    task = TaskService(session, llm).run_sentence_translation_for_answer(second_answer)
+
+    assert llm.batches[1] == ["Nous partons demain."]
+    summary = task.result_summary
+    assert summary["memory_hits"] == 1
+    assert summary["memory_fuzzy_hits"] == 1
+    assert summary["memory_misses"] == 1
+    assert summary["memory_hit_rate"] == 0.667
+    fuzzy_sentence = session.exec(select(Sentence).where(Sentence.text == "Il fait beau aujourd’hui.")).one()
+    assert fuzzy_sentence.translation_en == "en:Il fait beau aujourd'hui."
+
+
+def test_chunk_cache_clones_identical_sentences(session: Session, monkeypatch) -> None:
+    llm = CountingStructureLLM(["Je pense que oui", "Il fait beau aujourd'hui"])
+    first_answer = _create_answer(session)
+    TaskService(session, llm).run_structure_pipeline_for_answer(first_answer)
+    source = session.exec(select(Sentence).where(Sentence.text == "Je pense que oui")).one()
+    source_chunks = session.exec(select(SentenceChunk).where(SentenceChunk.sentence_id == source.id)).all()
+
+    second_answer = _create_sibling_answer(session, first_answer)
+    llm.sentences = ["Je pense que oui", "Nous partons demain soir"]
+    llm.calls.clear()
+    report = TaskService(session, llm).run_structure_pipeline_for_answer(second_answer)
+
+    assert llm.calls == ["structure", "chunk", "lexeme"]
+    assert report["llm_calls"] == 3
+    clone = session.exec(
+        select(Sentence)
+        .join(Paragraph, Paragraph.id == Sentence.paragraph_id)
+        .where(Paragraph.answer_id == second_answer)
+        .where(Sentence.text == "Je pense que oui")
+    ).one()
+    cloned_chunks = session.exec(select(SentenceChunk).where(SentenceChunk.sentence_id == clone.id)).all()
+    assert [chunk.text for chunk in cloned_chunks] == [chunk.text for chunk in source_chunks]
+    assert {chunk.id for chunk in cloned_chunks}.isdisjoint(chunk.id for chunk in source_chunks)
+    source_links = session.exec(select(ChunkLexeme.lexeme_id).where(ChunkLexeme.chunk_id == source_chunks[0].id)).all()
+    cloned_links = session.exec(select(ChunkLexeme.lexeme_id).where(ChunkLexeme.chunk_id == cloned_chunks[0].id)).all()
+    assert cloned_links == source_links
+
+    # A changed chunk prompt invalidates the cached segmentation.
+    monkeypatch.setattr("app.services.task_service.CHUNK_SPLIT_PROMPT_VERSION", "changed")
+    third_answer = _create_sibling_answer(session, first_answer)
+    llm.calls.clear()
+    TaskService(session, llm).run_structure_pipeline_for_answer(third_answer)
+    assert llm.calls.count("chunk") == 2
@@ -227,11 +227,15 @@ def test_question_slug_is_computed_from_fields(client: TestClient) -> None:
 def test_generate_question_metadata(client: TestClient) -> None:
     class DummyLLM:
         def generate_metadata(self, *, slug, body, question_type, tags):
-            return GeneratedQuestionMetadata(title="新的标题", tags=["教育", "家庭"])
+            return GeneratedQuestionMetadata(
+                title="新的标题", tags=["教育", "家庭"], usage={"model_name": "gpt-4o-mini", "latency_ms": 120}
+            )
         def plan_answer_direction(self, **kwargs):
             return {
                 "recommended": {"title": "方向A", "summary": "摘要", "stance": "neutral", "structure": []},
                 "alternatives": [],
+                "_prompt_messages": [],
+                "_usage": {"model_name": "gpt-4o-mini", "latency_ms": 340, "prompt_tokens": 500, "completion_tokens": 80},
             }
 
     app.dependency_overrides[get_llm_client] = lambda: DummyLLM()
@@ -253,3 +257,7 @@ def test_generate_question_metadata(client: TestClient) -> None:
     assert data["title"] == "新的标题"
     assert data["tags"] == ["ville", "教育", "家庭"]
     assert data["slug"] == created["slug"]
+    assert "_usage" not in client.get(f"/questions/{created['id']}").json()["direction_plan"]
+    purposes = {item["purpose"]: item for item in client.get("/metrics/llm").json()["purposes"]}
+    assert purposes["metadata"]["latency_p95_ms"] == 120
+    assert (purposes["outline"]["calls"], purposes["outline"]["prompt_tokens"]) == (1, 500)
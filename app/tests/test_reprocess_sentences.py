@@ -0,0 +1,154 @@
+import io
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from app.db.schemas import (
+    Answer,
+    AnswerGroup,
+    ChunkLexeme,
+    FlashcardProgress,
+    Lexeme,
+    Paragraph,
+    Question,
+    Sentence,
+    SentenceChunk,
+)
+from app.scripts import reprocess_sentences as reprocess_module
+from app.scripts.reprocess_sentences import Checkpoint, reprocess_sentences, resolve_sentence_ids
+from app.services.llm_service import LLMError
+
+
+class SplitLLM:
+    def __init__(self, failing: set[str] | None = None) -> None:
+        self.failing = failing or set()
+        self.chunked: list[str] = []
+
+    def chunk_sentence(self, *, sentence_text: str, **kwargs):
+        if sentence_text in self.failing:
+            raise LLMError("boom")
+        self.chunked.append(sentence_text)
+        return {"chunks": [{"chunk_index": 1, "text": sentence_text, "chunk_type": "expression"}]}
+
+    def build_chunk_lexemes(self, *, chunks: list[dict], **kwargs):
+        return {
+            "lexemes": [
+                {"chunk_index": 1, "headword": chunks[0]["text"].split()[0].lower(), "sense_label": "", "gloss": "g"}
+            ]
+        }
+
+
+@pytest.fixture(name="engine")
+def engine_fixture(tmp_path: Path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reprocess.db'}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def _seed(engine, texts: list[str]) -> list[int]:
+    with Session(engine) as session:
+        question = Question(
+            type="T2", source="seikou", year=2024, month=9, suite="1", number="1", title="Q", body="Body"
+        )
+        session.add(question)
+        session.commit()
+        group = AnswerGroup(question_id=question.id, title="Group")
+        session.add(group)
+        session.commit()
+        answer = Answer(answer_group_id=group.id, title="Answer", text="Texte", status="active")
+        session.add(answer)
+        session.commit()
+        paragraph = Paragraph(answer_id=answer.id, order_index=1)
+        session.add(paragraph)
+        session.commit()
+        sentences = [Sentence(paragraph_id=paragraph.id, order_index=idx, text=text) for idx, text in enumerate(texts, 1)]
+        session.add_all(sentences)
+        orphan = Lexeme(headword="orphelin", lemma="orphelin", hash="orphelin")
+        session.add(orphan)
+        session.commit()
+        session.add(FlashcardProgress(entity_type="lexeme", entity_id=orphan.id))
+        session.commit()
+        return [sentence.id for sentence in sentences]
+
+
+def test_reprocess_resumes_from_checkpoint(engine, tmp_path: Path) -> None:
+    texts = [f"Phrase numéro {idx} pour le test" for idx in range(6)]
+    sentence_ids = _seed(engine, texts)
+    checkpoint = Checkpoint(tmp_path / "checkpoint")
+
+    llm = SplitLLM(failing={texts[2]})
+    report = reprocess_sentences(
+        engine, llm, sentence_ids, workers=3, rate=0, checkpoint=checkpoint, stream=io.StringIO()
+    )
+    assert report["processed"] == 5
+    assert list(report["failed"]) == [sentence_ids[2]]
+    assert report["orphan_lexemes_removed"] == 1
+    assert checkpoint.load() == set(sentence_ids) - {sentence_ids[2]}
+
+    retry_llm = SplitLLM()
+    report = reprocess_sentences(
+        engine, retry_llm, sentence_ids, workers=3, rate=0, checkpoint=checkpoint, stream=io.StringIO()
+    )
+    assert retry_llm.chunked == [texts[2]]
+    assert report == {
+        "skipped": 5,
+        "processed": 1,
+        "failed": {},
+        "orphan_lexemes_removed": 0,
+        "interrupted": False,
+    }
+    assert not checkpoint.path.exists()
+
+    with Session(engine) as session:
+        assert len(session.exec(select(SentenceChunk)).all()) == 6
+        assert len(session.exec(select(ChunkLexeme)).all()) == 6
+        assert session.exec(select(FlashcardProgress).where(FlashcardProgress.entity_type == "lexeme")).all()
+        assert session.exec(select(Lexeme).where(Lexeme.headword == "orphelin")).first() is None
+        assert resolve_sentence_ids(session, None, None, None, since=None) == sentence_ids
+
+
+def test_reprocess_since_selects_and_skips_within_selection(engine, tmp_path: Path) -> None:
+    sentence_ids = _seed(engine, [f"Phrase {idx} du lot" for idx in range(4)])
+    cutoff = datetime.now(timezone.utc) - timedelta(days=1)
+    with Session(engine) as session:
+        for sentence in session.exec(select(Sentence).where(Sentence.id.in_(sentence_ids[:2]))).all():
+            sentence.created_at = cutoff - timedelta(days=30)
+            session.add(sentence)
+        session.commit()
+        selected = resolve_sentence_ids(session, None, None, None, since=cutoff)
+    assert selected == sentence_ids[2:]
+
+    checkpoint = Checkpoint(tmp_path / "checkpoint")
+    for sentence_id in (sentence_ids[0], sentence_ids[2]):
+        checkpoint.mark(sentence_id)
+    llm = SplitLLM()
+    report = reprocess_sentences(engine, llm, selected, workers=2, rate=0, checkpoint=checkpoint, stream=io.StringIO())
+    assert (report["skipped"], report["processed"]) == (1, 1)
+    assert llm.chunked == ["Phrase 3 du lot"]
+
+
+def test_reprocess_interrupt_drops_queued_sentences(engine, tmp_path: Path, monkeypatch) -> None:
+    sentence_ids = _seed(engine, [f"Phrase {idx} interrompue" for idx in range(8)])
+    checkpoint = Checkpoint(tmp_path / "checkpoint")
+    real_wait = reprocess_module.wait
+    calls = []
+
+    def interrupting_wait(*args, **kwargs):
+        calls.append(1)
+        if len(calls) > 1:
+            raise KeyboardInterrupt
+        return real_wait(*args, **kwargs)
+
+    monkeypatch.setattr(reprocess_module, "wait", interrupting_wait)
+    llm = SplitLLM()
+    report = reprocess_sentences(
+        engine, llm, sentence_ids, workers=1, rate=0, checkpoint=checkpoint, stream=io.StringIO()
+    )
+    assert report["interrupted"] is True
+    assert 1 <= len(llm.chunked) < len(sentence_ids)
+    assert report["processed"] == len(llm.chunked)
+    assert len(checkpoint.load()) == len(llm.chunked)
+    assert report["orphan_lexemes_removed"] == 1
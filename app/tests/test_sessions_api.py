@@ -1,7 +1,10 @@
+from datetime import datetime, timedelta, timezone
 from typing import Generator
 
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 from sqlalchemy.pool import StaticPool
 from sqlmodel import SQLModel, Session, create_engine, select
 
@@ -19,7 +22,17 @@ from app.db.schemas import (
     Session as SessionSchema,
     Question,
     LiveTurn,
+    LLMConversation,
+    SessionEvent,
+    Task,
 )
+from app.db.base import _ensure_autoincrement
+from app.services.archive_service import ArchiveService
+from app.services.conversation_store import ConversationStore
+from app.services.draft_diff import gap_diff
+from app.services import session_service as session_service_module
+from app.services.session_service import SessionService
+from app.services.session_state import save_session, set_phase
 
 
 @pytest.fixture(name="session")
@@ -264,6 +277,123 @@ def test_run_eval_task(client: TestClient, session: Session) -> None:
     assert "saved_at" in last_eval
 
 
+def test_session_events_log_phase_changes_and_results(client: TestClient, session: Session) -> None:
+    question_id = _create_question(client, session)
+    session_id = client.post(
+        "/sessions", json={"question_id": question_id, "user_answer_draft": "Je pense que..."}
+    ).json()["id"]
+    task_id = client.post(f"/sessions/{session_id}/tasks/eval").json()["id"]
+
+    events = client.get(f"/sessions/{session_id}/events").json()
+    assert events[0]["kind"] == "phase" and events[0]["phase"] == "draft"
+    assert [event["task_id"] for event in events if event["kind"] == "last_eval"] == [task_id]
+    assert [event["phase_status"] for event in events if event["kind"] == "phase"][-1] == "idle"
+
+    entity = session.get(SessionSchema, session_id)
+    session.refresh(entity)
+    assert entity.last_eval_task_id == task_id
+    assert entity.phase == "await_new_group"
+    assert not {"phase", "phase_status", "last_eval"} & set(entity.progress_state)
+
+    statements: list[str] = []
+    engine = session.get_bind()
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        set_phase(session, entity, status="running")
+        session.commit()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    update = next(statement for statement in statements if statement.startswith("UPDATE sessions"))
+    # Only the touched columns are written; the progress_state blob is left alone.
+    assert "progress_state" not in update
+    assert len(session.exec(select(SessionEvent).where(SessionEvent.session_id == session_id)).all()) == len(events) + 1
+
+
+def test_concurrent_session_writes_merge_or_conflict(client: TestClient, session: Session) -> None:
+    question_id = _create_question(client, session)
+    session_id = client.post("/sessions", json={"question_id": question_id}).json()["id"]
+    engine = session.get_bind()
+    with Session(engine, expire_on_commit=False) as other:
+        stale = other.get(SessionSchema, session_id)
+        other.commit()
+        version = stale.version
+
+        fresh = session.get(SessionSchema, session_id)
+        save_session(session, fresh, progress={"live_status": "active"})
+        session.commit()
+        assert fresh.version == version + 1
+
+        # Disjoint keys: the stale writer merges onto the newer row instead of clobbering it.
+        save_session(other, stale, progress={"direction_match": "travail"})
+        other.commit()
+        assert stale.version == version + 2
+        assert stale.progress_state == {"live_status": "active", "direction_match": "travail"}
+
+        set_phase(session, fresh, phase="await_new_group", status="running")
+        session.commit()
+        with pytest.raises(HTTPException) as excinfo:
+            set_phase(other, stale, phase="gap_highlight")
+        assert excinfo.value.status_code == 409
+        other.rollback()
+
+    session.expire_all()
+    entity = session.get(SessionSchema, session_id)
+    assert entity.phase == "await_new_group"
+    assert entity.progress_state == {"live_status": "active", "direction_match": "travail"}
+
+
+def _finalize_racing(client: TestClient, session: Session, monkeypatch, concurrent_write) -> tuple[int, object]:
+    question_id = _create_question(client, session)
+    session_id = client.post("/sessions", json={"question_id": question_id}).json()["id"]
+    set_phase(session, session.get(SessionSchema, session_id), phase="await_finalize", status="idle")
+    session.commit()
+    engine = session.get_bind()
+    real_set_phase = session_service_module.set_phase
+
+    def set_phase_after_other_writer(db, entity, **kwargs):
+        # Another request updates the row after finalize has read it but before it writes.
+        entity.version
+        with Session(engine) as other:
+            concurrent_write(other, other.get(SessionSchema, session_id))
+            other.commit()
+        real_set_phase(db, entity, **kwargs)
+
+    monkeypatch.setattr(session_service_module, "set_phase", set_phase_after_other_writer)
+    response = client.post(
+        f"/sessions/{session_id}/finalize", json={"group_title": "组", "answer_title": "版本", "answer_text": "Texte"}
+    )
+    return session_id, response
+
+
+def test_finalize_merges_concurrent_session_write(client: TestClient, session: Session, monkeypatch) -> None:
+    session_id, response = _finalize_racing(
+        client, session, monkeypatch, lambda db, entity: save_session(db, entity, progress={"live_status": "ended"})
+    )
+    assert response.status_code == 200
+    assert response.json()["answer_id"] is not None
+    session.expire_all()
+    entity = session.get(SessionSchema, session_id)
+    assert entity.answer_id == response.json()["answer_id"]
+    assert entity.phase != "await_finalize"
+    assert entity.progress_state["live_status"] == "ended"
+
+
+def test_finalize_conflicting_with_phase_update_returns_409(
+    client: TestClient, session: Session, monkeypatch
+) -> None:
+    session_id, response = _finalize_racing(
+        client, session, monkeypatch, lambda db, entity: set_phase(db, entity, status="failed", error="中断")
+    )
+    assert response.status_code == 409
+    session.expire_all()
+    entity = session.get(SessionSchema, session_id)
+    assert (entity.phase, entity.phase_status, entity.answer_id) == ("await_finalize", "failed", None)
+
+
 def test_run_compose_task(client: TestClient, session: Session) -> None:
     class DummyLLM:
         def evaluate_answer(self, **kwargs):
@@ -314,7 +444,7 @@ def test_compare_task(client: TestClient, session: Session) -> None:
     db_session = session
     db_entity = db_session.exec(select(SessionSchema).where(SessionSchema.id == session_id)).first()
     assert db_entity is not None
-    db_entity.progress_state = {"phase": "await_eval_confirm"}
+    db_entity.phase = "await_eval_confirm"
     db_session.add(db_entity)
     db_session.commit()
     task_resp = client.post(f"/sessions/{session_id}/tasks/compare")
@@ -345,7 +475,7 @@ def test_gap_highlight_and_refine(client: TestClient, session: Session) -> None:
     session_id = session_resp.json()["id"]
     db_entity = session.exec(select(SessionSchema).where(SessionSchema.id == session_id)).first()
     assert db_entity is not None
-    db_entity.progress_state = {"phase": "gap_highlight"}
+    db_entity.phase = "gap_highlight"
     session.add(db_entity)
     session.commit()
     highlight_resp = client.post(f"/sessions/{session_id}/tasks/gap-highlight")
@@ -355,9 +485,7 @@ def test_gap_highlight_and_refine(client: TestClient, session: Session) -> None:
     assert highlight["result_summary"]["coverage_score"] == 0.5
     db_entity = session.exec(select(SessionSchema).where(SessionSchema.id == session_id)).first()
     assert db_entity is not None
-    progress_state = dict(db_entity.progress_state or {})
-    progress_state["phase"] = "refine"
-    db_entity.progress_state = progress_state
+    db_entity.phase = "refine"
     session.add(db_entity)
     session.commit()
     refine_resp = client.post(f"/sessions/{session_id}/tasks/refine")
@@ -367,6 +495,57 @@ def test_gap_highlight_and_refine(client: TestClient, session: Session) -> None:
     assert refine["result_summary"]["text"] == "Réponse enrichie"
 
 
+SHARED_SENTENCES = [
+    f"Argument numéro {idx} : les villes qui investissent dans les transports publics gagnent en qualité de vie."
+    for idx in range(1, 9)
+]
+
+
+def test_gap_diff_keeps_only_divergent_sentences() -> None:
+    reference = " ".join(SHARED_SENTENCES[:4] + ["Il faut aussi penser aux zones rurales."] + SHARED_SENTENCES[4:])
+    draft = " ".join(
+        SHARED_SENTENCES[:4]
+        + [SHARED_SENTENCES[4].replace("gagnent", "gagne")]
+        + SHARED_SENTENCES[5:7]
+        + ["Enfin, le vélo est une solution bon marché."]
+    )
+    diff = gap_diff(draft, reference)
+    assert "zones rurales" in diff.reference
+    assert "vélo" in diff.draft
+    # Only one sentence of context survives next to each divergent span.
+    assert SHARED_SENTENCES[0] not in diff.draft and SHARED_SENTENCES[0] not in diff.reference
+    assert SHARED_SENTENCES[3] in diff.reference
+    assert "已省略" in diff.draft
+    assert diff.omitted_sentences >= 6
+    assert len(diff.draft) + len(diff.reference) < (len(draft) + len(reference)) / 2
+    assert gap_diff("Bonjour.", "Salut.") == ("Bonjour.", "Salut.", 0, 2)
+
+
+def test_gap_highlight_logs_diffed_prompt(client: TestClient, session: Session) -> None:
+    question_id = _create_question(client, session)
+    group = client.post("/answer-groups", json={"question_id": question_id, "title": "Group"}).json()
+    client.post(
+        "/answers",
+        json={"answer_group_id": group["id"], "title": "参考", "text": " ".join(SHARED_SENTENCES)},
+    )
+    draft = " ".join(SHARED_SENTENCES[:7] + ["Je conclus avec une idée personnelle."])
+    session_id = client.post("/sessions", json={"question_id": question_id, "user_answer_draft": draft}).json()["id"]
+    entity = session.get(SessionSchema, session_id)
+    entity.phase = "gap_highlight"
+    session.add(entity)
+    session.commit()
+    assert client.post(f"/sessions/{session_id}/tasks/gap-highlight").status_code == 201
+    conversation = session.exec(
+        select(LLMConversation).where(
+            LLMConversation.session_id == session_id, LLMConversation.purpose == "gap_highlight"
+        )
+    ).one()
+    messages = ConversationStore(session).to_read(conversation).messages
+    assert messages["draft"] == draft
+    assert messages["omitted_sentences"] == 12
+    assert messages["total_sentences"] == 16
+
+
 def test_finalize_session_creates_answer(client: TestClient, session: Session) -> None:
     question_id = _create_question(client, session)
     session_resp = client.post(
@@ -458,6 +637,113 @@ def test_session_history_endpoint(client: TestClient, session: Session) -> None:
     assert any(conv["purpose"] == "eval" for conv in history["conversations"])
 
 
+def test_session_history_reads_archive_on_request(
+    client: TestClient, session: Session, tmp_path, monkeypatch
+) -> None:
+    monkeypatch.setenv("ARCHIVE_DATABASE_PATH", str(tmp_path / "archive.db"))
+    question_id = _create_question(client, session)
+    session_resp = client.post(
+        "/sessions",
+        json={"question_id": question_id, "user_answer_draft": "Texte initial"},
+    ).json()
+    assert client.post(f"/sessions/{session_resp['id']}/tasks/eval").status_code == 201
+    old_task = session.exec(select(Task).where(Task.session_id == session_resp["id"])).one()
+    old_task.updated_at = datetime.now(timezone.utc) - timedelta(days=60)
+    session.add(old_task)
+    newer_task = Task(session_id=session_resp["id"], type="compose")
+    session.add(newer_task)
+    session.commit()
+    session.add(LLMConversation(session_id=session_resp["id"], task_id=newer_task.id, purpose="compose"))
+    session.commit()
+    old_task_id = old_task.id
+
+    # The session still shows that eval as its last result, so it stays hot.
+    assert ArchiveService(session).archive() == {"tasks": 0, "conversations": 0}
+    client.put(f"/sessions/{session_resp['id']}", json={"user_answer_draft": "Texte révisé"})
+
+    moved = ArchiveService(session).archive()
+    assert moved == {"tasks": 1, "conversations": 1}
+    assert (tmp_path / "archive.db").exists()
+    assert session.get(Task, old_task_id) is None
+
+    hot = client.get(f"/sessions/{session_resp['id']}/history").json()
+    assert [task["type"] for task in hot["tasks"]] == ["compose"]
+    assert [conv["purpose"] for conv in hot["conversations"]] == ["compose"]
+
+    full = client.get(f"/sessions/{session_resp['id']}/history", params={"include_archived": True}).json()
+    assert [task["type"] for task in full["tasks"]] == ["compose", "eval"]
+    assert [conv["purpose"] for conv in full["conversations"]] == ["compose", "eval"]
+    assert full["conversations"][1]["task_id"] == old_task_id
+    assert full["conversations"][1]["messages"]["draft"] == "Texte initial"
+
+
+def test_archived_ids_are_not_reused_after_newest_row_is_deleted(
+    client: TestClient, session: Session, tmp_path, monkeypatch
+) -> None:
+    monkeypatch.setenv("ARCHIVE_DATABASE_PATH", str(tmp_path / "archive.db"))
+    question_id = _create_question(client, session)
+    session_id = client.post("/sessions", json={"question_id": question_id, "user_answer_draft": "Texte"}).json()["id"]
+    old_task = Task(session_id=session_id, type="eval", status="succeeded")
+    old_task.updated_at = datetime.now(timezone.utc) - timedelta(days=60)
+    newest_task = Task(session_id=session_id, type="compose")
+    session.add(old_task)
+    session.add(newest_task)
+    session.commit()
+    session.add(LLMConversation(session_id=session_id, task_id=old_task.id, purpose="eval"))
+    session.commit()
+    old_task_id, newest_task_id = old_task.id, newest_task.id
+    assert ArchiveService(session).archive() == {"tasks": 1, "conversations": 1}
+
+    session.delete(newest_task)
+    session.commit()
+    new_task = Task(session_id=session_id, type="compare")
+    session.add(new_task)
+    session.commit()
+    session.add(LLMConversation(session_id=session_id, task_id=new_task.id, purpose="compare"))
+    session.commit()
+    assert new_task.id not in (old_task_id, newest_task_id)
+
+    full = client.get(f"/sessions/{session_id}/history", params={"include_archived": True}).json()
+    tasks = {task["id"]: task["type"] for task in full["tasks"]}
+    assert tasks == {new_task.id: "compare", old_task_id: "eval"}
+    assert {conv["purpose"]: tasks[conv["task_id"]] for conv in full["conversations"]} == {
+        "compare": "compare",
+        "eval": "eval",
+    }
+
+
+def test_legacy_tables_are_rebuilt_with_autoincrement(tmp_path) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE tasks (id INTEGER NOT NULL, session_id INTEGER, answer_id INTEGER, type VARCHAR NOT NULL, "
+            "status VARCHAR NOT NULL, payload JSON NOT NULL, result_summary JSON NOT NULL, error_message VARCHAR, "
+            "created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL, PRIMARY KEY (id))"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO tasks VALUES (1, NULL, NULL, 'eval', 'succeeded', '{}', '{}', NULL, "
+            "'2024-01-01 00:00:00', '2024-01-01 00:00:00')"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO tasks VALUES (7, NULL, NULL, 'compose', 'pending', '{}', '{}', NULL, "
+            "'2024-01-01 00:00:00', '2024-01-01 00:00:00')"
+        )
+    _ensure_autoincrement(engine, Task.__table__)
+    _ensure_autoincrement(engine, Task.__table__)
+
+    with Session(engine) as db:
+        assert [task.id for task in db.exec(select(Task).order_by(Task.id))] == [1, 7]
+        db.delete(db.get(Task, 7))
+        db.commit()
+        replacement = Task(type="compare")
+        db.add(replacement)
+        db.commit()
+        assert replacement.id == 8
+        indexes = {row[1] for row in db.connection().exec_driver_sql("PRAGMA index_list('tasks')")}
+    assert "ix_tasks_session_id_created_at" in indexes
+    engine.dispose()
+
+
 def test_create_review_session(client: TestClient, session: Session) -> None:
     question_id = _create_question(client, session)
     session_resp = client.post(
@@ -554,16 +840,18 @@ def test_delete_answer_group_cascades(client: TestClient, session: Session) -> N
         "/sessions",
         json={"question_id": question_id, "answer_id": answer["id"]},
     ).json()
+    # Bulk deletes leave no row to refresh these instances from afterwards.
+    paragraph_id, sentence_id, chunk_id, lexeme_id = paragraph.id, sentence.id, chunk.id, lexeme.id
 
     resp = client.delete(f"/answer-groups/{group['id']}")
     assert resp.status_code == 204
     assert client.get(f"/answer-groups/{group['id']}").status_code == 404
     assert session.get(Answer, answer["id"]) is None
     assert session.exec(select(Paragraph).where(Paragraph.answer_id == answer["id"])).all() == []
-    assert session.exec(select(Sentence).where(Sentence.paragraph_id == paragraph.id)).all() == []
-    assert session.exec(select(SentenceChunk).where(SentenceChunk.sentence_id == sentence.id)).all() == []
-    assert session.exec(select(ChunkLexeme).where(ChunkLexeme.chunk_id == chunk.id)).all() == []
-    assert session.get(Lexeme, lexeme.id) is None
+    assert session.exec(select(Sentence).where(Sentence.paragraph_id == paragraph_id)).all() == []
+    assert session.exec(select(SentenceChunk).where(SentenceChunk.sentence_id == sentence_id)).all() == []
+    assert session.exec(select(ChunkLexeme).where(ChunkLexeme.chunk_id == chunk_id)).all() == []
+    assert session.get(Lexeme, lexeme_id) is None
     assert (
         session.exec(
             select(FlashcardProgress).where(FlashcardProgress.entity_type == "sentence")
@@ -630,13 +918,14 @@ def test_delete_single_answer(client: TestClient, session: Session) -> None:
     flashcard = FlashcardProgress(entity_type="sentence", entity_id=sentence.id)
     session.add(flashcard)
     session.commit()
+    paragraph_id, sentence_id = paragraph.id, sentence.id
     resp = client.delete(f"/answers/{answer['id']}")
     assert resp.status_code == 204
     assert client.get(f"/answers/{answer['id']}").status_code == 404
     assert client.get(f"/answer-groups/{group['id']}").status_code == 200
     assert session.exec(select(Paragraph).where(Paragraph.answer_id == answer["id"])).all() == []
-    assert session.exec(select(Sentence).where(Sentence.paragraph_id == paragraph.id)).all() == []
-    assert session.exec(select(SentenceChunk).where(SentenceChunk.sentence_id == sentence.id)).all() == []
+    assert session.exec(select(Sentence).where(Sentence.paragraph_id == paragraph_id)).all() == []
+    assert session.exec(select(SentenceChunk).where(SentenceChunk.sentence_id == sentence_id)).all() == []
     assert session.exec(select(FlashcardProgress).where(FlashcardProgress.entity_type == "sentence")).all() == []
 
 
@@ -717,3 +1006,88 @@ def test_delete_completed_session_without_answer(client: TestClient, session: Se
     assert update_resp.status_code == 200
     delete_resp = client.delete(f"/sessions/{session_resp['id']}")
     assert delete_resp.status_code == 204
+
+
+def test_delete_large_answer_group_uses_bounded_statements(client: TestClient, session: Session) -> None:
+    question_id = _create_question(client, session)
+    group = AnswerGroup(question_id=question_id, title="Large")
+    keep_group = AnswerGroup(question_id=question_id, title="Keep")
+    session.add(group)
+    session.add(keep_group)
+    session.commit()
+    shared = Lexeme(headword="partagé", lemma="partagé", hash="partage")
+    session.add(shared)
+    session.commit()
+    keep_answer = Answer(answer_group_id=keep_group.id, title="Keep", text="Texte")
+    session.add(keep_answer)
+    session.commit()
+    keep_paragraph = Paragraph(answer_id=keep_answer.id, order_index=1)
+    session.add(keep_paragraph)
+    session.commit()
+    keep_sentence = Sentence(paragraph_id=keep_paragraph.id, order_index=1, text="Gardée")
+    session.add(keep_sentence)
+    session.commit()
+    keep_chunk = SentenceChunk(sentence_id=keep_sentence.id, order_index=1, text="Gardée")
+    session.add(keep_chunk)
+    session.commit()
+    session.add(ChunkLexeme(chunk_id=keep_chunk.id, lexeme_id=shared.id, order_index=1))
+    session.add(FlashcardProgress(entity_type="lexeme", entity_id=shared.id))
+    session.commit()
+
+    for version in range(1, 11):
+        answer = Answer(answer_group_id=group.id, title=f"V{version}", text="Texte", version_index=version)
+        session.add(answer)
+        session.commit()
+        review = SessionSchema(question_id=question_id, answer_id=answer.id)
+        session.add(review)
+        session.commit()
+        task = Task(session_id=review.id, answer_id=answer.id, type="eval")
+        session.add(task)
+        session.commit()
+        session.add(LLMConversation(session_id=review.id, task_id=task.id, purpose="eval"))
+        session.add(LiveTurn(session_id=review.id, turn_index=1, candidate_query="Bonjour"))
+        paragraph = Paragraph(answer_id=answer.id, order_index=1)
+        session.add(paragraph)
+        session.commit()
+        sentences = [
+            Sentence(paragraph_id=paragraph.id, order_index=idx, text=f"Phrase {version}-{idx}")
+            for idx in range(1, 31)
+        ]
+        session.add_all(sentences)
+        session.commit()
+        chunks = [SentenceChunk(sentence_id=sentence.id, order_index=1, text=sentence.text) for sentence in sentences]
+        lexemes = [Lexeme(headword=sentence.text, lemma=sentence.text, hash=sentence.text) for sentence in sentences]
+        session.add_all(chunks + lexemes)
+        session.commit()
+        for sentence, chunk, lexeme in zip(sentences, chunks, lexemes):
+            session.add(ChunkLexeme(chunk_id=chunk.id, lexeme_id=lexeme.id, order_index=1))
+            session.add(ChunkLexeme(chunk_id=chunk.id, lexeme_id=shared.id, order_index=2))
+            session.add(FlashcardProgress(entity_type="sentence", entity_id=sentence.id))
+            session.add(FlashcardProgress(entity_type="chunk", entity_id=chunk.id))
+            session.add(FlashcardProgress(entity_type="lexeme", entity_id=lexeme.id))
+        session.commit()
+
+    statements: list[str] = []
+    engine = session.get_bind()
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count_statement)
+    try:
+        SessionService(session).delete_answer_group(group.id)
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statement)
+
+    # 10 answers x 30 sentences used to take well over a thousand statements.
+    assert len(statements) <= 30
+    assert session.exec(select(Answer)).all() == [keep_answer]
+    assert session.exec(select(Sentence)).all() == [keep_sentence]
+    assert session.exec(select(Task)).all() == []
+    assert session.exec(select(LLMConversation)).all() == []
+    assert session.exec(select(LiveTurn)).all() == []
+    assert session.exec(select(SessionSchema)).all() == []
+    assert [lexeme.id for lexeme in session.exec(select(Lexeme)).all()] == [shared.id]
+    assert len(session.exec(select(ChunkLexeme)).all()) == 1
+    remaining_cards = session.exec(select(FlashcardProgress)).all()
+    assert [(card.entity_type, card.entity_id) for card in remaining_cards] == [("lexeme", shared.id)]
@@ -1,13 +1,37 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 from typing import Generator
 
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
+from sqlalchemy import text
 from sqlalchemy.pool import StaticPool
-from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel import SQLModel, Session, create_engine, select
 
 from app.main import app
 from app.api.dependencies import get_session, get_llm_client
-from app.db.schemas import Task, Session as SessionSchema, Question, AnswerGroup, Answer
+from langchain_core.messages import AIMessage
+
+from app.db.schemas import (
+    Task,
+    Session as SessionSchema,
+    Question,
+    AnswerGroup,
+    Answer,
+    LLMConversation,
+    Paragraph,
+    Sentence,
+    SentenceChunk,
+    ChunkLexeme,
+    Lexeme,
+)
+from app.services.llm_service import LLMError, QuestionLLMClient
+from app.services.task_events import TaskEventBroker, stream_task_events, task_events
+from app.services.task_service import TaskService
 
 
 @pytest.fixture(name="session")
@@ -124,6 +148,52 @@ def test_list_tasks(client: TestClient, session: Session) -> None:
     assert data[0]["session_id"] == session_id
 
 
+def test_list_tasks_pages_by_keyset_and_projects_fields(client: TestClient, session: Session) -> None:
+    session_id = _create_question(session)
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for idx in range(5):
+        session.add(
+            Task(
+                type="eval",
+                status="succeeded",
+                session_id=session_id,
+                payload={"idx": idx},
+                result_summary={"feedback": "x" * 100},
+                # Two tasks share a timestamp so the id tie-breaker is exercised.
+                created_at=base + timedelta(minutes=min(idx, 3)),
+            )
+        )
+    session.commit()
+
+    resp = client.get(f"/tasks?session_id={session_id}&limit=2")
+    assert resp.status_code == 200
+    first_page = resp.json()
+    assert [task["payload"]["idx"] for task in first_page] == [4, 3]
+    assert all("result_summary" not in task for task in first_page)
+    seen = [task["id"] for task in first_page]
+    before_id = resp.headers["X-Next-Before-Id"]
+    while before_id:
+        resp = client.get(f"/tasks?session_id={session_id}&limit=2&before_id={before_id}")
+        seen.extend(task["id"] for task in resp.json())
+        before_id = resp.headers.get("X-Next-Before-Id")
+    assert len(seen) == len(set(seen)) == 5
+
+    resp = client.get(f"/tasks?session_id={session_id}&limit=1&fields=status,result_summary")
+    assert resp.json() == [{"id": first_page[0]["id"], "status": "succeeded", "result_summary": {"feedback": "x" * 100}}]
+    assert client.get("/tasks?fields=status,secret").status_code == 400
+    assert client.get("/tasks?before_id=9999").status_code == 400
+
+    plan = session.exec(
+        text(
+            "EXPLAIN QUERY PLAN SELECT id FROM tasks WHERE session_id = 1 AND (created_at, id) < ('2025-01-01', 9) "
+            "ORDER BY created_at DESC, id DESC LIMIT 50"
+        )
+    ).all()
+    details = " ".join(row[-1] for row in plan)
+    assert "ix_tasks_session_id_created_at" in details
+    assert "TEMP B-TREE" not in details
+
+
 def test_filter_tasks_by_session(client: TestClient, session: Session) -> None:
     s1 = _create_question(session, idx=0)
     s2 = _create_question(session, idx=1)
@@ -187,3 +257,366 @@ def test_cancel_task(client: TestClient, session: Session) -> None:
     cancel_resp = client.post(f"/tasks/{task.id}/cancel")
     assert cancel_resp.status_code == 200
     assert cancel_resp.json()["status"] == "canceled"
+
+
+def test_cancel_task_running_elsewhere(client: TestClient, session: Session) -> None:
+    session_id = _create_question(session)
+    # Running in another worker process: this one holds no token for it.
+    live = Task(type="eval", status="running", session_id=session_id, payload={"session_id": session_id})
+    stale = Task(
+        type="eval",
+        status="running",
+        session_id=session_id,
+        payload={"session_id": session_id},
+        updated_at=datetime.now(timezone.utc) - timedelta(hours=1),
+    )
+    session.add_all([live, stale])
+    session.commit()
+
+    resp = client.post(f"/tasks/{live.id}/cancel")
+    assert resp.status_code == 409
+    session.refresh(live)
+    assert live.status == "running"
+    # Past its type's timeout the owner is gone, so the row itself is canceled.
+    resp = client.post(f"/tasks/{stale.id}/cancel")
+    assert resp.status_code == 200
+    assert resp.json()["status"] == "canceled"
+
+
+def test_task_transitions_publish_events(client: TestClient, session: Session) -> None:
+    session_id = _create_question(session)
+    other_session_id = _create_question(session, idx=1)
+    start = task_events.last_event_id
+    client.post(f"/sessions/{other_session_id}/tasks/eval")
+    resp = client.post(f"/sessions/{session_id}/tasks/eval")
+    assert resp.status_code == 201
+
+    async def collect() -> list[str]:
+        stream = stream_task_events(task_events, session_id=session_id, last_event_id=start, heartbeat=0.01)
+        frames = []
+        async for frame in stream:
+            if frame.startswith(": keep-alive"):
+                break
+            frames.append(frame)
+        await stream.aclose()
+        return frames
+
+    frames = asyncio.run(collect())
+    events = [
+        (line.split(": ", 1)[1], json.loads(frame.split("data: ", 1)[1]))
+        for frame in frames[1:]
+        for line in frame.splitlines()
+        if line.startswith("event: ")
+    ]
+    task_statuses = [data["status"] for kind, data in events if kind == "task"]
+    phases = [(data["phase"], data["phase_status"]) for kind, data in events if kind == "session"]
+    assert task_statuses == ["pending", "running", "succeeded"]
+    assert all(data["session_id"] == session_id for _, data in events)
+    assert "result_summary" not in events[0][1]
+    assert phases[-1] == ("await_new_group", "idle")
+
+
+def test_task_event_stream_resumes_from_last_event_id() -> None:
+    broker = TaskEventBroker(buffer_size=3)
+
+    async def read(last_event_id: int | None, count: int) -> list[str]:
+        stream = stream_task_events(broker, session_id=1, last_event_id=last_event_id)
+        frames = [await stream.__anext__() for _ in range(count)]
+        await stream.aclose()
+        return frames
+
+    first = broker.publish("task", {"id": 1, "status": "pending"}, session_id=1)
+    broker.publish("task", {"id": 2, "status": "pending"}, session_id=2)
+    broker.publish("task", {"id": 1, "status": "succeeded"}, session_id=1)
+
+    frames = asyncio.run(read(first.id, 2))
+    assert frames[1].startswith(f"id: {first.id + 2}\nevent: task")
+    assert '"succeeded"' in frames[1]
+
+    for idx in range(3):
+        broker.publish("task", {"id": 3, "status": f"step-{idx}"}, session_id=1)
+    frames = asyncio.run(read(first.id, 3))
+    assert "event: reset" in frames[1]
+    assert '"step-0"' in frames[2]
+
+
+def test_task_stream_rejects_invalid_last_event_id(client: TestClient) -> None:
+    resp = client.get("/tasks/stream", headers={"Last-Event-ID": "abc"})
+    assert resp.status_code == 400
+
+
+class SlowModel:
+    def __init__(self, on_invoke=None) -> None:
+        self.on_invoke = on_invoke
+        self.release = threading.Event()
+
+    def invoke(self, messages, config=None):
+        if self.on_invoke:
+            self.on_invoke()
+        self.release.wait(timeout=2)
+        return AIMessage(content='{"feedback": "太慢了", "score": 3}')
+
+
+def _slow_eval_client(session: Session, model: SlowModel) -> int:
+    llm_client = QuestionLLMClient(api_key="test-key")
+    llm_client._llm = model
+    app.dependency_overrides[get_llm_client] = lambda: llm_client
+    session_id = _create_question(session)
+    entity = session.get(SessionSchema, session_id)
+    entity.user_answer_draft = "Mon brouillon"
+    session.add(entity)
+    session.commit()
+    return session_id
+
+
+def test_running_task_times_out(client: TestClient, session: Session, monkeypatch) -> None:
+    monkeypatch.setenv("TASK_TIMEOUT_EVAL", "0.2")
+    model = SlowModel()
+    session_id = _slow_eval_client(session, model)
+    resp = client.post(f"/sessions/{session_id}/tasks/eval")
+    model.release.set()
+    assert resp.status_code == 504
+    task = session.exec(select(Task).where(Task.session_id == session_id)).one()
+    assert task.status == "timed_out"
+    entity = session.get(SessionSchema, session_id)
+    session.refresh(entity)
+    assert entity.phase == "draft"
+    assert entity.phase_status == "failed"
+    assert entity.last_eval_task_id is None
+    assert session.exec(select(LLMConversation)).all() == []
+
+
+def test_cancel_running_task(client: TestClient, session: Session) -> None:
+    cancel_responses = []
+
+    def cancel_from_client() -> None:
+        task_id = session.exec(select(Task.id)).one()
+        cancel_responses.append(client.post(f"/tasks/{task_id}/cancel"))
+
+    model = SlowModel(on_invoke=cancel_from_client)
+    session_id = _slow_eval_client(session, model)
+    resp = client.post(f"/sessions/{session_id}/tasks/eval")
+    model.release.set()
+    assert cancel_responses[0].status_code == 200
+    assert cancel_responses[0].json()["status"] == "running"
+    assert resp.status_code == 409
+    task = session.exec(select(Task).where(Task.session_id == session_id)).one()
+    assert task.status == "canceled"
+    assert session.exec(select(LLMConversation)).all() == []
+
+
+def _chunked_sentence(session: Session) -> tuple[int, int]:
+    answer_id = _create_answer(session)
+    paragraph = Paragraph(answer_id=answer_id, order_index=1)
+    session.add(paragraph)
+    session.commit()
+    sentence = Sentence(paragraph_id=paragraph.id, order_index=1, text="Je pense que oui.")
+    lexeme = Lexeme(headword="penser", lemma="penser", hash="penser-hash")
+    session.add(sentence)
+    session.add(lexeme)
+    session.commit()
+    chunk = SentenceChunk(sentence_id=sentence.id, order_index=1, text="Je pense")
+    session.add(chunk)
+    session.commit()
+    session.add(ChunkLexeme(chunk_id=chunk.id, lexeme_id=lexeme.id))
+    session.commit()
+    return sentence.id, chunk.id
+
+
+def test_canceled_rerun_keeps_existing_chunks_and_lexemes(client: TestClient, session: Session) -> None:
+    sentence_id, chunk_id = _chunked_sentence(session)
+
+    def cancel_from_client() -> None:
+        task_id = session.exec(select(Task.id).order_by(Task.id.desc())).first()
+        client.post(f"/tasks/{task_id}/cancel")
+
+    model = SlowModel(on_invoke=cancel_from_client)
+    llm_client = QuestionLLMClient(api_key="test-key")
+    llm_client._llm = model
+    app.dependency_overrides[get_llm_client] = lambda: llm_client
+    for path in ("chunks", "chunk-lexemes"):
+        resp = client.post(f"/sentences/{sentence_id}/tasks/{path}")
+        assert resp.status_code == 409
+    model.release.set()
+
+    session.expire_all()
+    tasks = session.exec(select(Task).order_by(Task.id)).all()
+    assert [task.status for task in tasks] == ["canceled", "canceled"]
+    chunks = session.exec(select(SentenceChunk).where(SentenceChunk.sentence_id == sentence_id)).all()
+    assert [chunk.id for chunk in chunks] == [chunk_id]
+    links = session.exec(select(ChunkLexeme).where(ChunkLexeme.chunk_id == chunk_id)).all()
+    assert len(links) == 1
+    assert session.get(Lexeme, links[0].lexeme_id).headword == "penser"
+
+
+class FanOutLLM:
+    delay = 0.3
+
+    def __init__(self, compare_error: Exception | None = None) -> None:
+        self.compare_error = compare_error
+        self.threads: set[str] = set()
+        # Both calls must be in flight at once to get past the barrier.
+        self.barrier = threading.Barrier(2, timeout=5)
+
+    def evaluate_answer(self, **kwargs):
+        self.threads.add(threading.current_thread().name)
+        self.barrier.wait()
+        time.sleep(self.delay)
+        return {"feedback": "好", "score": 4}
+
+    def compare_answer(self, **kwargs):
+        self.threads.add(threading.current_thread().name)
+        self.barrier.wait()
+        time.sleep(self.delay)
+        if self.compare_error is not None:
+            raise self.compare_error
+        return {"decision": "new_group", "matched_answer_group_id": None, "reason": "不同", "differences": []}
+
+
+def _session_with_answers(session: Session) -> int:
+    answer = session.get(Answer, _create_answer(session))
+    question_id = session.get(AnswerGroup, answer.answer_group_id).question_id
+    entity = SessionSchema(question_id=question_id, session_type="first", status="draft", user_answer_draft="Je pense")
+    session.add(entity)
+    session.commit()
+    return entity.id
+
+
+def test_eval_fans_out_compare_concurrently(client: TestClient, session: Session) -> None:
+    llm = FanOutLLM()
+    app.dependency_overrides[get_llm_client] = lambda: llm
+    session_id = _session_with_answers(session)
+    resp = client.post(f"/sessions/{session_id}/tasks/eval")
+    assert resp.status_code == 201
+    assert len(llm.threads) == 2
+    tasks = session.exec(select(Task).where(Task.session_id == session_id).order_by(Task.id)).all()
+    assert [(task.type, task.status) for task in tasks] == [("eval", "succeeded"), ("compare", "succeeded")]
+    entity = session.get(SessionSchema, session_id)
+    session.refresh(entity)
+    assert (entity.phase, entity.phase_status) == ("await_new_group", "idle")
+    assert (entity.last_eval_task_id, entity.last_compare_task_id) == (tasks[0].id, tasks[1].id)
+    phases = [
+        event["phase"] for event in client.get(f"/sessions/{session_id}/events").json() if event["kind"] == "phase"
+    ]
+    assert "await_eval_confirm" not in phases
+
+
+def test_failed_compare_branch_keeps_evaluation(client: TestClient, session: Session) -> None:
+    app.dependency_overrides[get_llm_client] = lambda: FanOutLLM(compare_error=LLMError("对比失败"))
+    session_id = _session_with_answers(session)
+    resp = client.post(f"/sessions/{session_id}/tasks/eval")
+    assert resp.status_code == 201
+    assert resp.json()["status"] == "succeeded"
+    compare = session.exec(select(Task).where(Task.session_id == session_id, Task.type == "compare")).one()
+    assert (compare.status, compare.error_message) == ("failed", "对比失败")
+    entity = session.get(SessionSchema, session_id)
+    session.refresh(entity)
+    assert (entity.phase, entity.phase_status, entity.phase_error) == ("await_eval_confirm", "failed", "对比失败")
+    assert entity.last_eval_task_id == resp.json()["id"]
+    assert entity.last_compare_task_id is None
+
+
+@pytest.mark.parametrize("step", ["_apply_eval_result", "_apply_compare_result"])
+def test_eval_conflict_fails_both_tasks_and_session(
+    client: TestClient, session: Session, monkeypatch, step: str
+) -> None:
+    def conflict(*args, **kwargs):
+        raise HTTPException(status_code=409, detail="Session 已被其他任务修改：progress_state")
+
+    monkeypatch.setattr(TaskService, step, conflict)
+    app.dependency_overrides[get_llm_client] = lambda: FanOutLLM()
+    session_id = _session_with_answers(session)
+    resp = client.post(f"/sessions/{session_id}/tasks/eval")
+    assert resp.status_code == 409
+    session.expire_all()
+    tasks = session.exec(select(Task).where(Task.session_id == session_id).order_by(Task.id)).all()
+    assert [(task.type, task.status) for task in tasks] == [("eval", "failed"), ("compare", "failed")]
+    entity = session.get(SessionSchema, session_id)
+    assert (entity.phase, entity.phase_status) == ("draft", "failed")
+    assert entity.last_eval_task_id is None
+
+
+class RecordingCompareLLM:
+    def __init__(self) -> None:
+        self.compare_calls: list[dict] = []
+
+    def evaluate_answer(self, **kwargs):
+        return {"feedback": "好", "score": 4}
+
+    def compare_answer(self, **kwargs):
+        self.compare_calls.append(kwargs)
+        return {"decision": "new_group", "matched_answer_group_id": None, "reason": "不同", "differences": []}
+
+    def highlight_gaps(self, **kwargs):
+        return {"coverage_score": 0.9, "missing_points": [], "grammar_notes": [], "suggestions": []}
+
+    def refine_answer(self, **kwargs):
+        return {"text": kwargs["answer_draft"], "notes": []}
+
+
+GROUP_TEXTS = [
+    "Les transports en commun gratuits réduisent la pollution dans les grandes villes.",
+    "Le télétravail améliore l'équilibre entre la vie professionnelle et la vie privée.",
+    "Apprendre une langue étrangère ouvre des portes sur le marché du travail.",
+    "Les réseaux sociaux isolent les jeunes malgré les apparences.",
+    "Le sport à l'école devrait occuper plus de place dans l'emploi du temps.",
+    "Les voyages en avion devraient être taxés davantage pour protéger le climat.",
+    "La lecture de romans développe l'empathie chez les adolescents.",
+    "Les villes devraient créer davantage d'espaces verts pour les familles.",
+    "Manger local soutient les agriculteurs et réduit les émissions.",
+    "Les musées gratuits attirent un public plus diversifié.",
+    "Le bénévolat apprend aux jeunes le sens des responsabilités.",
+    "Interdire les voitures en centre-ville rend l'air plus respirable.",
+]
+
+
+def _session_with_groups(session: Session, draft: str) -> tuple[int, list[int]]:
+    question = Question(
+        type="T3", source="seikou", year=2024, month=11, suite="1", number="1", title="Débat", body="Body"
+    )
+    session.add(question)
+    session.commit()
+    group_ids = []
+    for idx, text in enumerate(GROUP_TEXTS):
+        group = AnswerGroup(question_id=question.id, title=f"Groupe {idx}", direction_descriptor=f"方向{idx}")
+        session.add(group)
+        session.commit()
+        session.add(Answer(answer_group_id=group.id, title=f"Réponse {idx}", text=text, status="active"))
+        group_ids.append(group.id)
+    entity = SessionSchema(question_id=question.id, session_type="first", status="draft", user_answer_draft=draft)
+    session.add(entity)
+    session.commit()
+    return entity.id, group_ids
+
+
+def test_compare_prompt_lists_only_the_closest_groups(client: TestClient, session: Session, monkeypatch) -> None:
+    monkeypatch.setenv("COMPARE_SHORTLIST_SIZE", "3")
+    llm = RecordingCompareLLM()
+    app.dependency_overrides[get_llm_client] = lambda: llm
+    session_id, group_ids = _session_with_groups(
+        session, "À mon avis, le télétravail permet un meilleur équilibre entre travail et vie privée."
+    )
+    resp = client.post(f"/sessions/{session_id}/tasks/eval")
+    assert resp.status_code == 201
+    groups = llm.compare_calls[0]["existing_groups"]
+    assert len(groups) == 3
+    assert groups[0]["answer_group_id"] == group_ids[1]
+
+
+def test_near_identical_draft_reuses_group_without_llm(client: TestClient, session: Session) -> None:
+    llm = RecordingCompareLLM()
+    app.dependency_overrides[get_llm_client] = lambda: llm
+    session_id, group_ids = _session_with_groups(session, GROUP_TEXTS[4])
+    resp = client.post(f"/sessions/{session_id}/tasks/eval")
+    assert resp.status_code == 201
+    assert llm.compare_calls == []
+    compare = session.exec(select(Task).where(Task.session_id == session_id, Task.type == "compare")).one()
+    assert compare.status == "succeeded"
+    assert compare.result_summary["decision"] == "reuse"
+    assert compare.result_summary["matched_answer_group_id"] == group_ids[4]
+    assert compare.result_summary["local_similarity"] >= 0.9
+    purposes = session.exec(select(LLMConversation.purpose).where(LLMConversation.session_id == session_id)).all()
+    assert "compare" not in purposes
+    entity = session.get(SessionSchema, session_id)
+    session.refresh(entity)
+    assert entity.progress_state["selected_answer_group_id"] == group_ids[4]
@@ -1,18 +1,30 @@
 import apiClient from './http';
-import type { LLMConversationLog } from '../types/answer';
+import type { LLMConversationLog, LLMConversationSummary } from '../types/answer';
 
 export interface ConversationQuery {
   limit?: number;
   session_id?: number;
   task_id?: number;
+  before_id?: number;
 }
 
-export async function fetchConversations(params: ConversationQuery = {}): Promise<LLMConversationLog[]> {
-  const response = await apiClient.get<LLMConversationLog[]>('/llm-conversations', {
+export interface ConversationPage {
+  items: LLMConversationSummary[];
+  nextBeforeId: number | null;
+}
+
+export async function fetchConversations(params: ConversationQuery = {}): Promise<ConversationPage> {
+  const response = await apiClient.get<LLMConversationSummary[]>('/llm-conversations', {
     params: {
       limit: 50,
       ...params
     }
   });
+  const next = response.headers['x-next-before-id'];
+  return { items: response.data, nextBeforeId: next ? Number(next) : null };
+}
+
+export async function fetchConversation(id: number): Promise<LLMConversationLog> {
+  const response = await apiClient.get<LLMConversationLog>(`/llm-conversations/${id}`);
   return response.data;
 }
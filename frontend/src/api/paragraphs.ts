@@ -1,5 +1,5 @@
 import apiClient from './http';
-import type { Paragraph } from '../types/answer';
+import type { AnswerBundle, Paragraph } from '../types/answer';
 import type { FetchTask } from '../types/question';
 
 export async function fetchParagraphsByAnswer(answerId: number): Promise<Paragraph[]> {
@@ -7,6 +7,11 @@ export async function fetchParagraphsByAnswer(answerId: number): Promise<Paragra
   return response.data;
 }
 
+export async function fetchAnswerBundle(answerId: number): Promise<AnswerBundle> {
+  const response = await apiClient.get<AnswerBundle>(`/answers/${answerId}/bundle`);
+  return response.data;
+}
+
 export async function runStructureTask(answerId: number): Promise<FetchTask> {
   const response = await apiClient.post<FetchTask>(`/answers/${answerId}/tasks/structure`, {});
   return response.data;
@@ -7,11 +7,20 @@ export interface TaskQueryParams {
   task_type?: string;
   status?: string;
   answer_id?: number;
+  before_id?: number;
+  limit?: number;
+  fields?: string;
 }
 
-export async function fetchTasks(params: TaskQueryParams = {}): Promise<FetchTask[]> {
+export interface TaskPage {
+  items: FetchTask[];
+  nextBeforeId: number | null;
+}
+
+export async function fetchTasks(params: TaskQueryParams = {}): Promise<TaskPage> {
   const response = await apiClient.get<FetchTask[]>('/tasks', { params });
-  return response.data;
+  const next = response.headers['x-next-before-id'];
+  return { items: response.data, nextBeforeId: next ? Number(next) : null };
 }
 
 export async function fetchTaskById(id: number): Promise<FetchTask> {
@@ -28,3 +37,43 @@ export async function cancelTask(id: number): Promise<FetchTask> {
   const response = await apiClient.post<FetchTask>(`/tasks/${id}/cancel`, {});
   return response.data;
 }
+
+export interface TaskStatusEvent {
+  id: number;
+  type: string;
+  status: string;
+  session_id: number | null;
+  answer_id: number | null;
+  error_message: string | null;
+  updated_at: string | null;
+}
+
+export interface SessionPhaseEvent {
+  session_id: number;
+  status: string;
+  phase: string | null;
+  phase_status: string | null;
+  phase_error: string | null;
+}
+
+export interface TaskStreamHandlers {
+  onTask?: (event: TaskStatusEvent) => void;
+  onSession?: (event: SessionPhaseEvent) => void;
+  onReset?: () => void;
+}
+
+export function subscribeTaskEvents(
+  params: Pick<TaskQueryParams, 'session_id' | 'answer_id'>,
+  handlers: TaskStreamHandlers
+): () => void {
+  const base = apiClient.defaults.baseURL ?? '';
+  const url = new URL(`${base}/tasks/stream`, window.location.origin);
+  if (params.session_id !== undefined) url.searchParams.set('session_id', String(params.session_id));
+  if (params.answer_id !== undefined) url.searchParams.set('answer_id', String(params.answer_id));
+  // EventSource resends Last-Event-ID on reconnect, so missed transitions are replayed.
+  const source = new EventSource(url.toString());
+  source.addEventListener('task', (event) => handlers.onTask?.(JSON.parse((event as MessageEvent).data)));
+  source.addEventListener('session', (event) => handlers.onSession?.(JSON.parse((event as MessageEvent).data)));
+  source.addEventListener('reset', () => handlers.onReset?.());
+  return () => source.close();
+}
@@ -1,10 +1,11 @@
 import { defineStore } from 'pinia';
 import type { FetchTask } from '../types/question';
-import type { TaskQueryParams } from '../api/tasks';
+import type { TaskQueryParams, TaskStatusEvent } from '../api/tasks';
 import { fetchTasks, retryTask, cancelTask } from '../api/tasks';
 
 interface State {
   items: FetchTask[];
+  nextBeforeId: number | null;
   loading: boolean;
   error: string | null;
   filters: TaskQueryParams;
@@ -13,6 +14,7 @@ interface State {
 export const useTaskStore = defineStore('tasks', {
   state: (): State => ({
     items: [],
+    nextBeforeId: null,
     loading: false,
     error: null,
     filters: {},
@@ -23,7 +25,9 @@ export const useTaskStore = defineStore('tasks', {
       this.error = null;
       this.filters = params;
       try {
-        this.items = await fetchTasks(params);
+        const page = await fetchTasks(params);
+        this.items = page.items;
+        this.nextBeforeId = page.nextBeforeId;
       } catch (error) {
         this.error = '无法加载任务列表';
         throw error;
@@ -31,6 +35,31 @@ export const useTaskStore = defineStore('tasks', {
         this.loading = false;
       }
     },
+    async loadMore() {
+      if (this.nextBeforeId === null) return;
+      try {
+        const page = await fetchTasks({ ...this.filters, before_id: this.nextBeforeId });
+        this.items = [...this.items, ...page.items];
+        this.nextBeforeId = page.nextBeforeId;
+      } catch (error) {
+        this.error = '无法加载任务列表';
+        throw error;
+      }
+    },
+    applyEvent(event: TaskStatusEvent) {
+      const index = this.items.findIndex((task) => task.id === event.id);
+      if (index === -1) {
+        this.load(this.filters);
+        return;
+      }
+      const task = this.items[index];
+      this.items[index] = {
+        ...task,
+        status: event.status,
+        error_message: event.error_message,
+        updated_at: event.updated_at ?? task.updated_at,
+      };
+    },
     async retry(taskId: number) {
       const task = await retryTask(taskId);
       await this.load(this.filters);
@@ -83,6 +83,16 @@ export interface Paragraph {
   sentences: Sentence[];
 }
 
+export interface AnswerBundle {
+  format: number;
+  answer_id: number;
+  answer_group_id: number;
+  title: string;
+  structure_version: number;
+  generated_at: string;
+  paragraphs: Paragraph[];
+}
+
 export interface LLMConversationLog {
   id: number;
   session_id: number | null;
@@ -92,6 +102,20 @@ export interface LLMConversationLog {
   result: Record<string, unknown>;
   model_name?: string | null;
   latency_ms?: number | null;
+  raw_size?: number | null;
+  stored_size?: number | null;
+  created_at: string;
+}
+
+export interface LLMConversationSummary {
+  id: number;
+  session_id: number | null;
+  task_id: number | null;
+  purpose: string;
+  model_name?: string | null;
+  latency_ms?: number | null;
+  raw_size: number;
+  stored_size: number;
   created_at: string;
 }
 
@@ -37,7 +37,8 @@ export interface FetchTask {
   session_id: number | null;
   answer_id: number | null;
   payload: Record<string, unknown>;
-  result_summary: Record<string, unknown>;
+  // Left out of /tasks listings unless requested through `fields`.
+  result_summary?: Record<string, unknown>;
   error_message?: string | null;
   created_at: string;
   updated_at: string;
@@ -3,7 +3,7 @@ import { useRoute, RouterLink, useRouter } from 'vue-router';
 import { fetchAnswerById, fetchAnswerHistory, deleteAnswer } from '../api/answers';
 import { fetchAnswerGroupById } from '../api/answerGroups';
 import { fetchQuestionById } from '../api/questions';
-import { fetchParagraphsByAnswer, runStructureTask, runSentenceTranslationTask } from '../api/paragraphs';
+import { fetchAnswerBundle, runStructureTask, runSentenceTranslationTask } from '../api/paragraphs';
 import { generateSentenceChunks, generateChunkLexemes } from '../api/sentences';
 import type { Answer, AnswerGroup, Paragraph, AnswerHistory } from '../types/answer';
 import type { Question, FetchTask } from '../types/question';
@@ -47,7 +47,7 @@ export default defineComponent({
     const deleteError = ref('');
 
     async function loadParagraphStructure() {
-      paragraphs.value = await fetchParagraphsByAnswer(answerId);
+      paragraphs.value = (await fetchAnswerBundle(answerId)).paragraphs;
     }
 
     const latestStructureTask = computed<FetchTask | null>(() => {
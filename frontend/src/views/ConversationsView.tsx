@@ -1,11 +1,19 @@
 import { defineComponent, ref, onMounted } from 'vue';
-import { fetchConversations } from '../api/conversations';
-import type { LLMConversationLog } from '../types/answer';
+import { fetchConversation, fetchConversations } from '../api/conversations';
+import type { ConversationQuery } from '../api/conversations';
+import type { LLMConversationLog, LLMConversationSummary } from '../types/answer';
+
+function formatBytes(size: number): string {
+  return size >= 1024 ? `${(size / 1024).toFixed(1)} KB` : `${size} B`;
+}
 
 export default defineComponent({
   name: 'ConversationsView',
   setup() {
-    const conversations = ref<LLMConversationLog[]>([]);
+    const conversations = ref<LLMConversationSummary[]>([]);
+    const details = ref<Record<number, LLMConversationLog>>({});
+    const nextBeforeId = ref<number | null>(null);
+    const filters = ref<ConversationQuery>({});
     const loading = ref(false);
     const error = ref('');
     const sessionIdInput = ref('');
@@ -15,12 +23,15 @@ export default defineComponent({
       loading.value = true;
       error.value = '';
       try {
-        const params: { session_id?: number; task_id?: number } = {};
+        const params: ConversationQuery = {};
         const sessionId = Number(sessionIdInput.value);
         const taskId = Number(taskIdInput.value);
         if (!Number.isNaN(sessionId) && sessionId > 0) params.session_id = sessionId;
         if (!Number.isNaN(taskId) && taskId > 0) params.task_id = taskId;
-        conversations.value = await fetchConversations(params);
+        filters.value = params;
+        const page = await fetchConversations(params);
+        conversations.value = page.items;
+        nextBeforeId.value = page.nextBeforeId;
       } catch (err) {
         error.value = '无法加载对话记录';
         console.error(err);
@@ -29,6 +40,29 @@ export default defineComponent({
       }
     }
 
+    async function loadMore() {
+      if (nextBeforeId.value === null) return;
+      try {
+        const page = await fetchConversations({ ...filters.value, before_id: nextBeforeId.value });
+        conversations.value = [...conversations.value, ...page.items];
+        nextBeforeId.value = page.nextBeforeId;
+      } catch (err) {
+        error.value = '无法加载对话记录';
+        console.error(err);
+      }
+    }
+
+    // Full messages/result are fetched only when a row is expanded.
+    async function loadDetail(id: number) {
+      if (details.value[id]) return;
+      try {
+        details.value = { ...details.value, [id]: await fetchConversation(id) };
+      } catch (err) {
+        error.value = '无法加载对话详情';
+        console.error(err);
+      }
+    }
+
     onMounted(() => {
       load();
     });
@@ -74,16 +108,33 @@ export default defineComponent({
           {conversations.value.map((item) => (
             <li key={item.id} class="conversation-item">
               <div class="conversation-meta">
-                <strong>#{item.id}</strong> · {item.purpose} · {new Date(item.created_at).toLocaleString()}
+                <strong>#{item.id}</strong> · {item.purpose} · {item.model_name ?? '—'} ·{' '}
+                {item.latency_ms != null ? `${item.latency_ms} ms` : '—'} · {formatBytes(item.raw_size)} ·{' '}
+                {new Date(item.created_at).toLocaleString()}
               </div>
-              <details>
+              <details
+                onToggle={(event) => {
+                  if ((event.target as HTMLDetailsElement).open) loadDetail(item.id);
+                }}
+              >
                 <summary>查看详情</summary>
-                <pre>messages: {JSON.stringify(item.messages, null, 2)}</pre>
-                <pre>result: {JSON.stringify(item.result, null, 2)}</pre>
+                {details.value[item.id] ? (
+                  <>
+                    <pre>messages: {JSON.stringify(details.value[item.id].messages, null, 2)}</pre>
+                    <pre>result: {JSON.stringify(details.value[item.id].result, null, 2)}</pre>
+                  </>
+                ) : (
+                  <p>加载中...</p>
+                )}
               </details>
             </li>
           ))}
         </ul>
+        {!loading.value && nextBeforeId.value !== null && (
+          <button type="button" onClick={loadMore}>
+            加载更多
+          </button>
+        )}
       </section>
     );
   }
@@ -281,6 +281,12 @@ export default defineComponent({
               liveSending.value = false;
               appendLiveMessage('notice', `已发送第 ${payload.turn} 轮提问。`);
               await loadLiveTurnHistory(session.value?.id);
+            } else if (payload.type === 'examiner_reply_delta') {
+              liveTurns.value = liveTurns.value.map((turn) =>
+                turn.id === payload.turn_id
+                  ? { ...turn, examiner_reply: (turn.examiner_reply ?? '') + payload.delta }
+                  : turn,
+              );
             } else if (payload.type === 'examiner_reply') {
               appendLiveMessage('notice', `考官已回复第 ${payload.turn} 轮。`);
               await loadLiveTurnHistory(session.value?.id);
@@ -1,5 +1,6 @@
-import { defineComponent, onMounted } from 'vue';
+import { defineComponent, onBeforeUnmount, onMounted } from 'vue';
 import { RouterLink } from 'vue-router';
+import { subscribeTaskEvents } from '../api/tasks';
 import { useTaskStore } from '../stores/tasks';
 
 export default defineComponent({
@@ -7,8 +8,21 @@ export default defineComponent({
   setup() {
     const taskStore = useTaskStore();
 
+    let unsubscribe: (() => void) | null = null;
+
     onMounted(() => {
       taskStore.load();
+      unsubscribe = subscribeTaskEvents(
+        {},
+        {
+          onTask: (event) => taskStore.applyEvent(event),
+          onReset: () => taskStore.load(taskStore.filters),
+        }
+      );
+    });
+
+    onBeforeUnmount(() => {
+      unsubscribe?.();
     });
 
     return () => (
@@ -47,10 +61,10 @@ export default defineComponent({
                   <td>{new Date(task.updated_at).toLocaleString()}</td>
                   <td>{task.error_message || '—'}</td>
                   <td>
-                    {['failed', 'canceled'].includes(task.status) && (
+                    {['failed', 'canceled', 'timed_out'].includes(task.status) && (
                       <button onClick={() => taskStore.retry(task.id)}>重试</button>
                     )}
-                    {task.status === 'pending' && (
+                    {['pending', 'running'].includes(task.status) && (
                       <button onClick={() => taskStore.cancel(task.id)}>取消</button>
                     )}
                   </td>
@@ -59,6 +73,9 @@ export default defineComponent({
             </tbody>
           </table>
         )}
+        {!taskStore.loading && taskStore.nextBeforeId !== null && (
+          <button onClick={() => taskStore.loadMore()}>加载更多</button>
+        )}
       </section>
     );
   },